@@ -1,5 +1,6 @@
 import streamlit as st
 
+from core import migrations
 from core.session_manager import init_session_state, logout
 from services.user_service import ensure_default_users, create_user
 
@@ -16,6 +17,13 @@ def main():
         initial_sidebar_state="collapsed",
     )
 
+    # Pages would fail on missing tables/columns (e.g. scan_blobs on first upload)
+    # (checked on every rerun until the database is found current)
+    pending = migrations.pending_once()
+    if pending:
+        st.error(migrations.out_of_date_message(pending) + ", then reload this page.")
+        st.stop()
+
     init_session_state()
 
     try:
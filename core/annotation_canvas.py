@@ -0,0 +1,119 @@
+"""Annotation canvas fed with the cached, pre-encoded scan background."""
+import base64
+import io
+import os
+from importlib import metadata
+
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+import streamlit_drawable_canvas
+from PIL import Image
+from streamlit_drawable_canvas import CanvasResult, st_canvas
+
+from core.annotation_render import CANVAS_MAX_WIDTH, canvas_background, canvas_background_png
+
+# st_canvas() only accepts a PIL background, which it resizes and re-encodes
+# to PNG on every rerun. On the pinned versions (requirements.txt: streamlit
+# 1.37, streamlit-drawable-canvas 0.9.3) this wrapper declares the same
+# frontend and hands it the URL of the PNG encoded once in
+# core.annotation_render. Publishing that URL needs Streamlit internals
+# (streamlit.elements.image.image_to_url, st._config), so any other version,
+# or a missing attribute, falls back to the stock st_canvas() with the cached
+# PIL background.
+PINNED_STREAMLIT = "1.37."
+PINNED_DRAWABLE_CANVAS = "0.9.3"
+
+try:
+    import streamlit.elements.image as st_image
+except ImportError:
+    st_image = None
+
+
+def _installed(dist: str) -> str:
+    try:
+        return metadata.version(dist)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+PRE_ENCODED_BACKGROUND = (
+    st.__version__.startswith(PINNED_STREAMLIT)
+    and _installed("streamlit-drawable-canvas") == PINNED_DRAWABLE_CANVAS
+    and callable(getattr(st_image, "image_to_url", None))
+    and callable(getattr(getattr(st, "_config", None), "get_option", None))
+)
+
+_component_func = None
+if PRE_ENCODED_BACKGROUND:
+    _BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(streamlit_drawable_canvas.__file__)), "frontend", "build")
+    _component_func = components.declare_component("st_canvas", path=_BUILD_DIR)
+
+
+def _background_url(png: bytes, digest: str, width: int, key: str | None) -> str:
+    # PNG bytes no wider than `width` are published as-is (no decode/encode)
+    url = st_image.image_to_url(png, width, True, "RGB", "PNG", f"drawable-canvas-bg-{digest}-{key}")
+    return st._config.get_option("server.baseUrlPath") + url
+
+
+def annotation_canvas(
+    scan_path: str,
+    fill_color: str = "#eee",
+    stroke_width: int = 20,
+    stroke_color: str = "black",
+    update_streamlit: bool = True,
+    drawing_mode: str = "freedraw",
+    initial_drawing: dict | None = None,
+    display_toolbar: bool = True,
+    point_display_radius: int = 3,
+    max_width: int = CANVAS_MAX_WIDTH,
+    key: str | None = None,
+) -> CanvasResult:
+    """st_canvas() over the scan at canvas size; same arguments and result.
+
+    The canvas takes the size of the prepared background, so no width or
+    height is passed.
+    """
+    if _component_func is None:
+        background = canvas_background(scan_path, max_width)
+        result = st_canvas(
+            fill_color=fill_color,
+            stroke_width=stroke_width,
+            stroke_color=stroke_color,
+            background_image=background,
+            update_streamlit=update_streamlit,
+            height=background.height,
+            width=background.width,
+            drawing_mode=drawing_mode,
+            initial_drawing=initial_drawing,
+            display_toolbar=display_toolbar,
+            point_display_radius=point_display_radius,
+            key=key,
+        )
+        # 0.9.3 returns the CanvasResult class itself until the first event
+        return result if isinstance(result, CanvasResult) else CanvasResult()
+
+    png, digest, (width, height) = canvas_background_png(scan_path, max_width)
+    initial_drawing = {"version": "4.4.0"} if initial_drawing is None else dict(initial_drawing)
+    initial_drawing["background"] = ""
+
+    value = _component_func(
+        fillColor=fill_color,
+        strokeWidth=stroke_width,
+        strokeColor=stroke_color,
+        backgroundColor="",
+        backgroundImageURL=_background_url(png, digest, width, key),
+        realtimeUpdateStreamlit=update_streamlit and drawing_mode != "polygon",
+        canvasHeight=height,
+        canvasWidth=width,
+        drawingMode=drawing_mode,
+        initialDrawing=initial_drawing,
+        displayToolbar=display_toolbar,
+        displayRadius=point_display_radius,
+        key=key,
+        default=None,
+    )
+    if value is None:
+        return CanvasResult()
+    _, data = value["data"].split(";base64,")
+    return CanvasResult(np.asarray(Image.open(io.BytesIO(base64.b64decode(data)))), value["raw"])
@@ -0,0 +1,56 @@
+import json
+from typing import Dict, List
+
+# Compact deltas between two Fabric.js canvas states. A canvas is a dict with
+# an "objects" list plus a few scalar keys (version, background). Edits on the
+# canvas almost always touch a contiguous run of objects (new strokes are
+# appended, a moved shape is replaced in place), so a delta keeps the common
+# prefix and suffix of the previous object list and stores only the run in
+# between, plus any top-level keys that changed.
+
+
+def dumps(data) -> str:
+    """Compact, key-sorted JSON used for stored payloads and size accounting."""
+    return json.dumps(data, separators=(",", ":"), sort_keys=True)
+
+
+def diff(old: Dict, new: Dict) -> Dict:
+    """Return the delta turning canvas ``old`` into ``new`` (empty dict if equal)."""
+    old_objs: List = list((old or {}).get("objects") or [])
+    new_objs: List = list((new or {}).get("objects") or [])
+    limit = min(len(old_objs), len(new_objs))
+    prefix = 0
+    while prefix < limit and old_objs[prefix] == new_objs[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_objs[-1 - suffix] == new_objs[-1 - suffix]:
+        suffix += 1
+
+    delta: Dict = {}
+    if prefix != len(old_objs) or prefix != len(new_objs):
+        delta["p"] = prefix
+        delta["s"] = suffix
+        delta["i"] = new_objs[prefix:len(new_objs) - suffix]
+    old_rest = {k: v for k, v in (old or {}).items() if k != "objects"}
+    new_rest = {k: v for k, v in (new or {}).items() if k != "objects"}
+    changed = {k: v for k, v in new_rest.items() if old_rest.get(k, object()) != v}
+    removed = sorted(k for k in old_rest if k not in new_rest)
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+    return delta
+
+
+def apply(base: Dict, delta: Dict) -> Dict:
+    """Return a new canvas state: ``base`` with ``delta`` applied."""
+    out = {k: v for k, v in (base or {}).items() if k != "objects"}
+    objs: List = list((base or {}).get("objects") or [])
+    if "p" in delta:
+        prefix, suffix = delta["p"], delta["s"]
+        objs = objs[:prefix] + list(delta["i"]) + (objs[len(objs) - suffix:] if suffix else [])
+    for key in delta.get("unset", ()):
+        out.pop(key, None)
+    out.update(delta.get("set", {}))
+    out["objects"] = objs
+    return out
@@ -0,0 +1,352 @@
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw
+
+from core.database import BASE_DIR
+
+# Annotations are persisted as the canvas' Fabric.js JSON only. The raster
+# composite (scan + drawing) is produced here the first time something needs
+# it and cached under data/cache/annotations, keyed by the JSON content and
+# the scan path (scan paths are content-addressed), so any change to either
+# yields a new cache entry.
+COMPOSITE_DIR = os.path.join(BASE_DIR, "data", "cache", "annotations")
+COMPOSITE_CACHE_FILES = int(os.getenv("ANNOTATION_COMPOSITE_CACHE", "256"))
+# The annotation canvas shows the scan at most this wide (pages/d_view_case.py)
+CANVAS_MAX_WIDTH = 900
+# Prepared canvas backgrounds (decoded + resized scan and its PNG) kept in memory
+CANVAS_BG_CACHE_ENTRIES = int(os.getenv("CANVAS_BG_CACHE", "16"))
+
+_lock = threading.Lock()
+_bg_lock = threading.Lock()
+_bg_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+_bg_stats = {"hits": 0, "misses": 0}
+_RGBA_RE = re.compile(r"rgba?\(([^)]*)\)")
+
+
+def canvas_size(image_size: Tuple[int, int], max_width: int = CANVAS_MAX_WIDTH) -> Tuple[int, int]:
+    """Size the scan is drawn at on the annotation canvas."""
+    w, h = image_size
+    if w > max_width:
+        ratio = max_width / float(w)
+        return int(w * ratio), int(h * ratio)
+    return w, h
+
+
+def _background_key(scan_path: str, max_width: int, mode: str) -> tuple:
+    """Cache key: content hash for store paths, else (path, mtime, size)."""
+    from core.archive_store import resolve_path
+    from core.scan_store import digest_from_path
+
+    digest = digest_from_path(scan_path)
+    if digest:
+        return digest, max_width, mode
+    local = resolve_path(scan_path)
+    st = os.stat(local)
+    return (os.path.abspath(local), st.st_mtime_ns, st.st_size), max_width, mode
+
+
+def canvas_background(scan_path: str, max_width: int = CANVAS_MAX_WIDTH, mode: str = "RGBA") -> Image.Image:
+    """Decoded, converted and resized scan for the annotation canvas.
+
+    Cached per (scan hash, width, mode) so Streamlit reruns of the annotation
+    section neither decode nor resample the scan again. The returned image is
+    shared - callers must not draw on it.
+    """
+    from core.archive_store import resolve_path
+
+    key = _background_key(scan_path, max_width, mode)
+    with _bg_lock:
+        entry = _bg_cache.get(key)
+        if entry is not None:
+            _bg_cache.move_to_end(key)
+            _bg_stats["hits"] += 1
+            return entry["image"]
+        _bg_stats["misses"] += 1
+    with Image.open(resolve_path(scan_path)) as img:
+        prepared = img.convert(mode)
+    size = canvas_size(prepared.size, max_width)
+    if size != prepared.size:
+        prepared = prepared.resize(size)
+    entry = {"image": prepared, "md5": hashlib.md5(prepared.tobytes()).hexdigest(), "png": None}
+    with _bg_lock:
+        _bg_cache[key] = entry
+        while len(_bg_cache) > CANVAS_BG_CACHE_ENTRIES:
+            _bg_cache.popitem(last=False)
+    return prepared
+
+
+def _encoded(entry: Dict) -> bytes:
+    """PNG bytes of a cached background, encoded on first use."""
+    if entry["png"] is None:
+        buf = io.BytesIO()
+        entry["image"].save(buf, format="PNG")
+        entry["png"] = buf.getvalue()
+    return entry["png"]
+
+
+def canvas_background_png(
+    scan_path: str, max_width: int = CANVAS_MAX_WIDTH, mode: str = "RGBA"
+) -> Tuple[bytes, str, Tuple[int, int]]:
+    """(PNG bytes, md5 of the pixels, size) of canvas_background(), encoded once per cache entry.
+
+    core.annotation_canvas publishes these bytes as the canvas background.
+    """
+    canvas_background(scan_path, max_width, mode)
+    with _bg_lock:
+        entry = _bg_cache.get(_background_key(scan_path, max_width, mode))
+    return _encoded(entry), entry["md5"], entry["image"].size
+
+
+def canvas_background_cache_info() -> Dict:
+    with _bg_lock:
+        return {
+            "entries": len(_bg_cache),
+            "max_entries": CANVAS_BG_CACHE_ENTRIES,
+            "encoded": sum(1 for e in _bg_cache.values() if e["png"] is not None),
+            **_bg_stats,
+        }
+
+
+def _color(value, opacity: float = 1.0):
+    """Parse a Fabric colour ("#rrggbb", "rgb(...)", "rgba(...)") into an RGBA tuple."""
+    if not value or value == "transparent":
+        return None
+    value = value.strip()
+    if value.startswith("#"):
+        hexv = value[1:]
+        if len(hexv) in (3, 4):
+            hexv = "".join(c * 2 for c in hexv)
+        r, g, b = (int(hexv[i:i + 2], 16) for i in (0, 2, 4))
+        a = int(hexv[6:8], 16) / 255.0 if len(hexv) == 8 else 1.0
+    else:
+        m = _RGBA_RE.match(value)
+        if not m:
+            return None
+        parts = [p.strip() for p in m.group(1).split(",")]
+        r, g, b = (int(float(p)) for p in parts[:3])
+        a = float(parts[3]) if len(parts) > 3 else 1.0
+    alpha = max(0, min(255, int(round(a * opacity * 255))))
+    return (r, g, b, alpha) if alpha else None
+
+
+def _quad(p0, p1, p2, steps: int = 8) -> List[Tuple[float, float]]:
+    return [
+        (
+            (1 - t) ** 2 * p0[0] + 2 * (1 - t) * t * p1[0] + t ** 2 * p2[0],
+            (1 - t) ** 2 * p0[1] + 2 * (1 - t) * t * p1[1] + t ** 2 * p2[1],
+        )
+        for t in (i / steps for i in range(1, steps + 1))
+    ]
+
+
+def _path_points(commands) -> List[List[Tuple[float, float]]]:
+    """Flatten Fabric path commands (M/L/Q/C/Z) into polylines."""
+    lines: List[List[Tuple[float, float]]] = []
+    current: List[Tuple[float, float]] = []
+    pos = (0.0, 0.0)
+    for cmd in commands or []:
+        op, args = cmd[0].upper(), [float(a) for a in cmd[1:]]
+        if op == "M":
+            if len(current) > 0:
+                lines.append(current)
+            pos = (args[0], args[1])
+            current = [pos]
+        elif op == "L":
+            pos = (args[0], args[1])
+            current.append(pos)
+        elif op == "Q":
+            current.extend(_quad(pos, (args[0], args[1]), (args[2], args[3])))
+            pos = (args[2], args[3])
+        elif op == "C":
+            p0, p1, p2, p3 = pos, (args[0], args[1]), (args[2], args[3]), (args[4], args[5])
+            for i in range(1, 9):
+                t = i / 8
+                current.append((
+                    (1 - t) ** 3 * p0[0] + 3 * (1 - t) ** 2 * t * p1[0] + 3 * (1 - t) * t ** 2 * p2[0] + t ** 3 * p3[0],
+                    (1 - t) ** 3 * p0[1] + 3 * (1 - t) ** 2 * t * p1[1] + 3 * (1 - t) * t ** 2 * p2[1] + t ** 3 * p3[1],
+                ))
+            pos = p3
+        elif op == "Z" and current:
+            current.append(current[0])
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _transform(obj: dict):
+    """Return a function mapping object-local points (relative to its centre) to canvas pixels."""
+    sx = float(obj.get("scaleX", 1) or 1) * (-1 if obj.get("flipX") else 1)
+    sy = float(obj.get("scaleY", 1) or 1) * (-1 if obj.get("flipY") else 1)
+    angle = math.radians(float(obj.get("angle", 0) or 0))
+    cos_a, sin_a = math.cos(angle), math.sin(angle)
+    sw = 0.0 if obj.get("strokeUniform") else float(obj.get("strokeWidth", 0) or 0) if obj.get("stroke") else 0.0
+    dim_w = (float(obj.get("width", 0) or 0) + sw) * abs(sx)
+    dim_h = (float(obj.get("height", 0) or 0) + sw) * abs(sy)
+    origin_x = {"left": 0.5, "center": 0.0, "right": -0.5}.get(obj.get("originX", "left"), 0.5)
+    origin_y = {"top": 0.5, "center": 0.0, "bottom": -0.5}.get(obj.get("originY", "top"), 0.5)
+    ox, oy = origin_x * dim_w, origin_y * dim_h
+    cx = float(obj.get("left", 0) or 0) + ox * cos_a - oy * sin_a
+    cy = float(obj.get("top", 0) or 0) + ox * sin_a + oy * cos_a
+
+    def apply(x: float, y: float) -> Tuple[float, float]:
+        x, y = x * sx, y * sy
+        return cx + x * cos_a - y * sin_a, cy + x * sin_a + y * cos_a
+
+    return apply
+
+
+def _draw_object(draw: ImageDraw.ImageDraw, obj: dict, scale: Tuple[float, float] = (1.0, 1.0)) -> None:
+    """Draw one object; ``scale`` maps canvas pixels to the target image's pixels."""
+    kind = obj.get("type")
+    opacity = float(obj.get("opacity", 1) if obj.get("opacity") is not None else 1)
+    stroke = _color(obj.get("stroke"), opacity)
+    fill = _color(obj.get("fill"), opacity)
+    width = float(obj.get("strokeWidth", 1) or 1) * abs(float(obj.get("scaleX", 1) or 1))
+    width = max(1, int(round(width * (scale[0] + scale[1]) / 2)))
+    transform = _transform(obj)
+
+    def to_canvas(x: float, y: float) -> Tuple[float, float]:
+        cx, cy = transform(x, y)
+        return cx * scale[0], cy * scale[1]
+    w, h = float(obj.get("width", 0) or 0), float(obj.get("height", 0) or 0)
+
+    def stroke_line(points):
+        if not stroke or not points:
+            return
+        if len(points) > 1:
+            draw.line(points, fill=stroke, width=width, joint="curve")
+        if obj.get("strokeLineCap", "round") == "round":
+            r = width / 2.0
+            for x, y in (points[0], points[-1]):
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=stroke)
+
+    if kind == "path":
+        polylines = _path_points(obj.get("path"))
+        xs = [x for line in polylines for x, _ in line]
+        ys = [y for line in polylines for _, y in line]
+        if not xs:
+            return
+        # Path coordinates are absolute at creation time; Fabric re-centres them on pathOffset
+        off_x, off_y = (min(xs) + max(xs)) / 2.0, (min(ys) + max(ys)) / 2.0
+        for line in polylines:
+            stroke_line([to_canvas(x - off_x, y - off_y) for x, y in line])
+    elif kind == "line":
+        x_mult = -1 if float(obj.get("x1", 0)) <= float(obj.get("x2", 0)) else 1
+        y_mult = -1 if float(obj.get("y1", 0)) <= float(obj.get("y2", 0)) else 1
+        stroke_line([to_canvas(x_mult * w / 2, y_mult * h / 2), to_canvas(-x_mult * w / 2, -y_mult * h / 2)])
+    elif kind == "rect":
+        corners = [to_canvas(x, y) for x, y in ((-w / 2, -h / 2), (w / 2, -h / 2), (w / 2, h / 2), (-w / 2, h / 2))]
+        if fill:
+            draw.polygon(corners, fill=fill)
+        stroke_line(corners + [corners[0]])
+    elif kind in ("circle", "ellipse"):
+        rx = float(obj.get("radius", 0) or 0) if kind == "circle" else float(obj.get("rx", 0) or 0)
+        ry = rx if kind == "circle" else float(obj.get("ry", 0) or 0)
+        ring = [to_canvas(rx * math.cos(t), ry * math.sin(t)) for t in (2 * math.pi * i / 72 for i in range(73))]
+        if fill:
+            draw.polygon(ring, fill=fill)
+        stroke_line(ring)
+
+
+def render_overlay(fabric: dict, size: Tuple[int, int]) -> Image.Image:
+    """Rasterise Fabric canvas JSON (freedraw paths, lines, rects, circles) onto a transparent layer."""
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+    for obj in (fabric or {}).get("objects", []):
+        if obj.get("visible") is False:
+            continue
+        # Each object gets its own layer so translucent fills blend like on the canvas
+        layer = Image.new("RGBA", size, (0, 0, 0, 0))
+        _draw_object(ImageDraw.Draw(layer), obj)
+        overlay.alpha_composite(layer)
+    return overlay
+
+
+def render_object_masks(
+    fabric: dict, size: Tuple[int, int], canvas: Tuple[int, int] | None = None
+) -> List[Tuple[str, "np.ndarray"]]:
+    """Binary mask (H x W bool) of every visible object, as (object type, mask).
+
+    ``canvas`` is the size the objects were drawn at (default ``size``); the
+    coordinates and stroke widths are scaled to ``size`` before rasterising.
+    """
+    import numpy as np
+
+    canvas = canvas or size
+    scale = (size[0] / canvas[0], size[1] / canvas[1])
+    masks = []
+    for obj in (fabric or {}).get("objects", []):
+        if obj.get("visible") is False:
+            continue
+        layer = Image.new("RGBA", size, (0, 0, 0, 0))
+        _draw_object(ImageDraw.Draw(layer), obj, scale)
+        mask = np.asarray(layer.getchannel("A")) > 0
+        if mask.any():
+            masks.append((obj.get("type") or "object", mask))
+    return masks
+
+
+def render_composite(scan_path: str, fabric: dict) -> Image.Image:
+    """Scan (at canvas size) with the annotation drawn on top."""
+    with Image.open(scan_path) as img:
+        base = img.convert("RGBA")
+    size = canvas_size(base.size)
+    if size != base.size:
+        base = base.resize(size)
+    return Image.alpha_composite(base, render_overlay(fabric, size))
+
+
+def _prune_cache() -> None:
+    try:
+        entries = [e for e in os.scandir(COMPOSITE_DIR) if e.is_file() and e.name.endswith(".png")]
+    except FileNotFoundError:
+        return
+    if len(entries) <= COMPOSITE_CACHE_FILES:
+        return
+    # Hits touch the file (atime is not updated on noatime/relatime mounts)
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - COMPOSITE_CACHE_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def cached_composite(scan_path: str, json_path: str) -> str | None:
+    """Path of the composite PNG for (scan, annotation JSON), rendering it on first use."""
+    from core.archive_store import resolve_path
+
+    try:
+        with open(json_path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    key = hashlib.sha256(raw + b"\0" + scan_path.replace(os.sep, "/").encode()).hexdigest()[:24]
+    dest = os.path.join(COMPOSITE_DIR, f"{key}.png")
+    try:
+        os.utime(dest)  # hit: mark most recently used for _prune_cache
+        return dest
+    except FileNotFoundError:
+        pass
+    local_scan = resolve_path(scan_path)
+    if not local_scan or not os.path.exists(local_scan):
+        return None
+    try:
+        composite = render_composite(local_scan, json.loads(raw))
+    except Exception:
+        return None
+    with _lock:
+        os.makedirs(COMPOSITE_DIR, exist_ok=True)
+        tmp = f"{dest}.{uuid.uuid4().hex}.part"  # unique across processes too
+        composite.save(tmp, format="PNG")
+        os.replace(tmp, dest)
+        _prune_cache()
+    return dest
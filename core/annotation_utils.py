@@ -3,12 +3,21 @@ import hashlib
 import glob
 from typing import Tuple, List
 
-from core.database import BASE_DIR
+from sqlalchemy.exc import OperationalError
+
+from core.database import BASE_DIR, get_db_context
+from core.time_utils import now_utc
 
 ANNOTATION_DIR = os.path.join(BASE_DIR, "data", "uploads", "annotations")
+LEGACY_SCAN_HASH = "legacy"
+
+_dir_ready = False
 
 def ensure_annotation_dir() -> str:
-    os.makedirs(ANNOTATION_DIR, exist_ok=True)
+    global _dir_ready
+    if not _dir_ready:
+        os.makedirs(ANNOTATION_DIR, exist_ok=True)
+        _dir_ready = True
     return ANNOTATION_DIR
 
 def _scan_hash(scan_path: str | None) -> str:
@@ -20,6 +29,19 @@ def _scan_hash(scan_path: str | None) -> str:
     except Exception:
         return "nohash"
 
+def _rel(path: str | None) -> str | None:
+    """Project-relative, forward-slash form stored in the annotations table."""
+    if not path:
+        return None
+    if os.path.isabs(path):
+        path = os.path.relpath(path, BASE_DIR)
+    return path.replace(os.sep, "/")
+
+def _abs(path: str | None) -> str | None:
+    if not path:
+        return None
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, *path.split("/"))
+
 def get_annotation_paths(visit) -> Tuple[str, str]:
     """Return (img_path, json_path) for the current visit & scan.
 
@@ -35,27 +57,113 @@ def get_annotation_paths(visit) -> Tuple[str, str]:
         os.path.join(ANNOTATION_DIR, base_name + ".json"),
     )
 
-def list_all_visit_annotation_files(visit) -> List[str]:
-    """List all annotation files (legacy + hashed) for a visit regardless of scan hash."""
-    ensure_annotation_dir()
+def record_annotation(visit, img_path: str | None, json_path: str | None, author: str | None = None) -> None:
+    """Index a just-saved annotation (one row per visit + scan, replaced on re-save).
+
+    The saved canvas JSON is also appended to the annotation's revision
+    history (services.annotation_revision_service).
+    """
+    import json
+    from models.annotation import Annotation
+    from services.annotation_revision_service import add_revision
+
+    scan_hash = _scan_hash(getattr(visit, "scan_path", None))
+    size = 0
+    for p in (img_path, json_path):
+        try:
+            size += os.path.getsize(p) if p else 0
+        except OSError:
+            pass
+    with get_db_context() as db:
+        row = (
+            db.query(Annotation)
+            .filter(Annotation.visit_id == visit.id, Annotation.scan_hash == scan_hash)
+            .first()
+        ) or Annotation(visit_id=visit.id, scan_hash=scan_hash)
+        row.image_path = _rel(img_path)
+        row.json_path = _rel(json_path)
+        row.size_bytes = size
+        row.saved_at = now_utc()
+        row.author = author
+        db.add(row)
+        if json_path:
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    add_revision(db, visit.id, scan_hash, json.load(f), author=author)
+            except (OSError, ValueError, OperationalError):
+                pass  # unreadable JSON, or history table not created yet
+        db.commit()
+
+def _file_annotation(visit) -> Tuple[str | None, str | None] | None:
+    # Pre-index fallback: the file saved under the visit's name, if any
+    img_path, json_path = get_annotation_paths(visit)
+    has_img, has_json = os.path.exists(img_path), os.path.exists(json_path)
+    if not (has_img or has_json):
+        return None
+    return (img_path if has_img else None), (json_path if has_json else None)
+
+def find_annotation(visit) -> Tuple[str | None, str | None] | None:
+    """Return (img_path, json_path) of the annotation for the visit's current scan, or None.
+
+    Files without an index row (saved before the table existed, or not yet
+    backfilled) are still found on disk.
+    """
+    from models.annotation import Annotation
+
+    scan_hash = _scan_hash(getattr(visit, "scan_path", None))
+    try:
+        with get_db_context() as db:
+            row = (
+                db.query(Annotation.image_path, Annotation.json_path)
+                .filter(Annotation.visit_id == visit.id, Annotation.scan_hash == scan_hash)
+                .first()
+            )
+    except OperationalError:
+        # annotations table not created yet
+        return _file_annotation(visit)
+    if row is None:
+        return _file_annotation(visit)
+    return _abs(row[0]), _abs(row[1])
+
+def _glob_visit_annotation_files(visit) -> List[str]:
+    # Pre-index fallback (annotations table not created/backfilled yet)
     patient_code = getattr(getattr(visit, "patient", None), "patient_id", "PUNK")
-    legacy_png = os.path.join(ANNOTATION_DIR, f"visit_{visit.id}.png")
-    legacy_json = os.path.join(ANNOTATION_DIR, f"visit_{visit.id}.json")
-    pattern = os.path.join(ANNOTATION_DIR, f"ann_{patient_code}_{visit.visit_id}_*.png")
-    pattern_json = os.path.join(ANNOTATION_DIR, f"ann_{patient_code}_{visit.visit_id}_*.json")
     files = []
-    files.extend(glob.glob(pattern))
-    files.extend(glob.glob(pattern_json))
-    if os.path.exists(legacy_png):
-        files.append(legacy_png)
-    if os.path.exists(legacy_json):
-        files.append(legacy_json)
+    for ext in (".png", ".json"):
+        files.extend(glob.glob(os.path.join(ANNOTATION_DIR, f"ann_{patient_code}_{visit.visit_id}_*{ext}")))
+        legacy = os.path.join(ANNOTATION_DIR, f"visit_{visit.id}{ext}")
+        if os.path.exists(legacy):
+            files.append(legacy)
     return files
 
+def list_all_visit_annotation_files(visit) -> List[str]:
+    """List all annotation files (legacy + hashed) for a visit regardless of scan hash.
+
+    Visits with no index rows fall back to the directory glob, so files not
+    yet backfilled are still listed (and deleted).
+    """
+    from models.annotation import Annotation
+
+    try:
+        with get_db_context() as db:
+            rows = (
+                db.query(Annotation.image_path, Annotation.json_path)
+                .filter(Annotation.visit_id == visit.id)
+                .all()
+            )
+    except OperationalError:
+        # annotations table not created yet
+        return _glob_visit_annotation_files(visit)
+    if not rows:
+        return _glob_visit_annotation_files(visit)
+    return [_abs(p) for row in rows for p in row if p]
+
 def delete_all_visit_annotations(visit) -> int:
-    """Delete all annotation files for a visit (legacy + hashed).
+    """Delete all annotation files for a visit (legacy + hashed), their index rows and history.
     Returns count of deleted files.
     """
+    from models.annotation import Annotation
+
     deleted = 0
     for f in list_all_visit_annotation_files(visit):
         try:
@@ -63,4 +171,53 @@ def delete_all_visit_annotations(visit) -> int:
             deleted += 1
         except Exception:
             pass
+    try:
+        from services.annotation_revision_service import delete_revisions
+
+        with get_db_context() as db:
+            db.query(Annotation).filter(Annotation.visit_id == visit.id).delete()
+            delete_revisions(db, [visit.id])
+            db.commit()
+    except OperationalError:
+        pass  # annotations / history tables not created yet
     return deleted
+
+def annotation_composite(visit) -> str | None:
+    """Return a readable PNG of the scan with the visit's annotation drawn on it.
+
+    Annotations saved before vector-only storage keep their pre-rendered
+    composite; otherwise the Fabric JSON is rasterised once and cached
+    (core.annotation_render).
+    """
+    from core.archive_store import resolve_path
+    from core.annotation_render import cached_composite
+
+    found = find_annotation(visit)
+    if not found:
+        return None
+    img_path, json_path = found
+    if img_path:
+        local = resolve_path(img_path)
+        if local and os.path.exists(local):
+            return local
+    scan_path = getattr(visit, "scan_path", None)
+    if not json_path or not scan_path:
+        return None
+    return cached_composite(scan_path, json_path)
+
+def annotation_history(visit) -> List[dict]:
+    """Saved revisions of the annotation for the visit's current scan, newest first."""
+    from services.annotation_revision_service import revision_history
+
+    try:
+        with get_db_context() as db:
+            return revision_history(db, visit.id, _scan_hash(getattr(visit, "scan_path", None)))
+    except Exception:
+        return []
+
+def annotation_revision(visit, revision: int | None = None) -> dict | None:
+    """Canvas JSON of one saved revision (latest if None)."""
+    from services.annotation_revision_service import load_revision
+
+    with get_db_context() as db:
+        return load_revision(db, visit.id, _scan_hash(getattr(visit, "scan_path", None)), revision)
@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Tuple
+
+from core.annotation_utils import get_annotation_paths, record_annotation
+
+# Annotation saves run on a background writer so the doctor's page returns
+# immediately. submit_annotation_save() hands back a token; the page keeps it
+# in session state and reads save_status(token) on the next rerun. Saves for
+# the same visit that are still waiting are coalesced: only the newest canvas
+# state is written and the older tokens report "superseded".
+# save_annotation_now() goes through the same queue but waits for its write,
+# for actions whose next render must already see the file (revision restore).
+STATUS_KEEP = 512  # most recent tokens whose state can still be looked up
+
+# One worker keeps writes for a visit in submission order.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="annotation-writer")
+_lock = threading.Lock()
+_queued: Dict[int, Dict] = {}  # visit pk -> newest job not yet started
+_status: "OrderedDict[str, Dict]" = OrderedDict()
+
+
+def _set_status(token: str, state: str, error: str | None = None) -> None:
+    with _lock:
+        entry = _status.setdefault(token, {})
+        entry["state"] = state
+        entry["error"] = error
+        _status.move_to_end(token)
+        while len(_status) > STATUS_KEEP:
+            _status.popitem(last=False)
+
+
+def _write(job: Dict) -> None:
+    tmp = f"{job['json_path']}.{job['token']}.part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job["fabric"], f)
+    os.replace(tmp, job["json_path"])  # readers never see a half-written file
+    if os.path.exists(job["img_path"]):
+        os.remove(job["img_path"])  # stale pre-rendered composite
+    visit = SimpleNamespace(id=job["visit_id"], scan_path=job["scan_path"])
+    record_annotation(visit, None, job["json_path"], author=job["author"])
+
+
+def _run(visit_id: int) -> None:
+    with _lock:
+        job = _queued.pop(visit_id, None)
+    if job is None:
+        return  # coalesced into a save that already ran
+    _set_status(job["token"], "saving")
+    try:
+        _write(job)
+    except Exception as e:
+        _set_status(job["token"], "failed", str(e))
+    else:
+        _set_status(job["token"], "saved")
+
+
+def _submit(visit, fabric: Dict, author: str | None, json_path: str | None) -> Tuple[str, Future]:
+    img_path, default_json = get_annotation_paths(visit)
+    token = uuid.uuid4().hex
+    job = {
+        "token": token,
+        "visit_id": visit.id,
+        "scan_path": getattr(visit, "scan_path", None),
+        "img_path": img_path,
+        "json_path": json_path or default_json,
+        "fabric": fabric,
+        "author": author,
+    }
+    with _lock:
+        previous = _queued.get(visit.id)
+        _queued[visit.id] = job
+    if previous is not None:
+        _set_status(previous["token"], "superseded")
+    _set_status(token, "queued")
+    return token, _executor.submit(_run, visit.id)
+
+
+def submit_annotation_save(visit, fabric: Dict, author: str | None = None, json_path: str | None = None) -> str:
+    """Queue the canvas JSON for the visit's current scan and return a save token.
+
+    Paths are resolved here, on the caller's thread, so the worker never
+    touches the (session-bound) visit object.
+    """
+    token, _ = _submit(visit, fabric, author, json_path)
+    return token
+
+
+def save_annotation_now(visit, fabric: Dict, author: str | None = None, json_path: str | None = None) -> str:
+    """Like submit_annotation_save(), but return only once the save has run.
+
+    The job is queued behind saves already submitted for the visit (older
+    waiting ones are superseded), so a save still in flight cannot land after
+    it. The token's state is "saved" or "failed" on return.
+    """
+    token, future = _submit(visit, fabric, author, json_path)
+    future.result()
+    return token
+
+
+def save_status(token: str | None) -> Dict | None:
+    """{"state": queued|saving|saved|failed|superseded, "error"} or None if unknown."""
+    if not token:
+        return None
+    with _lock:
+        entry = _status.get(token)
+        return dict(entry) if entry else None
+
+
+def wait_for_saves(timeout: float | None = None) -> bool:
+    """Block until every save submitted so far has been written (scripts, shutdown)."""
+    try:
+        _executor.submit(lambda: None).result(timeout=timeout)
+    except Exception:
+        return False
+    return True
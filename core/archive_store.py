@@ -0,0 +1,124 @@
+import os
+import threading
+import uuid
+import zipfile
+
+from core.database import BASE_DIR, get_db_context
+from core.scan_store import normalize_scan_path
+
+# Monthly archives of completed-visit scans and annotation composites, plus a
+# small on-disk LRU of files restored from them for viewing.
+ARCHIVE_DIR = os.path.join(BASE_DIR, "data", "archive")
+RESTORE_DIR = os.path.join(BASE_DIR, "data", "cache", "restored")
+RESTORE_CACHE_FILES = int(os.getenv("ARCHIVE_RESTORE_CACHE", "32"))
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "restores": 0, "evictions": 0}  # this process only
+
+
+def archive_key(path: str) -> str:
+    """Return the key a file is archived under: project-relative, forward slashes."""
+    path = normalize_scan_path(path)
+    if os.path.isabs(path):
+        path = os.path.relpath(path, BASE_DIR)
+    return path.replace(os.sep, "/")
+
+
+def _abs(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+def _restored_files():
+    try:
+        with os.scandir(RESTORE_DIR) as it:
+            return [e for e in it if e.is_file() and not e.name.endswith(".part")]
+    except FileNotFoundError:
+        return []
+
+
+def _prune_restored() -> None:
+    """Keep the RESTORE_CACHE_FILES most recently used restored files.
+
+    Recency is the file mtime (touched on every hit), so copies restored by
+    any process - pages, scripts, earlier runs - share one bound.
+    """
+    entries = _restored_files()
+    if len(entries) <= RESTORE_CACHE_FILES:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[:len(entries) - RESTORE_CACHE_FILES]:
+        try:
+            os.remove(entry.path)
+            _stats["evictions"] += 1
+        except OSError:
+            pass  # already evicted by another process
+
+
+def resolve_path(path: str | None) -> str | None:
+    """Return a readable local path for a stored file.
+
+    Files still on disk are returned unchanged. Archived files are extracted
+    byte-for-byte into the restore cache (kept for the most recent
+    RESTORE_CACHE_FILES files). Unknown paths are returned unchanged so
+    callers keep their usual "file missing" handling.
+    """
+    if not path:
+        return path
+    if os.path.exists(path) or os.path.exists(normalize_scan_path(path)):
+        return path
+    key = archive_key(path)
+    dest = os.path.join(RESTORE_DIR, key.replace("/", "__"))
+
+    try:
+        os.utime(dest)
+        with _lock:
+            _stats["hits"] += 1
+        return dest
+    except FileNotFoundError:
+        pass
+
+    try:
+        from models.archived_file import ArchivedFile
+        with get_db_context() as db:
+            row = db.query(ArchivedFile).filter(ArchivedFile.path == key).first()
+            if not row:
+                return path
+            archive, member = row.archive, row.member
+        with zipfile.ZipFile(_abs(archive)) as zf:
+            data = zf.read(member)  # CRC-checked by zipfile
+    except Exception:
+        return path
+
+    os.makedirs(RESTORE_DIR, exist_ok=True)
+    tmp = f"{dest}.{uuid.uuid4().hex}.part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+    with _lock:
+        _stats["restores"] += 1
+        _prune_restored()
+    return dest
+
+
+def restore_cache_info() -> dict:
+    with _lock:
+        return {"files": len(_restored_files()), "max_files": RESTORE_CACHE_FILES, **_stats}
+
+
+def append_to_archive(archive_path: str, member: str, data: bytes) -> tuple[str, int]:
+    """Append bytes to a zip archive and return (member name, compressed size).
+
+    The original bytes are stored with LZMA, which is lossless: restoring
+    gives back the exact file, so content-addressed scans keep matching
+    their sha256. A numeric suffix keeps names unique when a path is
+    archived again after being rewritten.
+    """
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    with zipfile.ZipFile(archive_path, "a", compression=zipfile.ZIP_LZMA) as zf:
+        names = set(zf.namelist())
+        name, n = member, 1
+        while name in names:
+            n += 1
+            name = f"{member}.{n}"
+        zf.writestr(name, data)
+        return name, zf.getinfo(name).compress_size
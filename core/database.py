@@ -1,6 +1,9 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import functools
+import threading
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 from contextlib import contextmanager
 
 # Path: project_root/data/stroke.db
@@ -9,24 +12,178 @@ DB_PATH = os.path.join(BASE_DIR, "data", "stroke.db")
 
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# PRAGMA profiles applied to every new SQLite connection. "current" is what
+# the app ran with before (rollback journal, SQLite defaults); the others use
+# WAL so readers never block the writer. Any single PRAGMA can be overridden
+# with SQLITE_PRAGMA_<NAME>, e.g. SQLITE_PRAGMA_SYNCHRONOUS=FULL.
+SQLITE_PROFILES = {
+    "current": {},
+    "safe": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "foreign_keys": "ON",
+    },
+    "balanced": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # durable across app crashes; WAL fsyncs on checkpoint
+        "cache_size": -65536,  # KiB when negative: 64 MiB page cache per connection
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "fast": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "OFF",  # an OS crash can lose the last transactions
+        "cache_size": -262144,
+        "mmap_size": 1073741824,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "balanced")
+# busy_timeout goes first so switching journal_mode waits for other connections
+_PRAGMA_ORDER = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "foreign_keys")
+
+
+def sqlite_pragmas(profile: str | None = None) -> dict:
+    """PRAGMA name -> value for a profile, with SQLITE_PRAGMA_<NAME> overrides applied."""
+    profile = profile or SQLITE_PROFILE
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}; expected one of {', '.join(SQLITE_PROFILES)}.")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in _PRAGMA_ORDER:
+        override = os.getenv(f"SQLITE_PRAGMA_{name.upper()}")
+        if override:
+            pragmas[name] = override
+    return {name: pragmas[name] for name in _PRAGMA_ORDER if name in pragmas}
+
+
+def make_engine(url: str = DATABASE_URL, profile: str | None = None):
+    """SQLAlchemy engine whose connections get the profile's PRAGMAs on connect."""
+    pragmas = sqlite_pragmas(profile)
+    eng = create_engine(url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(eng, "connect")
+    def _apply_pragmas(dbapi_conn, _record):
+        apply_pragmas(dbapi_conn, pragmas)
+
+    return eng
+
+
+def apply_pragmas(dbapi_conn, pragmas: dict | None = None) -> None:
+    """Run the PRAGMAs (default: the active profile's) on a raw sqlite3 connection."""
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
 # Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+engine = make_engine(DATABASE_URL)
+
+_stats_lock = threading.Lock()
+_session_stats = {"opened": 0, "closed": 0, "scopes": 0, "unscoped": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _session_stats[key] += 1
+
+
+class TrackedSession(Session):
+    """Session that feeds the open/closed counters reported by session_stats()."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._tracked_open = True
+        _count("opened")
+
+    def close(self) -> None:
+        super().close()
+        if self._tracked_open:
+            self._tracked_open = False
+            _count("closed")
+
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(class_=TrackedSession, autocommit=False, autoflush=False, bind=engine)
+
+# Session of the page run in progress (see request_session)
+_request_db: ContextVar[Session | None] = ContextVar("request_db", default=None)
 
 # Base class for all models
 Base = declarative_base()
 
 
+@contextmanager
+def request_session():
+    """
+    One session per Streamlit script run.
+
+    Opened when the page starts, shared by every request_db() / get_db() /
+    get_db_context() call made during the run, and closed when the run ends
+    - including st.stop(), st.rerun() and st.switch_page(), which unwind
+    through here as exceptions. Nested scopes reuse the outer session.
+    """
+    current = _request_db.get()
+    if current is not None:
+        yield current
+        return
+    db = SessionLocal()
+    token = _request_db.set(db)
+    _count("scopes")
+    try:
+        yield db
+    finally:
+        _request_db.reset(token)
+        db.close()
+
+
+def request_scoped(func):
+    """Decorator for a page's main(): run it inside request_session()."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with request_session():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def request_db() -> Session:
+    """
+    The current run's session. Outside a request scope a new session is
+    returned that the caller must close; these are counted as "unscoped".
+    """
+    db = _request_db.get()
+    if db is None:
+        _count("unscoped")
+        db = SessionLocal()
+    return db
+
+
+def session_stats() -> dict:
+    """Session leak counters for this process."""
+    with _stats_lock:
+        stats = dict(_session_stats)
+    stats["open"] = stats["opened"] - stats["closed"]
+    stats["pool_checked_out"] = engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else None
+    return stats
+
+
 def get_db():
     """
     Generator function used with FastAPI-style dependencies.
-    Not used by Streamlit, but we keep it for compatibility.
+    Inside a request scope it yields the run's shared session.
     """
+    shared = _request_db.get()
+    if shared is not None:
+        yield shared
+        return
     db = SessionLocal()
     try:
         yield db
@@ -57,7 +214,18 @@ def get_db_context():
     Usage:
         with get_db_context() as db:
             result = db.query(Model).all()
+
+    Inside a request scope the run's shared session is used (and left open);
+    an exception rolls it back so the rest of the page can keep using it.
     """
+    shared = _request_db.get()
+    if shared is not None:
+        try:
+            yield shared
+        except Exception:
+            shared.rollback()
+            raise
+        return
     db = SessionLocal()
     try:
         yield db
@@ -3,6 +3,8 @@ import uuid
 import hashlib
 import streamlit as st
 
+from core.upload_io import write_atomic
+
 
 def generate_patient_id():
     """Returns a 4-digit style patient ID like P001, P002, P045."""
@@ -10,8 +12,12 @@ def generate_patient_id():
     return f"P{number.zfill(3)}"
 
 
-def save_uploaded_file(uploaded_file, folder_path):
-    """Saves an uploaded file to a directory and returns its full path."""
+def save_uploaded_file(uploaded_file, folder_path, max_bytes=None):
+    """Saves an uploaded file to a directory and returns its full path.
+
+    The file is streamed in chunks to a temp file and renamed into place, so
+    a crash never leaves a half-written file at the returned path.
+    """
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
@@ -19,8 +25,7 @@ def save_uploaded_file(uploaded_file, folder_path):
     filename = f"{uuid.uuid4().hex}{file_ext}"
     file_path = os.path.join(folder_path, filename)
 
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+    write_atomic(uploaded_file, file_path, max_bytes=max_bytes)
 
     return file_path
 
@@ -33,6 +38,18 @@ def hash_password(password: str) -> str:
 # -----------------------------
 # Sidebar helpers
 # -----------------------------
+def render_db_session_stats():
+    """Show DB session leak counters in the sidebar when DB_SESSION_STATS=1."""
+    if os.getenv("DB_SESSION_STATS", "0") not in ("1", "true", "yes"):
+        return
+    from core.database import session_stats
+    s = session_stats()
+    st.caption(
+        f"DB sessions: {s['opened']} opened / {s['closed']} closed ({s['open']} open), "
+        f"{s['scopes']} page runs, {s['unscoped']} unscoped, {s['pool_checked_out']} connections out"
+    )
+
+
 def hide_default_sidebar_nav():
     """Hide Streamlit's default multi-page navigation for a cleaner custom menu.
 
@@ -88,6 +105,7 @@ def render_technician_sidebar():
         if st.button("Logout", use_container_width=True):
             from core.session_manager import logout
             logout()
+        render_db_session_stats()
 
 
 def render_doctor_sidebar():
@@ -111,6 +129,7 @@ def render_doctor_sidebar():
         if st.button("Logout", use_container_width=True):
             from core.session_manager import logout
             logout()
+        render_db_session_stats()
 
 
 def render_patient_sidebar():
@@ -120,6 +139,7 @@ def render_patient_sidebar():
         if st.button("Logout", use_container_width=True):
             from core.session_manager import logout
             logout()
+        render_db_session_stats()
 
 
 # -----------------------------
@@ -138,3 +158,72 @@ def visit_code_display(visit_id: str | None) -> str:
     except Exception:
         pass
     return visit_id or "—"
+
+
+# -----------------------------
+# Search paging helpers
+# -----------------------------
+def search_offset(key: str, query: str) -> int:
+    """Current result offset for a search box; resets to 0 when the query changes."""
+    if st.session_state.get(f"{key}_query") != query:
+        st.session_state[f"{key}_query"] = query
+        st.session_state[f"{key}_offset"] = 0
+    return st.session_state.get(f"{key}_offset", 0)
+
+
+def render_search_pager(page: dict, key: str):
+    """Previous / Next buttons for a services.search_service result page."""
+    offset, limit = page["offset"], page["limit"]
+    if offset == 0 and not page["has_more"]:
+        return
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if offset > 0 and st.button("Previous", key=f"{key}_prev", use_container_width=True):
+            st.session_state[f"{key}_offset"] = max(0, offset - limit)
+            st.rerun()
+    with info_col:
+        st.caption(f"Results {offset + 1}–{offset + len(page['items'])}")
+    with next_col:
+        if page["has_more"] and st.button("Next", key=f"{key}_next", use_container_width=True):
+            st.session_state[f"{key}_offset"] = offset + limit
+            st.rerun()
+
+
+# -----------------------------
+# Keyset paging helpers
+# -----------------------------
+def keyset_cursor(key: str) -> str | None:
+    """Cursor of the page currently shown for a keyset-paginated list (None = first page).
+
+    The list starts again at the first page whenever it is entered from
+    elsewhere: unless the previous page run (see session_manager.require_role)
+    also showed this list, the stored cursors are dropped.
+    """
+    run = st.session_state.get("page_runs", 0)
+    if st.session_state.get(f"{key}_run") not in (run, run - 1):
+        st.session_state.pop(f"{key}_cursors", None)
+    st.session_state[f"{key}_run"] = run
+    stack = st.session_state.get(f"{key}_cursors") or [None]
+    return stack[-1]
+
+
+def render_keyset_pager(page: dict, key: str):
+    """Previous / Next buttons for a services.pagination page.
+
+    The cursors of the pages visited so far are kept in session state, so
+    "Previous" goes back without an OFFSET query.
+    """
+    stack = st.session_state.setdefault(f"{key}_cursors", [None])
+    if len(stack) == 1 and not page["next_cursor"]:
+        return
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if len(stack) > 1 and st.button("Previous", key=f"{key}_prev", use_container_width=True):
+            stack.pop()
+            st.rerun()
+    with info_col:
+        st.caption(f"Page {len(stack)}")
+    with next_col:
+        if page["next_cursor"] and st.button("Next", key=f"{key}_next", use_container_width=True):
+            stack.append(page["next_cursor"])
+            st.rerun()
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+# Cheap pre-inference checks. Everything is computed on one greyscale copy of
+# the image (downscaled to at most ANALYSIS_SIZE px on the long side) with
+# vectorised NumPy, so a check takes a few milliseconds even for large scans.
+ANALYSIS_SIZE = 512
+# "reject": refuse the upload with the reason; "flag": keep the scan but skip the model
+QUALITY_GATE_MODE = os.getenv("QUALITY_GATE_MODE", "reject").strip().lower()
+MIN_SIDE_PX = int(os.getenv("QUALITY_MIN_SIDE_PX", "64"))
+MIN_STD = float(os.getenv("QUALITY_MIN_STD", "2.0"))                  # blank frame
+MAX_DOMINANT_FRACTION = float(os.getenv("QUALITY_MAX_DOMINANT", "0.995"))
+MIN_SPREAD = float(os.getenv("QUALITY_MIN_SPREAD", "12"))             # p99 - p1 grey levels
+MIN_SHARPNESS = float(os.getenv("QUALITY_MIN_SHARPNESS", "2.0"))      # Laplacian variance
+
+_lock = threading.Lock()
+_stats = {"checked": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+
+def _grey_array(path: str) -> tuple:
+    """Load path as a float32 greyscale array; returns (array, (width, height))."""
+    with Image.open(path) as img:
+        size = img.size
+        img.draft("L", (ANALYSIS_SIZE, ANALYSIS_SIZE))  # JPEG: decode at reduced scale
+        img.load()  # raises OSError for truncated files
+        grey = img.convert("L")
+        if max(grey.size) > ANALYSIS_SIZE:
+            grey.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+        return np.asarray(grey, dtype=np.float32), size
+
+
+def image_metrics(arr: np.ndarray) -> dict:
+    """Histogram spread, blank-frame and blur statistics of a greyscale array."""
+    hist = np.bincount(arr.astype(np.uint8).ravel(), minlength=256)
+    cdf = np.cumsum(hist) / arr.size
+    p1 = int(np.searchsorted(cdf, 0.01))
+    p99 = int(np.searchsorted(cdf, 0.99))
+    # 4-neighbour Laplacian on the interior via slicing
+    lap = (
+        4.0 * arr[1:-1, 1:-1]
+        - arr[:-2, 1:-1] - arr[2:, 1:-1]
+        - arr[1:-1, :-2] - arr[1:-1, 2:]
+    )
+    return {
+        "mean": float(arr.mean()),
+        "std": float(arr.std()),
+        "dominant_fraction": float(hist.max() / arr.size),
+        "spread": float(p99 - p1),
+        "sharpness": float(lap.var()) if lap.size else 0.0,
+    }
+
+
+def assess_scan_quality(path: str) -> dict:
+    """Decide whether an image is worth sending to the model.
+
+    Returns
+    -------
+    dict
+        {"ok": bool, "reason": str, "metrics": dict, "elapsed_ms": float}
+    """
+    t0 = time.perf_counter()
+    reasons = []
+    metrics: dict = {}
+    try:
+        arr, (width, height) = _grey_array(path)
+        metrics = {"width": width, "height": height, **image_metrics(arr)}
+        if min(width, height) < MIN_SIDE_PX:
+            reasons.append(f"Image is too small ({width}x{height} px).")
+        if metrics["std"] < MIN_STD or metrics["dominant_fraction"] > MAX_DOMINANT_FRACTION:
+            reasons.append("Image appears blank (almost a single intensity).")
+        elif metrics["spread"] < MIN_SPREAD:
+            reasons.append("Image contrast is too low to analyse.")
+        elif metrics["sharpness"] < MIN_SHARPNESS:
+            reasons.append("Image is too blurred to analyse.")
+    except Exception:
+        reasons.append("Image could not be read (corrupt or truncated file).")
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    ok = not reasons
+    with _lock:
+        _stats["checked"] += 1
+        _stats["failed"] += int(not ok)
+        _stats["total_ms"] += elapsed_ms
+        _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+    return {"ok": ok, "reason": " ".join(reasons), "metrics": metrics, "elapsed_ms": elapsed_ms}
+
+
+def quality_gate_info() -> dict:
+    with _lock:
+        info = dict(_stats)
+    info["avg_ms"] = info["total_ms"] / info["checked"] if info["checked"] else 0.0
+    return info
@@ -0,0 +1,87 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# COCO run-length encoding for binary masks, byte-compatible with
+# pycocotools (mask.encode / mask.decode) without depending on it. Runs are
+# counted over the mask in column-major order starting with a run of zeros,
+# and the counts are packed into COCO's compact ASCII string.
+
+
+def rle_counts(mask: np.ndarray) -> List[int]:
+    """Alternating zero/one run lengths of ``mask`` in column-major order."""
+    flat = np.asarray(mask, dtype=bool).ravel(order="F")
+    if flat.size == 0:
+        return []
+    change = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    bounds = np.concatenate(([0], change, [flat.size]))
+    counts = np.diff(bounds).tolist()
+    if flat[0]:
+        counts.insert(0, 0)  # counts always start with the zero run
+    return counts
+
+
+def _counts_to_string(counts: List[int]) -> str:
+    out = []
+    for i, x in enumerate(counts):
+        if i > 2:
+            x -= counts[i - 2]
+        more = True
+        while more:
+            c = x & 0x1F
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            out.append(chr(c + 48))
+    return "".join(out)
+
+
+def _string_to_counts(s: str) -> List[int]:
+    counts: List[int] = []
+    p = 0
+    while p < len(s):
+        x = k = 0
+        more = True
+        while more:
+            c = ord(s[p]) - 48
+            x |= (c & 0x1F) << (5 * k)
+            more = bool(c & 0x20)
+            p += 1
+            k += 1
+            if not more and c & 0x10:
+                x |= -1 << (5 * k)
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+
+def encode(mask: np.ndarray) -> Dict:
+    """COCO compressed RLE: {"size": [h, w], "counts": str}."""
+    h, w = mask.shape[:2]
+    return {"size": [int(h), int(w)], "counts": _counts_to_string(rle_counts(mask))}
+
+
+def decode(rle: Dict) -> np.ndarray:
+    """Inverse of encode(); also accepts uncompressed (list) counts."""
+    h, w = rle["size"]
+    counts = rle["counts"] if isinstance(rle["counts"], list) else _string_to_counts(rle["counts"])
+    values = np.zeros(len(counts), dtype=bool)
+    values[1::2] = True
+    flat = np.repeat(values, counts)
+    return flat.reshape((w, h)).T
+
+
+def area(rle: Dict) -> int:
+    counts = rle["counts"] if isinstance(rle["counts"], list) else _string_to_counts(rle["counts"])
+    return int(sum(counts[1::2]))
+
+
+def bbox(mask: np.ndarray) -> Tuple[float, float, float, float]:
+    """COCO [x, y, width, height] of the mask's set pixels (zeros if empty)."""
+    ys = np.flatnonzero(mask.any(axis=1))
+    xs = np.flatnonzero(mask.any(axis=0))
+    if not len(xs):
+        return 0.0, 0.0, 0.0, 0.0
+    return float(xs[0]), float(ys[0]), float(xs[-1] - xs[0] + 1), float(ys[-1] - ys[0] + 1)
@@ -0,0 +1,51 @@
+import html
+import os
+
+import streamlit as st
+
+from core.media_server import MEDIA_PORT, ensure_server, signed_path
+from core.scan_store import normalize_scan_path
+
+# Scans and annotation composites are referenced by signed, content-hashed
+# URLs of the media server (core.media_server) instead of st.image, which
+# re-reads and re-hashes every file on every rerun and sends it without
+# cache headers. MEDIA_SERVER=0 goes back to st.image. MEDIA_PUBLIC_URL is
+# the server's address as the browser sees it (needed behind a proxy or
+# TLS); by default it is the app's host on MEDIA_PORT.
+MEDIA_SERVER = os.getenv("MEDIA_SERVER", "1") != "0"
+MEDIA_PUBLIC_URL = os.getenv("MEDIA_PUBLIC_URL", "").rstrip("/")
+
+
+def _base_url() -> str | None:
+    if MEDIA_PUBLIC_URL:
+        return MEDIA_PUBLIC_URL
+    headers = st.context.headers
+    host = headers.get("Host")
+    if not host:
+        return None
+    scheme = headers.get("X-Forwarded-Proto", "http")
+    return f"{scheme}://{host.rsplit(':', 1)[0]}:{MEDIA_PORT}"
+
+
+def image_html(url: str, caption: str | None = None) -> str:
+    cap = f'<figcaption style="text-align:center;font-size:0.875rem;opacity:0.6">{html.escape(caption)}</figcaption>' if caption else ""
+    return f'<figure style="margin:0"><img src="{html.escape(url)}" style="width:100%" loading="lazy"/>{cap}</figure>'
+
+
+def render_image(path: str | None, caption: str | None = None) -> None:
+    """Column-width image of a stored file (restored from the archive if needed).
+
+    Shows a short note instead when there is no file, and falls back to
+    st.image when the media server is off or cannot listen.
+    """
+    from core.archive_store import resolve_path
+
+    local = resolve_path(normalize_scan_path(path)) if path else None
+    if not local or not os.path.exists(local):
+        st.info(f"{caption or 'Image'} not available.")
+        return
+    base = _base_url() if MEDIA_SERVER else None
+    if base is None or not ensure_server():
+        st.image(local, caption=caption, use_column_width=True)
+        return
+    st.markdown(image_html(base + signed_path(path, local), caption), unsafe_allow_html=True)
@@ -0,0 +1,125 @@
+import hashlib
+import hmac
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from core.scan_store import normalize_scan_path, sha256_file
+
+# Scans, previews and annotation composites are served to the browser by a
+# small HTTP server next to Streamlit (one per app process), under
+# content-hashed, signed URLs:
+#
+#     <base>/m/<sha256><ext>?exp=<unix time>&sig=<hmac>
+#
+# Only a page run of a logged-in user issues URLs (core.media.render_image),
+# and a URL is only valid for files registered by such a run, until ``exp``.
+# ``exp`` is rounded up to the next MEDIA_URL_TTL boundary, so reruns within
+# a window issue the same URL and the browser keeps its cached copy
+# ("private, immutable"). The signing key is MEDIA_URL_SECRET, or a random
+# key per process (URLs then stop working when the app restarts, and the
+# page simply issues new ones).
+MEDIA_PORT = int(os.getenv("MEDIA_PORT", "8599"))
+MEDIA_BIND = os.getenv("MEDIA_BIND", "")  # all interfaces, like Streamlit
+MEDIA_URL_TTL = int(os.getenv("MEDIA_URL_TTL", "3600"))
+MEDIA_REGISTRY_ENTRIES = int(os.getenv("MEDIA_REGISTRY_ENTRIES", "4096"))
+_SECRET = (os.getenv("MEDIA_URL_SECRET") or "").encode() or os.urandom(32)
+
+_lock = threading.Lock()
+_registry: "OrderedDict[str, str]" = OrderedDict()  # sha256 -> stored path
+_digests: "OrderedDict[tuple, str]" = OrderedDict()  # (abs path, mtime_ns, size) -> sha256
+_server: ThreadingHTTPServer | None = None
+_started = False
+
+
+def _sign(name: str, exp: int) -> str:
+    return hmac.new(_SECRET, f"{name}:{exp}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _remember(cache: OrderedDict, key, value) -> None:
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > MEDIA_REGISTRY_ENTRIES:
+            cache.popitem(last=False)
+
+
+def content_digest(local: str) -> str:
+    """sha256 of a file, hashed once per (path, mtime, size) per process."""
+    st_result = os.stat(local)
+    key = (os.path.abspath(local), st_result.st_mtime_ns, st_result.st_size)
+    with _lock:
+        digest = _digests.get(key)
+    if digest is None:
+        digest = sha256_file(local)
+        _remember(_digests, key, digest)
+    return digest
+
+
+def signed_path(path: str, local: str, now: float | None = None) -> str:
+    """``/m/<sha256><ext>?exp=..&sig=..`` for a stored file (``local`` is its readable copy)."""
+    digest = content_digest(local)
+    name = digest + (os.path.splitext(local)[1].lower() or ".png")
+    _remember(_registry, digest, normalize_scan_path(path))
+    exp = (int((now or time.time()) // MEDIA_URL_TTL) + 2) * MEDIA_URL_TTL
+    return f"/m/{name}?exp={exp}&sig={_sign(name, exp)}"
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    server_version = "media"
+
+    def log_message(self, format, *args):  # noqa: A002 - quiet, Streamlit owns the console
+        pass
+
+    def do_GET(self):
+        from core.archive_store import resolve_path
+
+        url = urlsplit(self.path)
+        name = url.path.rsplit("/", 1)[-1]
+        query = parse_qs(url.query)
+        try:
+            exp = int(query["exp"][0])
+            sig = query["sig"][0]
+        except (KeyError, ValueError):
+            return self.send_error(403)
+        if not url.path.startswith("/m/") or exp < time.time() or not hmac.compare_digest(sig, _sign(name, exp)):
+            return self.send_error(403)
+        digest = os.path.splitext(name)[0]
+        with _lock:
+            stored = _registry.get(digest)
+        local = resolve_path(stored) if stored else None
+        if not local or not os.path.exists(local):
+            return self.send_error(404)
+
+        etag = f'"{digest}"'
+        self.send_response(304 if self.headers.get("If-None-Match") == etag else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"private, max-age={int(exp - time.time())}, immutable")
+        if self.headers.get("If-None-Match") == etag:
+            return self.end_headers()
+        with open(local, "rb") as f:
+            data = f.read()
+        self.send_header("Content-Type", mimetypes.guess_type(name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def ensure_server() -> bool:
+    """Start the media server once per process. False if it cannot listen (port taken)."""
+    global _server, _started
+    with _lock:
+        if not _started:
+            _started = True
+            try:
+                _server = ThreadingHTTPServer((MEDIA_BIND, MEDIA_PORT), _MediaHandler)
+            except OSError:
+                _server = None
+            else:
+                _server.daemon_threads = True
+                threading.Thread(target=_server.serve_forever, name="media-server", daemon=True).start()
+        return _server is not None
@@ -0,0 +1,283 @@
+"""Versioned schema migrations.
+
+Migrations are the ``v<NNNN>_<name>.py`` modules of this package, each with
+an ``upgrade(ctx)``; applied versions are recorded in ``schema_migrations``.
+A migration's schema changes and its version row commit in one transaction.
+Backfills (``ctx.backfill``) run in batches of MIGRATION_BATCH_SIZE rows,
+each committed with a checkpoint in ``migration_checkpoints`` so other
+connections can write in between and an interrupted run resumes. Every
+``upgrade()`` must be safe to re-run.
+"""
+import importlib
+import os
+import pkgutil
+import re
+import sqlite3
+import time
+from types import ModuleType
+from typing import Callable, Dict, List
+
+from core.database import DB_PATH, apply_pragmas
+from core.time_utils import now_utc
+
+BATCH_SIZE = max(1, int(os.getenv("MIGRATION_BATCH_SIZE", "1000")))
+BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", "0"))  # seconds between batches
+
+_MODULE_RE = re.compile(r"^v(\d{4})_(\w+)$")
+
+_BOOKKEEPING = (
+    """CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL,
+        duration_ms INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS migration_checkpoints (
+        version INTEGER NOT NULL,
+        step TEXT NOT NULL,
+        last_id INTEGER NOT NULL,
+        rows_done INTEGER NOT NULL,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (version, step)
+    )""",
+)
+
+
+class MigrationContext:
+    """Connection wrapper handed to a migration's upgrade()."""
+
+    def __init__(self, conn: sqlite3.Connection, version: int, batch_size: int = BATCH_SIZE, report=print):
+        self.conn = conn
+        self.version = version
+        self.batch_size = batch_size
+        self.report = report
+
+    # -- transactions -------------------------------------------------------
+    def begin(self) -> None:
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def commit(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Run a statement inside the migration's open transaction."""
+        self.begin()
+        return self.conn.execute(sql, params)
+
+    # -- idempotent schema helpers -----------------------------------------
+    def columns(self, table: str) -> List[str]:
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info('{table}')")]
+
+    def has_table(self, table: str) -> bool:
+        return bool(self.columns(table))
+
+    def add_column(self, table: str, column: str, ddl_type: str) -> bool:
+        """ALTER TABLE ... ADD COLUMN unless the column exists. Returns True if added."""
+        if not self.has_table(table) or column in self.columns(table):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}")
+        self.report(f"    added column {table}.{column}")
+        return True
+
+    def create_index(self, name: str, table: str, columns: List[str], unique: bool = False) -> bool:
+        """CREATE INDEX unless an index with that name exists. Returns True if created."""
+        if not self.has_table(table):
+            return False
+        existing = {row[1] for row in self.conn.execute(f"PRAGMA index_list('{table}')")}
+        if name in existing:
+            return False
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        self.execute(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+        self.report(f"    created index {name} ON {table} ({', '.join(columns)})")
+        return True
+
+    # -- batched backfills ---------------------------------------------------
+    def _checkpoint(self, step: str):
+        row = self.conn.execute(
+            "SELECT last_id, rows_done FROM migration_checkpoints WHERE version = ? AND step = ?",
+            (self.version, step),
+        ).fetchone()
+        return row if row else (0, 0)
+
+    def backfill(self, step: str, table: str, update_sql: str | Callable, where: str | None = None,
+                 batch_size: int | None = None, key: str = "id") -> int:
+        """Run ``update_sql`` over ``table`` in primary-key batches.
+
+        ``update_sql`` must limit itself to ``id > :lo AND id <= :hi``; the
+        runner binds the bounds of each batch. It may also be a callable
+        ``update(conn, lo, hi)`` for work that needs Python (reading files);
+        it must write through ``conn`` only, so the batch still commits with
+        its checkpoint. ``key`` is the integer column batches are cut on
+        (``rowid`` for tables without an integer primary key). ``where``
+        selects the rows that still need work and only drives batch
+        boundaries and the progress total. Any pending schema changes are
+        committed first. Returns the number of rows covered (including those
+        covered before a resume).
+        """
+        self.commit()
+        batch_size = batch_size or self.batch_size
+        cond = f" AND ({where})" if where else ""
+        last_id, done = self._checkpoint(step)
+        remaining = self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {key} > ?{cond}", (last_id,)).fetchone()[0]
+        if last_id:
+            self.report(f"    {step}: resuming after id {last_id} ({done} rows done)")
+        total = done + remaining
+        t0 = time.perf_counter()
+        while True:
+            ids = [r[0] for r in self.conn.execute(
+                f"SELECT {key} FROM {table} WHERE {key} > ?{cond} ORDER BY {key} LIMIT ?", (last_id, batch_size)
+            )]
+            if not ids:
+                break
+            hi = ids[-1]
+            self.begin()
+            try:
+                if callable(update_sql):
+                    update_sql(self.conn, last_id, hi)
+                else:
+                    self.conn.execute(update_sql, {"lo": last_id, "hi": hi})
+                done += len(ids)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO migration_checkpoints (version, step, last_id, rows_done, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.version, step, hi, done, now_utc().isoformat()),
+                )
+                self.commit()
+            except Exception:
+                self.rollback()
+                raise
+            last_id = hi
+            rate = done / max(time.perf_counter() - t0, 1e-9)
+            self.report(f"    {step}: {done}/{total} rows ({rate:.0f} rows/s)")
+            if BATCH_PAUSE:
+                time.sleep(BATCH_PAUSE)
+        return done
+
+
+def discover() -> List[ModuleType]:
+    """Migration modules of this package, in version order."""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        m = _MODULE_RE.match(info.name)
+        if not m:
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        module.VERSION = int(m.group(1))
+        module.NAME = (module.__doc__ or m.group(2)).strip().splitlines()[0].rstrip(".")
+        found.append(module)
+    found.sort(key=lambda mod: mod.VERSION)
+    versions = [mod.VERSION for mod in found]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions: {versions}")
+    return found
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Autocommit connection (transactions are explicit) with the app's PRAGMAs."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    apply_pragmas(conn)
+    for ddl in _BOOKKEEPING:
+        conn.execute(ddl)
+    return conn
+
+
+def applied_versions(conn: sqlite3.Connection) -> Dict[int, str]:
+    return {v: at for v, at in conn.execute("SELECT version, applied_at FROM schema_migrations")}
+
+
+def status(db_path: str = DB_PATH) -> List[Dict]:
+    """[{"version", "name", "applied_at" (None if pending), "checkpoints"}] for every migration."""
+    conn = connect(db_path)
+    try:
+        applied = applied_versions(conn)
+        rows = []
+        for mod in discover():
+            checkpoints = conn.execute(
+                "SELECT step, last_id, rows_done FROM migration_checkpoints WHERE version = ?", (mod.VERSION,)
+            ).fetchall()
+            rows.append({
+                "version": mod.VERSION,
+                "name": mod.NAME,
+                "applied_at": applied.get(mod.VERSION),
+                "checkpoints": [{"step": s, "last_id": i, "rows_done": n} for s, i, n in checkpoints],
+            })
+        return rows
+    finally:
+        conn.close()
+
+
+def pending(db_path: str = DB_PATH) -> List[ModuleType]:
+    """Migrations not yet applied to the database, in version order."""
+    conn = connect(db_path)
+    try:
+        applied = applied_versions(conn)
+    finally:
+        conn.close()
+    return [mod for mod in discover() if mod.VERSION not in applied]
+
+
+# Databases this process already found fully migrated. Migrations are never
+# rolled back, and new ones only arrive with new code (a restart), so those
+# are not checked again.
+_current: set = set()
+
+
+def pending_once(db_path: str = DB_PATH) -> List[ModuleType]:
+    """pending(), skipped once the database was found current in this process."""
+    if db_path in _current:
+        return []
+    todo = pending(db_path)
+    if not todo:
+        _current.add(db_path)
+    return todo
+
+
+def out_of_date_message(todo: List[ModuleType]) -> str:
+    names = ", ".join(f"v{mod.VERSION:04d}" for mod in todo)
+    return (f"The database schema is out of date (pending migrations: {names}). "
+            "Run `python -m scripts.migrate` (`python -m core.setup_db` for a new database)")
+
+
+def require_current(db_path: str = DB_PATH) -> None:
+    """Exit with the same hint as the app when any migration is pending.
+
+    For maintenance scripts: they run against the schema of the current
+    code, and applying migrations is left to scripts.migrate.
+    """
+    todo = pending_once(db_path)
+    if todo:
+        raise SystemExit(out_of_date_message(todo) + ", then run this script again.")
+
+
+def upgrade(db_path: str = DB_PATH, target: int | None = None, batch_size: int = BATCH_SIZE, report=print) -> List[int]:
+    """Apply every pending migration up to ``target`` (all if None). Returns the versions applied."""
+    conn = connect(db_path)
+    done = []
+    try:
+        applied = applied_versions(conn)
+        for mod in discover():
+            if mod.VERSION in applied or (target is not None and mod.VERSION > target):
+                continue
+            report(f"  v{mod.VERSION:04d} {mod.NAME}")
+            ctx = MigrationContext(conn, mod.VERSION, batch_size=batch_size, report=report)
+            t0 = time.perf_counter()
+            try:
+                mod.upgrade(ctx)
+                ctx.execute(
+                    "INSERT OR IGNORE INTO schema_migrations (version, name, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                    (mod.VERSION, mod.NAME, now_utc().isoformat(), int((time.perf_counter() - t0) * 1000)),
+                )
+                ctx.commit()
+            except Exception:
+                ctx.rollback()
+                raise
+            done.append(mod.VERSION)
+        return done
+    finally:
+        conn.close()
@@ -0,0 +1,5 @@
+"""Add visits.onset_time."""
+
+
+def upgrade(ctx):
+    ctx.add_column("visits", "onset_time", "DATETIME")
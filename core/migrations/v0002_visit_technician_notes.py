@@ -0,0 +1,5 @@
+"""Add visits.technician_notes."""
+
+
+def upgrade(ctx):
+    ctx.add_column("visits", "technician_notes", "TEXT")
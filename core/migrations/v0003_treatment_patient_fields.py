@@ -0,0 +1,22 @@
+"""Add treatments.patient_code / patient_name and fill them from the visit's patient."""
+
+
+def upgrade(ctx):
+    ctx.add_column("treatments", "patient_code", "TEXT")
+    ctx.add_column("treatments", "patient_name", "TEXT")
+    # treatments.visit_id -> visits.patient_id -> patients.(patient_id, name)
+    ctx.backfill(
+        "patient_fields",
+        "treatments",
+        """
+        UPDATE treatments SET
+            patient_code = COALESCE(patient_code, (
+                SELECT p.patient_id FROM visits v JOIN patients p ON p.id = v.patient_id
+                WHERE v.id = treatments.visit_id)),
+            patient_name = COALESCE(patient_name, (
+                SELECT p.name FROM visits v JOIN patients p ON p.id = v.patient_id
+                WHERE v.id = treatments.visit_id))
+        WHERE id > :lo AND id <= :hi AND (patient_code IS NULL OR patient_name IS NULL)
+        """,
+        where="patient_code IS NULL OR patient_name IS NULL",
+    )
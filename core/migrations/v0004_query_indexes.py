@@ -0,0 +1,16 @@
+"""Indexes for the hot visit and treatment queries."""
+
+# Same definitions as the __table_args__ of models.visit / models.treatment
+INDEXES = [
+    ("ix_treatments_patient_code", "treatments", ["patient_code"]),
+    ("ix_visits_doctor_status", "visits", ["doctor_username", "status"]),
+    ("ix_visits_patient_doctor", "visits", ["patient_id", "doctor_username"]),
+    ("ix_visits_status", "visits", ["status"]),
+    ("ix_visits_scan_path", "visits", ["scan_path"]),
+    ("ix_treatments_visit_patient", "treatments", ["visit_id", "patient_code", "patient_name"]),
+]
+
+
+def upgrade(ctx):
+    for name, table, columns in INDEXES:
+        ctx.create_index(name, table, columns)
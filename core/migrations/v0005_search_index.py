@@ -0,0 +1,59 @@
+"""Full-text search index (FTS5) over patients, visits, notes and treatment plans."""
+
+# One visit_search row per visit (rowid = visits.id) and one patient_search
+# row per patient (rowid = patients.id). Triggers on the source tables keep
+# them in sync, so every write path (pages, services, scripts) is covered.
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+TABLES = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS visit_search USING fts5(
+        patient_name, patient_code, visit_code, technician_notes, plan_text, {TOKENIZE})""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS patient_search USING fts5(name, patient_code, {TOKENIZE})""",
+]
+
+# INSERT OR REPLACE keeps the backfill and the triggers from double-indexing a row
+_INDEX_VISITS = """
+    INSERT OR REPLACE INTO visit_search (rowid, patient_name, patient_code, visit_code, technician_notes, plan_text)
+    SELECT v.id, p.name, p.patient_id, v.visit_id, v.technician_notes,
+           (SELECT group_concat(t.plan_text, ' ') FROM treatments t WHERE t.visit_id = v.id)
+    FROM visits v LEFT JOIN patients p ON p.id = v.patient_id
+    WHERE {where};"""
+
+_INDEX_PATIENTS = """
+    INSERT OR REPLACE INTO patient_search (rowid, name, patient_code)
+    SELECT id, name, patient_id FROM patients WHERE {where};"""
+
+TRIGGERS = {
+    "trg_search_visit_insert": ("AFTER INSERT ON visits", _INDEX_VISITS.format(where="v.id = NEW.id")),
+    "trg_search_visit_update": (
+        "AFTER UPDATE OF patient_id, visit_id, technician_notes ON visits",
+        "DELETE FROM visit_search WHERE rowid = OLD.id;" + _INDEX_VISITS.format(where="v.id = NEW.id"),
+    ),
+    "trg_search_visit_delete": ("AFTER DELETE ON visits", "DELETE FROM visit_search WHERE rowid = OLD.id;"),
+    "trg_search_patient_insert": ("AFTER INSERT ON patients", _INDEX_PATIENTS.format(where="id = NEW.id")),
+    "trg_search_patient_update": (
+        "AFTER UPDATE OF name, patient_id ON patients",
+        "DELETE FROM patient_search WHERE rowid = OLD.id;"
+        + _INDEX_PATIENTS.format(where="id = NEW.id")
+        + _INDEX_VISITS.format(where="v.patient_id = NEW.id"),
+    ),
+    "trg_search_patient_delete": ("AFTER DELETE ON patients", "DELETE FROM patient_search WHERE rowid = OLD.id;"),
+    "trg_search_treatment_insert": ("AFTER INSERT ON treatments", _INDEX_VISITS.format(where="v.id = NEW.visit_id")),
+    "trg_search_treatment_update": (
+        "AFTER UPDATE OF plan_text, visit_id ON treatments",
+        _INDEX_VISITS.format(where="v.id IN (OLD.visit_id, NEW.visit_id)"),
+    ),
+    "trg_search_treatment_delete": ("AFTER DELETE ON treatments", _INDEX_VISITS.format(where="v.id = OLD.visit_id")),
+}
+
+
+def upgrade(ctx):
+    for table in ("visits", "patients", "treatments"):
+        if not ctx.has_table(table):
+            raise ValueError(f"Table {table!r} does not exist yet; run python -m core.setup_db first.")
+    for ddl in TABLES:
+        ctx.execute(ddl)
+    for name, (event, body) in TRIGGERS.items():
+        ctx.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    ctx.backfill("visits", "visits", _INDEX_VISITS.format(where="v.id > :lo AND v.id <= :hi"))
+    ctx.backfill("patients", "patients", _INDEX_PATIENTS.format(where="id > :lo AND id <= :hi"))
@@ -0,0 +1,59 @@
+"""Dashboard counters (visits per doctor and status, patient total) maintained by triggers."""
+
+# Same shape as models.dashboard_counter.DashboardCounter
+TABLE = """CREATE TABLE IF NOT EXISTS dashboard_counters (
+    metric VARCHAR NOT NULL,
+    doctor_username VARCHAR NOT NULL DEFAULT '',
+    status VARCHAR NOT NULL DEFAULT '',
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, doctor_username, status)
+)"""
+
+
+def _bump(metric: str, doctor: str, status: str, delta: int) -> str:
+    return (
+        "INSERT INTO dashboard_counters (metric, doctor_username, status, value) "
+        f"VALUES ('{metric}', {doctor}, {status}, {delta}) "
+        f"ON CONFLICT (metric, doctor_username, status) DO UPDATE SET value = value + ({delta});"
+    )
+
+
+_OLD = ("COALESCE(OLD.doctor_username, '')", "COALESCE(OLD.status, '')")
+_NEW = ("COALESCE(NEW.doctor_username, '')", "COALESCE(NEW.status, '')")
+
+# Triggers run inside the writing transaction, so counters commit or roll
+# back together with the visit / patient change that caused them.
+TRIGGERS = {
+    "trg_counter_visit_insert": ("AFTER INSERT ON visits", _bump("visits", *_NEW, 1)),
+    "trg_counter_visit_delete": ("AFTER DELETE ON visits", _bump("visits", *_OLD, -1)),
+    "trg_counter_visit_update": (
+        "AFTER UPDATE OF status, doctor_username ON visits "
+        "WHEN COALESCE(OLD.status, '') IS NOT COALESCE(NEW.status, '') "
+        "OR COALESCE(OLD.doctor_username, '') IS NOT COALESCE(NEW.doctor_username, '')",
+        _bump("visits", *_OLD, -1) + _bump("visits", *_NEW, 1),
+    ),
+    "trg_counter_patient_insert": ("AFTER INSERT ON patients", _bump("patients", "''", "''", 1)),
+    "trg_counter_patient_delete": ("AFTER DELETE ON patients", _bump("patients", "''", "''", -1)),
+}
+
+# Full recount; also used by services.dashboard_counter_service.rebuild_counters
+REBUILD = [
+    "DELETE FROM dashboard_counters",
+    """INSERT INTO dashboard_counters (metric, doctor_username, status, value)
+       SELECT 'visits', COALESCE(doctor_username, ''), COALESCE(status, ''), COUNT(*)
+       FROM visits GROUP BY COALESCE(doctor_username, ''), COALESCE(status, '')""",
+    """INSERT INTO dashboard_counters (metric, doctor_username, status, value)
+       SELECT 'patients', '', '', COUNT(*) FROM patients""",
+]
+
+
+def upgrade(ctx):
+    for table in ("visits", "patients"):
+        if not ctx.has_table(table):
+            raise ValueError(f"Table {table!r} does not exist yet; run python -m core.setup_db first.")
+    ctx.execute(TABLE)
+    for name, (event, body) in TRIGGERS.items():
+        ctx.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+    # Triggers and the initial count share one transaction, so no write is missed
+    for sql in REBUILD:
+        ctx.execute(sql)
@@ -0,0 +1,140 @@
+"""Content-addressed scan store (scan_blobs), with legacy scan paths repointed at it."""
+import hashlib
+import os
+import shutil
+import uuid
+
+from core.database import BASE_DIR
+
+# Frozen copies of the store layout (core.scan_store) and annotation naming
+# (core.annotation_utils) as they were when this migration shipped, so later
+# changes to those modules cannot change what it does.
+STORE_DIR = "data/uploads/store"
+ANNOTATION_DIR = os.path.join(BASE_DIR, "data", "uploads", "annotations")
+_HASH_CHUNK = 1024 * 1024
+
+
+def _normalize(path: str) -> str:
+    return path.replace("\\", "/")
+
+
+def _is_store_path(path: str) -> bool:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return "/store/" in path and len(stem) == 64
+
+
+def _scan_hash(scan_path: str) -> str:
+    return hashlib.md5(scan_path.encode()).hexdigest()[:12]
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _store_copy(src: str, digest: str) -> str:
+    """Copy src to its content address (unless present); returns the store path."""
+    ext = (os.path.splitext(src)[1] or ".png").lower()
+    dest = f"{STORE_DIR}/{digest[:2]}/{digest}{ext}"
+    if not os.path.exists(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{uuid.uuid4().hex}.part"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    return dest
+
+
+# Frozen copy of models.scan_blob as first shipped; later columns are added by
+# their own migrations.
+TABLE = """CREATE TABLE IF NOT EXISTS scan_blobs (
+    sha256 VARCHAR(64) NOT NULL,
+    path VARCHAR NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at DATETIME,
+    ref_count INTEGER NOT NULL,
+    prediction_label VARCHAR,
+    prediction_confidence FLOAT,
+    probabilities_json TEXT,
+    predicted_at DATETIME,
+    PRIMARY KEY (sha256),
+    UNIQUE (path)
+)"""
+
+_REF_COUNTS = """UPDATE scan_blobs SET ref_count =
+    (SELECT COUNT(*) FROM visits WHERE visits.scan_path = scan_blobs.path)"""
+
+
+def _copy_annotations(patient_code: str, visit_code: str, old_path: str, new_path: str) -> int:
+    old_base = f"ann_{patient_code}_{visit_code}_{_scan_hash(old_path)}"
+    new_base = f"ann_{patient_code}_{visit_code}_{_scan_hash(new_path)}"
+    copied = 0
+    for ext in (".png", ".json"):
+        src = os.path.join(ANNOTATION_DIR, old_base + ext)
+        dst = os.path.join(ANNOTATION_DIR, new_base + ext)
+        if os.path.exists(src) and not os.path.exists(dst):
+            shutil.copy2(src, dst)
+            copied += 1
+    return copied
+
+
+def _blob_for(ctx, src: str) -> str:
+    """Store path of the blob holding src's bytes, adding the blob if it is new.
+
+    Identical bytes seen earlier under another name or extension keep the
+    path they were first stored at (as services.scan_service does for
+    uploads), so every visit on that content points at the same row.
+    """
+    digest = _sha256_file(src)
+    row = ctx.execute("SELECT path FROM scan_blobs WHERE sha256 = ?", (digest,)).fetchone()
+    if row is not None:
+        return row[0]
+    dest = _store_copy(src, digest)
+    ctx.execute(
+        "INSERT INTO scan_blobs (sha256, path, size_bytes, ref_count) VALUES (?, ?, ?, 0)",
+        (digest, dest, os.path.getsize(dest)),
+    )
+    return dest
+
+
+def _fold_legacy_files(ctx) -> None:
+    """Copy the scans visits still reference by legacy path into the store.
+
+    Annotation files are copied to the name of the new scan path. The
+    originals stay where they are; once no row points at them
+    ``scripts.storage_gc`` reclaims them like any other orphan. Nothing is
+    moved, so running this against a copy or scratch database never takes
+    files away from the live one.
+    """
+    rows = ctx.execute(
+        "SELECT v.id, v.visit_id, v.scan_path, p.patient_id FROM visits v "
+        "LEFT JOIN patients p ON p.id = v.patient_id WHERE v.scan_path IS NOT NULL"
+    ).fetchall()
+    moved = copied = 0
+    for visit_pk, visit_code, old_path, patient_code in rows:
+        src = _normalize(old_path)
+        if _is_store_path(src):
+            continue
+        if not os.path.exists(src):
+            ctx.report(f"    missing scan for visit {visit_code}: {old_path}")
+            continue
+        dest = _blob_for(ctx, src)
+        copied += _copy_annotations(patient_code or "PUNK", visit_code, old_path, dest)
+        ctx.execute("UPDATE visits SET scan_path = ? WHERE id = ?", (dest, visit_pk))
+        moved += 1
+    if moved:
+        ctx.report(f"    visits repointed: {moved}; annotation files copied: {copied}")
+
+
+def upgrade(ctx):
+    ctx.execute(TABLE)
+    # Stored scan paths are relative to the project root
+    cwd = os.getcwd()
+    os.chdir(BASE_DIR)
+    try:
+        _fold_legacy_files(ctx)
+    finally:
+        os.chdir(cwd)
+    ctx.execute(_REF_COUNTS)
@@ -0,0 +1,16 @@
+"""Archived scan file ledger (archived_files)."""
+
+# Frozen copy of models.archived_file
+TABLE = """CREATE TABLE IF NOT EXISTS archived_files (
+    path VARCHAR NOT NULL,
+    archive VARCHAR NOT NULL,
+    member VARCHAR NOT NULL,
+    original_size INTEGER NOT NULL,
+    archived_size INTEGER NOT NULL,
+    archived_at DATETIME,
+    PRIMARY KEY (path)
+)"""
+
+
+def upgrade(ctx):
+    ctx.execute(TABLE)
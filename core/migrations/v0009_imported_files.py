@@ -0,0 +1,26 @@
+"""Bulk import and drop-folder ledger (imported_files)."""
+
+# Frozen copy of models.imported_file
+TABLE = """CREATE TABLE IF NOT EXISTS imported_files (
+    id INTEGER NOT NULL,
+    source_path VARCHAR NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    visit_id INTEGER,
+    origin VARCHAR NOT NULL,
+    imported_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(visit_id) REFERENCES visits (id)
+)"""
+
+INDEXES = [
+    ("ix_imported_files_sha256", "imported_files", ["sha256"]),
+    ("ix_imported_files_source_path", "imported_files", ["source_path"]),
+]
+
+
+def upgrade(ctx):
+    ctx.execute(TABLE)
+    for name, table, columns in INDEXES:
+        ctx.create_index(name, table, columns)
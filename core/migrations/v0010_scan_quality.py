@@ -0,0 +1,14 @@
+"""Add the scan quality gate columns to scan_blobs."""
+
+# See core/image_quality.py
+NEW_COLUMNS = {
+    "quality_ok": "BOOLEAN",
+    "quality_reason": "TEXT",
+    "quality_metrics_json": "TEXT",
+    "quality_ms": "FLOAT",
+}
+
+
+def upgrade(ctx):
+    for name, ddl_type in NEW_COLUMNS.items():
+        ctx.add_column("scan_blobs", name, ddl_type)
@@ -0,0 +1,29 @@
+"""Add scan_blobs.phash and hash every stored scan."""
+import os
+
+from core.archive_store import resolve_path
+from core.database import BASE_DIR
+from core.phash import phash_file, to_hex
+
+
+def _hash_batch(conn, lo, hi):
+    rows = conn.execute(
+        "SELECT rowid, path FROM scan_blobs WHERE rowid > ? AND rowid <= ? AND phash IS NULL", (lo, hi)
+    ).fetchall()
+    for rowid, path in rows:
+        try:
+            value = to_hex(phash_file(resolve_path(path)))
+        except Exception:
+            continue  # unreadable scan; left NULL and skipped by the duplicate index
+        conn.execute("UPDATE scan_blobs SET phash = ? WHERE rowid = ?", (value, rowid))
+
+
+def upgrade(ctx):
+    ctx.add_column("scan_blobs", "phash", "VARCHAR(16)")
+    # Stored scan paths are relative to the project root
+    cwd = os.getcwd()
+    os.chdir(BASE_DIR)
+    try:
+        ctx.backfill("phash", "scan_blobs", _hash_batch, where="phash IS NULL", key="rowid")
+    finally:
+        os.chdir(cwd)
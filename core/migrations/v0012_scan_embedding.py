@@ -0,0 +1,8 @@
+"""Add scan_blobs.embedding."""
+
+# The vectors come from the model, so filling them is left to
+# scripts/backfill_scan_embeddings.py (needs the ML stack).
+
+
+def upgrade(ctx):
+    ctx.add_column("scan_blobs", "embedding", "BLOB")
@@ -0,0 +1,28 @@
+"""Annotation file index (annotations)."""
+
+# Frozen copy of models.annotation. Rows for files saved before this table
+# existed are added by scripts/backfill_annotation_index.py; until then
+# core.annotation_utils falls back to the files themselves.
+TABLE = """CREATE TABLE IF NOT EXISTS annotations (
+    id INTEGER NOT NULL,
+    visit_id INTEGER NOT NULL,
+    scan_hash VARCHAR(12) NOT NULL,
+    image_path VARCHAR,
+    json_path VARCHAR,
+    size_bytes INTEGER NOT NULL,
+    saved_at DATETIME,
+    author VARCHAR,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_annotation_visit_scan UNIQUE (visit_id, scan_hash),
+    FOREIGN KEY(visit_id) REFERENCES visits (id)
+)"""
+
+INDEXES = [
+    ("ix_annotations_visit_id", "annotations", ["visit_id"]),
+]
+
+
+def upgrade(ctx):
+    ctx.execute(TABLE)
+    for name, table, columns in INDEXES:
+        ctx.create_index(name, table, columns)
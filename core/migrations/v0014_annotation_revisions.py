@@ -0,0 +1,28 @@
+"""Annotation revision history (annotation_revisions)."""
+
+# Frozen copy of models.annotation_revision
+TABLE = """CREATE TABLE IF NOT EXISTS annotation_revisions (
+    id INTEGER NOT NULL,
+    visit_id INTEGER NOT NULL,
+    scan_hash VARCHAR(12) NOT NULL,
+    revision INTEGER NOT NULL,
+    kind VARCHAR(8) NOT NULL,
+    payload TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    full_bytes INTEGER NOT NULL,
+    saved_at DATETIME,
+    author VARCHAR,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_annotation_revision UNIQUE (visit_id, scan_hash, revision),
+    FOREIGN KEY(visit_id) REFERENCES visits (id)
+)"""
+
+INDEXES = [
+    ("ix_annotation_revisions_visit_id", "annotation_revisions", ["visit_id"]),
+]
+
+
+def upgrade(ctx):
+    ctx.execute(TABLE)
+    for name, table, columns in INDEXES:
+        ctx.create_index(name, table, columns)
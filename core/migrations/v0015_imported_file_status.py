@@ -0,0 +1,13 @@
+"""Add status, attempts and error to imported_files."""
+
+# Existing rows are successful imports, which the defaults describe
+NEW_COLUMNS = {
+    "status": "VARCHAR NOT NULL DEFAULT 'imported'",
+    "attempts": "INTEGER NOT NULL DEFAULT 1",
+    "error": "TEXT",
+}
+
+
+def upgrade(ctx):
+    for name, ddl_type in NEW_COLUMNS.items():
+        ctx.add_column("imported_files", name, ddl_type)
@@ -0,0 +1,13 @@
+"""Partial index over the hashed scan_blobs rows."""
+
+# Same definition as the __table_args__ of models.scan_blob. The duplicate
+# index counts and lists hashed rows on every check, which would otherwise
+# scan the whole table (including the embedding BLOBs).
+INDEXES = {
+    "ix_scan_blobs_phashed": "ON scan_blobs (sha256, phash) WHERE phash IS NOT NULL",
+}
+
+
+def upgrade(ctx):
+    for name, ddl in INDEXES.items():
+        ctx.execute(f"CREATE INDEX IF NOT EXISTS {name} {ddl}")
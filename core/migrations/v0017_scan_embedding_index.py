@@ -0,0 +1,13 @@
+"""Partial index over the embedded scan_blobs rows."""
+
+# Same definition as the __table_args__ of models.scan_blob. The similar-case
+# index counts and lists embedded rows on every search; the vectors are only
+# read for the rows it does not have yet.
+INDEXES = {
+    "ix_scan_blobs_embedded": "ON scan_blobs (sha256) WHERE embedding IS NOT NULL",
+}
+
+
+def upgrade(ctx):
+    for name, ddl in INDEXES.items():
+        ctx.execute(f"CREATE INDEX IF NOT EXISTS {name} {ddl}")
@@ -0,0 +1,14 @@
+"""Index for a doctor's visits in id order (keyset pages)."""
+
+# Same definition as the __table_args__ of models.visit. doctor_visits_page
+# filters on the doctor and a status list and orders by id; through
+# ix_visits_doctor_status every page sorted all of the doctor's matching
+# visits in a temp B-tree, this index walks them in id order instead.
+INDEXES = [
+    ("ix_visits_doctor", "visits", ["doctor_username"]),
+]
+
+
+def upgrade(ctx):
+    for name, table, columns in INDEXES:
+        ctx.create_index(name, table, columns)
@@ -0,0 +1,37 @@
+"""Generation counter for the duplicate index, bumped by triggers when a hash goes away."""
+
+# Same shape as models.index_generation.IndexGeneration
+TABLE = """CREATE TABLE IF NOT EXISTS index_generations (
+    name VARCHAR NOT NULL PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0
+)"""
+
+
+def _bump(name: str) -> str:
+    return (
+        f"INSERT INTO index_generations (name, generation) VALUES ('{name}', 1) "
+        "ON CONFLICT (name) DO UPDATE SET generation = generation + 1;"
+    )
+
+
+# A new hash only raises the count of hashed rows, which the duplicate index
+# tops up from. A deleted row or a cleared / rewritten hash can leave the
+# count unchanged (e.g. one delete plus one insert), so those bump the
+# generation and the index is rebuilt. Triggers commit with the write.
+TRIGGERS = {
+    "trg_generation_phash_delete": (
+        "AFTER DELETE ON scan_blobs WHEN OLD.phash IS NOT NULL", _bump("scan_phash"),
+    ),
+    "trg_generation_phash_update": (
+        "AFTER UPDATE OF phash ON scan_blobs WHEN OLD.phash IS NOT NULL AND OLD.phash IS NOT NEW.phash",
+        _bump("scan_phash"),
+    ),
+}
+
+
+def upgrade(ctx):
+    if not ctx.has_table("scan_blobs"):
+        raise ValueError("Table 'scan_blobs' does not exist yet; run python -m core.setup_db first.")
+    ctx.execute(TABLE)
+    for name, (event, body) in TRIGGERS.items():
+        ctx.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
@@ -0,0 +1,35 @@
+"""Generation counter for the similar-case index, bumped by triggers when an embedding goes away."""
+
+# Same table as v0019 (models.index_generation.IndexGeneration)
+TABLE = """CREATE TABLE IF NOT EXISTS index_generations (
+    name VARCHAR NOT NULL PRIMARY KEY,
+    generation INTEGER NOT NULL DEFAULT 0
+)"""
+
+
+def _bump(name: str) -> str:
+    return (
+        f"INSERT INTO index_generations (name, generation) VALUES ('{name}', 1) "
+        "ON CONFLICT (name) DO UPDATE SET generation = generation + 1;"
+    )
+
+
+# As for the pHash (v0019): new embeddings raise the count of embedded rows,
+# a deleted row or a cleared / rewritten embedding bumps the generation.
+TRIGGERS = {
+    "trg_generation_embedding_delete": (
+        "AFTER DELETE ON scan_blobs WHEN OLD.embedding IS NOT NULL", _bump("scan_embedding"),
+    ),
+    "trg_generation_embedding_update": (
+        "AFTER UPDATE OF embedding ON scan_blobs WHEN OLD.embedding IS NOT NULL AND OLD.embedding IS NOT NEW.embedding",
+        _bump("scan_embedding"),
+    ),
+}
+
+
+def upgrade(ctx):
+    if not ctx.has_table("scan_blobs"):
+        raise ValueError("Table 'scan_blobs' does not exist yet; run python -m core.setup_db first.")
+    ctx.execute(TABLE)
+    for name, (event, body) in TRIGGERS.items():
+        ctx.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
@@ -0,0 +1,119 @@
+import threading
+from itertools import combinations
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# 64-bit DCT perceptual hash plus a multi-index hash table for Hamming-radius search.
+# Re-encoded, resized or slightly re-windowed copies of a scan land within a
+# few bits of each other, while unrelated scans differ in ~32 bits.
+HASH_SIZE = 8
+_SAMPLE = 32
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0, :] = np.sqrt(1.0 / n)
+    return m
+
+
+_DCT = _dct_matrix(_SAMPLE)
+
+
+def phash_image(img: Image.Image) -> int:
+    """Return the 64-bit perceptual hash of a PIL image."""
+    grey = img.convert("L").resize((_SAMPLE, _SAMPLE), Image.LANCZOS)
+    pixels = np.asarray(grey, dtype=np.float64)
+    coeffs = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    low = coeffs.ravel()[1:]  # drop the DC term (overall brightness)
+    bits = np.concatenate(([False], low > np.median(low)))
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash_file(path: str) -> int:
+    with Image.open(path) as img:
+        img.draft("L", (_SAMPLE * 4, _SAMPLE * 4))
+        return phash_image(img)
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """Multi-index hashing over 64-bit hashes under Hamming distance.
+
+    Each hash is split into CHUNKS 16-bit substrings, each with its own
+    table. By the pigeonhole principle, any hash within radius r of the
+    query matches it in at least one substring to within r // CHUNKS bits.
+    A query therefore probes a few dozen table buckets and verifies only the
+    candidates it finds, instead of comparing against every stored hash.
+    """
+
+    CHUNKS = 4
+    _BITS = 64 // CHUNKS
+    _MASK = (1 << _BITS) - 1
+
+    def __init__(self, items: Iterable[Tuple[int, str]] = ()):
+        self._tables: List[Dict[int, set]] = [{} for _ in range(self.CHUNKS)]
+        self._keys: Dict[int, set] = {}  # hash -> keys
+        self._flips: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+        for value, key in items:
+            self.add(value, key)
+
+    def _chunks(self, value: int) -> List[int]:
+        return [(value >> (i * self._BITS)) & self._MASK for i in range(self.CHUNKS)]
+
+    def _flip_masks(self, radius: int) -> List[int]:
+        """All _BITS-bit masks with at most radius bits set."""
+        masks = self._flips.get(radius)
+        if masks is None:
+            masks = [0]
+            for bits in range(1, radius + 1):
+                masks.extend(sum(1 << b for b in combo) for combo in combinations(range(self._BITS), bits))
+            self._flips[radius] = masks
+        return masks
+
+    def add(self, value: int, key: str) -> None:
+        with self._lock:
+            keys = self._keys.get(value)
+            if keys is None:
+                self._keys[value] = {key}
+                for table, chunk in zip(self._tables, self._chunks(value)):
+                    table.setdefault(chunk, set()).add(value)
+            else:
+                keys.add(key)
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, str]]:
+        """Return [(distance, key)] for every stored hash within radius, closest first."""
+        masks = self._flip_masks(radius // self.CHUNKS)
+        candidates = set()
+        with self._lock:
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                for mask in masks:
+                    bucket = table.get(chunk ^ mask)
+                    if bucket:
+                        candidates.update(bucket)
+            out = [
+                (d, key)
+                for h in candidates
+                if (d := hamming(value, h)) <= radius
+                for key in self._keys[h]
+            ]
+        out.sort()
+        return out
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys in self._keys.values())
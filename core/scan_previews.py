@@ -0,0 +1,117 @@
+import os
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from core.scan_store import UPLOAD_DIR, normalize_scan_path, digest_from_path
+
+# Downscaled copies of scans used wherever a full-resolution original is not
+# needed (lists, summaries, previews). Widths are in pixels.
+PREVIEW_DIR = os.path.join(UPLOAD_DIR, "previews")
+PREVIEW_WIDTHS = {
+    "thumb": 256,
+    "medium": 768,
+}
+PREVIEW_QUALITY = 85
+
+# One worker is enough: generation is a single decode + two resamples.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-previews")
+_pending: set[str] = set()
+
+
+def _preview_key(scan_path: str) -> str | None:
+    """Stable key for a source image.
+
+    Store blobs are immutable, so their digest is the key. Other files
+    (legacy scans, annotation composites) are keyed on path + mtime + size so
+    a rewritten file gets fresh previews.
+    """
+    digest = digest_from_path(scan_path)
+    if digest:
+        return digest
+    try:
+        st = os.stat(scan_path)
+    except OSError:
+        return None
+    raw = f"{os.path.abspath(normalize_scan_path(scan_path))}:{st.st_mtime_ns}:{st.st_size}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def preview_path(scan_path: str, width: int) -> str | None:
+    key = _preview_key(scan_path)
+    if not key:
+        return None
+    return os.path.join(PREVIEW_DIR, key[:2], f"{key}_{width}.jpg")
+
+
+def generate_previews(scan_path: str) -> list[str]:
+    """Write every preview size and return the written paths.
+
+    Sizes wider than the original are written at the original size; the
+    JPEG re-encode is still far smaller than the source PNG.
+    """
+    from PIL import Image
+    from core.archive_store import resolve_path
+
+    written = []
+    with Image.open(resolve_path(scan_path)) as img:
+        img.load()
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        for width in sorted(PREVIEW_WIDTHS.values()):
+            dest = preview_path(scan_path, width)
+            if not dest or os.path.exists(dest):
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if width < img.width:
+                height = max(1, round(img.height * width / img.width))
+                small = img.resize((width, height), Image.LANCZOS)
+            else:
+                small = img
+            tmp = dest + ".part"
+            small.save(tmp, format="JPEG", quality=PREVIEW_QUALITY, optimize=True)
+            os.replace(tmp, dest)
+            written.append(dest)
+    return written
+
+
+def schedule_previews(scan_path: str | None) -> None:
+    """Generate previews for scan_path on the background worker."""
+    if not scan_path:
+        return
+    scan_path = normalize_scan_path(scan_path)
+    if scan_path in _pending:
+        return
+    _pending.add(scan_path)
+
+    def _run():
+        try:
+            generate_previews(scan_path)
+        except Exception:
+            pass
+        finally:
+            _pending.discard(scan_path)
+
+    _executor.submit(_run)
+
+
+def preview_for(scan_path: str | None, width: int) -> str | None:
+    """Return the smallest stored image that is at least ``width`` pixels wide.
+
+    Falls back to the original when the requested width is above every
+    preview size, or when the previews have not been generated yet (in which
+    case generation is scheduled so the next render can use them).
+    """
+    if not scan_path:
+        return scan_path
+    scan_path = normalize_scan_path(scan_path)
+    for size in sorted(PREVIEW_WIDTHS.values()):
+        if size < width:
+            continue
+        candidate = preview_path(scan_path, size)
+        if candidate and os.path.exists(candidate):
+            return candidate
+        if os.path.exists(scan_path):
+            schedule_previews(scan_path)
+        break
+    from core.archive_store import resolve_path
+    return resolve_path(scan_path)
@@ -0,0 +1,109 @@
+import os
+import hashlib
+import shutil
+import uuid
+from typing import BinaryIO, Tuple
+
+from core.upload_io import stream_to_temp
+
+# Content-addressed scan store: data/uploads/store/<aa>/<sha256><ext>
+# Paths are kept relative to the project root, matching how scan paths are
+# already stored on Visit.scan_path.
+UPLOAD_DIR = os.path.join("data", "uploads")
+STORE_DIR = os.path.join(UPLOAD_DIR, "store")
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def normalize_scan_path(path: str | None) -> str | None:
+    """Return a forward-slash version of a stored scan path.
+
+    Older rows were written on Windows (``data\\uploads\\scan_x.png``); this
+    lets the same file compare equal regardless of platform.
+    """
+    if not path:
+        return path
+    return path.replace("\\", "/")
+
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def blob_path(sha256: str, ext: str = ".png") -> str:
+    """Return the store path for a digest (relative, forward slashes)."""
+    ext = (ext or ".png").lower()
+    return "/".join([STORE_DIR.replace(os.sep, "/"), sha256[:2], f"{sha256}{ext}"])
+
+
+def digest_from_path(path: str | None) -> str | None:
+    """Return the sha256 encoded in a store path, or None for legacy paths."""
+    path = normalize_scan_path(path)
+    if not path or "/store/" not in path:
+        return None
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem if len(stem) == 64 else None
+
+
+def put_bytes(data: bytes, ext: str = ".png") -> Tuple[str, str, bool]:
+    """Store bytes by content and return (path, sha256, created).
+
+    If identical content is already stored the existing file is reused and
+    ``created`` is False.
+    """
+    digest = sha256_bytes(data)
+    dest = blob_path(digest, ext)
+    if os.path.exists(dest):
+        return dest, digest, False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{uuid.uuid4().hex}.part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+    return dest, digest, True
+
+
+def put_stream(src: BinaryIO, ext: str = ".png", max_bytes: int | None = None) -> Tuple[str, str, int, bool]:
+    """Stream a file-like object into the store and return (path, sha256, size, created).
+
+    The content is copied in chunks to a temp file inside the store while it
+    is hashed, then renamed onto its content address. A crash mid-write only
+    ever leaves a ``*.part`` temp file behind, never a truncated blob.
+    """
+    tmp_path, digest, size = stream_to_temp(src, STORE_DIR, max_bytes=max_bytes)
+    dest = blob_path(digest, ext)
+    if os.path.exists(dest):
+        os.remove(tmp_path)
+        return dest, digest, size, False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(tmp_path, dest)
+    return dest, digest, size, True
+
+
+def put_file(src_path: str, ext: str | None = None, move: bool = False) -> Tuple[str, str, bool]:
+    """Fold an existing file into the store and return (path, sha256, created).
+
+    When ``move`` is True the source file is removed once its content is in
+    the store (whether it was copied or already present).
+    """
+    ext = ext or os.path.splitext(src_path)[1] or ".png"
+    digest = sha256_file(src_path)
+    dest = blob_path(digest, ext)
+    created = False
+    if not os.path.exists(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{uuid.uuid4().hex}.part"
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, dest)
+        created = True
+    if move and os.path.abspath(src_path) != os.path.abspath(dest):
+        os.remove(src_path)
+    return dest, digest, created
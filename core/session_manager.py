@@ -43,6 +43,9 @@ def require_role(role: str):
     Accepts doctor/physician as equivalent roles for access control.
     """
     init_session_state()
+    # Full runs of protected pages (fragment reruns don't get here);
+    # core.helpers.keyset_cursor uses it to notice a list page being re-entered
+    st.session_state["page_runs"] = st.session_state.get("page_runs", 0) + 1
 
     # Check if user is logged in
     if st.session_state.user is None:
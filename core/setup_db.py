@@ -1,5 +1,6 @@
 # core/setup_db.py
 
+from core import migrations
 from core.database import Base, engine, get_db_session
 from services.user_service import ensure_default_users
 
@@ -9,6 +10,9 @@ def main():
     # Create all SQLAlchemy tables
     Base.metadata.create_all(bind=engine)
 
+    # Record/apply schema migrations (their steps skip what create_all made)
+    migrations.upgrade()
+
     # Insert demo users
     ensure_default_users()
 
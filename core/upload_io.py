@@ -0,0 +1,73 @@
+import os
+import hashlib
+import tempfile
+from typing import BinaryIO, Tuple
+
+# Copy uploads in fixed-size chunks so large studies never sit in memory twice.
+CHUNK_SIZE = 1024 * 1024
+
+# Maximum accepted upload size; override with MAX_UPLOAD_MB in the environment.
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "200")) * 1024 * 1024)
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured maximum size."""
+
+
+def stream_to_temp(src: BinaryIO, dest_dir: str, max_bytes: int | None = None,
+                   chunk_size: int = CHUNK_SIZE) -> Tuple[str, str, int]:
+    """Copy a file-like object into a temp file inside dest_dir.
+
+    The content is hashed while it is copied. The temp file lives in the
+    destination directory so the caller can ``os.replace`` it into place
+    atomically.
+
+    Returns (temp_path, sha256, size_bytes). The temp file is removed if the
+    copy fails or the size limit is exceeded.
+    """
+    limit = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    os.makedirs(dest_dir, exist_ok=True)
+    if hasattr(src, "seek"):
+        try:
+            src.seek(0)
+        except Exception:
+            pass
+
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if limit and size > limit:
+                    raise UploadTooLargeError(
+                        f"Upload exceeds the maximum size of {limit / (1024 * 1024):.1f} MB."
+                    )
+                h.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return tmp_path, h.hexdigest(), size
+
+
+def write_atomic(src: BinaryIO, dest_path: str, max_bytes: int | None = None,
+                 chunk_size: int = CHUNK_SIZE) -> Tuple[str, int]:
+    """Stream src to dest_path via a temp file and an atomic rename.
+
+    Readers never observe a half-written dest_path. Returns (sha256, size_bytes).
+    """
+    tmp_path, digest, size = stream_to_temp(
+        src, os.path.dirname(dest_path) or ".", max_bytes=max_bytes, chunk_size=chunk_size
+    )
+    os.replace(tmp_path, dest_path)
+    return digest, size
@@ -0,0 +1,135 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# In-memory cosine-similarity index over scan embeddings. Small sets are
+# searched exactly with one matrix-vector product; once the set reaches
+# IVF_MIN_SIZE vectors it is partitioned with k-means (IVF) and a query only
+# scores the rows of the VECTOR_NPROBE nearest partitions.
+IVF_MIN_SIZE = int(os.getenv("VECTOR_IVF_MIN_SIZE", "20000"))
+NPROBE = int(os.getenv("VECTOR_NPROBE", "8"))
+_KMEANS_ITERS = 10
+_KMEANS_SAMPLE = 50000
+
+
+def pack_embedding(vec) -> bytes:
+    """Serialise an embedding as little-endian float32 bytes."""
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+
+def unpack_embedding(data: bytes | None) -> np.ndarray | None:
+    if not data:
+        return None
+    return np.frombuffer(data, dtype="<f4")
+
+
+def _normalise(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class VectorIndex:
+    """Top-k cosine search with incremental adds and optional IVF partitioning."""
+
+    def __init__(self, items: Iterable[Tuple[str, np.ndarray]] = (), ivf_min_size: int = IVF_MIN_SIZE, nprobe: int = NPROBE):
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._dim = None
+        self._mat = np.zeros((0, 0), dtype=np.float32)  # grows by doubling
+        self._n = 0
+        self._keys: List[str] = []
+        self._row: Dict[str, int] = {}
+        self._centroids = None
+        self._lists: List[List[int]] = []
+        self._trained_n = 0
+        for key, vec in items:
+            self.add(key, vec)
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def partitioned(self) -> bool:
+        return self._centroids is not None
+
+    def add(self, key: str, vec) -> None:
+        """Insert or replace the vector stored under key."""
+        v = _normalise(np.asarray(vec, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            if self._dim is None:
+                self._dim = v.shape[0]
+                self._mat = np.zeros((64, self._dim), dtype=np.float32)
+            if v.shape[0] != self._dim:
+                raise ValueError(f"Embedding has {v.shape[0]} dims, index expects {self._dim}.")
+            row = self._row.get(key)
+            if row is not None:
+                self._mat[row] = v
+                return
+            if self._n == self._mat.shape[0]:
+                grown = np.zeros((self._n * 2, self._dim), dtype=np.float32)
+                grown[:self._n] = self._mat[:self._n]
+                self._mat = grown
+            row = self._n
+            self._mat[row] = v
+            self._keys.append(key)
+            self._row[key] = row
+            self._n += 1
+            if self._centroids is not None:
+                self._lists[int(np.argmax(self._centroids @ v))].append(row)
+            # (Re)train the partitions when first needed and whenever the set doubles
+            if self._n >= self.ivf_min_size and self._n >= 2 * self._trained_n:
+                self._train()
+
+    def _train(self) -> None:
+        """Spherical k-means over (a sample of) the stored vectors."""
+        data = self._mat[:self._n]
+        nlist = max(1, int(np.sqrt(self._n)))
+        rng = np.random.default_rng(0)
+        sample = data if self._n <= _KMEANS_SAMPLE else data[rng.choice(self._n, _KMEANS_SAMPLE, replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalise(centroids)
+        assign = np.argmax(data @ centroids.T, axis=1)
+        self._lists = [[] for _ in range(nlist)]
+        for row, c in enumerate(assign):
+            self._lists[c].append(row)
+        self._centroids = centroids
+        self._trained_n = self._n
+
+    def search(self, vec, k: int = 5, exclude: Iterable[str] = ()) -> List[Tuple[float, str]]:
+        """Return up to k (cosine similarity, key) pairs, most similar first."""
+        exclude = set(exclude)
+        q = _normalise(np.asarray(vec, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            if self._n == 0 or q.shape[0] != self._dim:
+                return []
+            if self._centroids is None:
+                rows = None
+                scores = self._mat[:self._n] @ q
+            else:
+                probe = np.argsort(self._centroids @ q)[::-1][:self.nprobe]
+                rows = np.fromiter((r for c in probe for r in self._lists[c]), dtype=np.int64)
+                scores = self._mat[rows] @ q
+            want = min(len(scores), k + len(exclude))
+            if want == 0:
+                return []
+            top = np.argpartition(-scores, want - 1)[:want]
+            top = top[np.argsort(-scores[top])]
+            out = []
+            for i in top:
+                key = self._keys[int(rows[i]) if rows is not None else int(i)]
+                if key in exclude:
+                    continue
+                out.append((float(scores[i]), key))
+                if len(out) == k:
+                    break
+            return out
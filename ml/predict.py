@@ -4,17 +4,8 @@ from PIL import Image
 from .model_loader import load_model
 
 
-def predict_scan(image_file):
-    """
-    Core prediction function.
-    Returns a dictionary with the top class and a full probability breakdown:
-      {"label": str, "confidence": float(0-100), "probabilities": [{label, confidence}% ...]}
-    """
-    model = load_model()
-
-    image = Image.open(image_file).convert("RGB")
-    results = model.predict(image, verbose=False)[0]
-
+def _result_to_dict(model, results):
+    """Turn one ultralytics classification result into the prediction dict."""
     # If the model didn't return probabilities, fall back to Unknown
     if not hasattr(results, "probs") or results.probs is None or len(results.probs) == 0:
         return {"label": "Unknown", "confidence": 0.0, "probabilities": []}
@@ -47,6 +38,68 @@ def predict_scan(image_file):
     }
 
 
+def predict_scan(image_file):
+    """
+    Core prediction function.
+    Returns a dictionary with the top class and a full probability breakdown:
+      {"label": str, "confidence": float(0-100), "probabilities": [{label, confidence}% ...]}
+    """
+    model = load_model()
+
+    image = Image.open(image_file).convert("RGB")
+    results = model.predict(image, verbose=False)[0]
+    return _result_to_dict(model, results)
+
+
+def _attach_embedding_hook(model, sink):
+    """
+    Collect the globally pooled input of the classification head (the
+    backbone feature vector) for every image the model processes, so
+    embeddings come out of the same forward pass as the prediction.
+    Returns the hook handle, or None if the model layout is unexpected.
+    """
+    try:
+        head = model.model.model[-1]
+    except Exception:
+        return None
+
+    def hook(_module, inputs):
+        feats = inputs[0]
+        parts = feats if isinstance(feats, (list, tuple)) else [feats]
+        pooled = [p.float().mean(dim=(2, 3)).detach().cpu().numpy() for p in parts]
+        sink.append(np.concatenate(pooled, axis=1).astype(np.float32))
+
+    return head.register_forward_pre_hook(hook)
+
+
+def predict_scans(image_files, batch_size: int = 16, with_embeddings: bool = False):
+    """
+    Batched version of predict_scan: one model call per batch_size images.
+    Returns a list of prediction dicts in the same order as image_files.
+    With with_embeddings=True each dict also has "embedding": a float32
+    NumPy vector (or None if it could not be captured).
+    """
+    model = load_model()
+    out = []
+    for start in range(0, len(image_files), batch_size):
+        chunk = image_files[start:start + batch_size]
+        images = [Image.open(f).convert("RGB") for f in chunk]
+        sink = []
+        handle = _attach_embedding_hook(model, sink) if with_embeddings else None
+        try:
+            results = model.predict(images, verbose=False)
+        finally:
+            if handle is not None:
+                handle.remove()
+        feats = np.concatenate(sink, axis=0) if sink else None
+        for i, r in enumerate(results):
+            item = _result_to_dict(model, r)
+            if with_embeddings:
+                item["embedding"] = feats[i] if feats is not None and i < len(feats) else None
+            out.append(item)
+    return out
+
+
 def run_scan_prediction(image_file):
     """
     Wrapper so imports stay consistent.
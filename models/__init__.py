@@ -2,3 +2,10 @@ from .user import User
 from .patient import Patient
 from .visit import Visit
 from .treatment import Treatment
+from .scan_blob import ScanBlob
+from .archived_file import ArchivedFile
+from .imported_file import ImportedFile
+from .annotation import Annotation
+from .annotation_revision import AnnotationRevision
+from .dashboard_counter import DashboardCounter
+from .index_generation import IndexGeneration
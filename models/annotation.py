@@ -0,0 +1,27 @@
+# models/annotation.py
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from core.time_utils import now_utc
+
+from core.database import Base
+
+class Annotation(Base):
+    """Index of saved annotation files (composite PNG + canvas JSON) per visit and scan.
+
+    Replaces globbing data/uploads/annotations; paths are project-relative.
+    """
+    __tablename__ = "annotations"
+    __table_args__ = (UniqueConstraint("visit_id", "scan_hash", name="uq_annotation_visit_scan"),)
+
+    id = Column(Integer, primary_key=True)
+    visit_id = Column(Integer, ForeignKey("visits.id"), index=True, nullable=False)
+    # _scan_hash() of the scan the annotation was drawn on ("legacy" for visit_<id> files)
+    scan_hash = Column(String(12), nullable=False)
+    image_path = Column(String, nullable=True)
+    json_path = Column(String, nullable=True)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    saved_at = Column(DateTime(timezone=True), default=now_utc)
+    author = Column(String, nullable=True)  # username of the doctor who saved it
+
+    def __repr__(self):
+        return f"<Annotation visit={self.visit_id} scan={self.scan_hash}>"
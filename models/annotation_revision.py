@@ -0,0 +1,31 @@
+# models/annotation_revision.py
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from core.time_utils import now_utc
+
+from core.database import Base
+
+class AnnotationRevision(Base):
+    """One saved version of a visit's annotation (per scan).
+
+    ``kind`` is "snapshot" (payload is the full canvas JSON) or "delta"
+    (payload is core.annotation_delta against the previous revision).
+    """
+    __tablename__ = "annotation_revisions"
+    __table_args__ = (
+        UniqueConstraint("visit_id", "scan_hash", "revision", name="uq_annotation_revision"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    visit_id = Column(Integer, ForeignKey("visits.id"), index=True, nullable=False)
+    scan_hash = Column(String(12), nullable=False)  # same key as annotations.scan_hash
+    revision = Column(Integer, nullable=False)  # 1, 2, ... (gaps after compaction)
+    kind = Column(String(8), nullable=False, default="snapshot")  # snapshot | delta
+    payload = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)  # stored payload
+    full_bytes = Column(Integer, nullable=False, default=0)  # size of the full canvas JSON
+    saved_at = Column(DateTime(timezone=True), default=now_utc)
+    author = Column(String, nullable=True)
+
+    def __repr__(self):
+        return f"<AnnotationRevision visit={self.visit_id} scan={self.scan_hash} r{self.revision} {self.kind}>"
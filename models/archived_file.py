@@ -0,0 +1,22 @@
+# models/archived_file.py
+
+from sqlalchemy import Column, Integer, String, DateTime
+from core.time_utils import now_utc
+
+from core.database import Base
+
+class ArchivedFile(Base):
+    """An upload file that was moved into a monthly archive (data/archive/YYYY-MM.zip)."""
+    __tablename__ = "archived_files"
+
+    # Original location as stored elsewhere (forward slashes, relative to project root)
+    path = Column(String, primary_key=True)
+
+    archive = Column(String, nullable=False)   # e.g. data/archive/2025-11.zip
+    member = Column(String, nullable=False)    # name inside the zip
+    original_size = Column(Integer, nullable=False)
+    archived_size = Column(Integer, nullable=False)
+    archived_at = Column(DateTime(timezone=True), default=now_utc)
+
+    def __repr__(self):
+        return f"<ArchivedFile {self.path} in {self.archive}>"
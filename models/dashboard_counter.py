@@ -0,0 +1,22 @@
+# models/dashboard_counter.py
+
+from sqlalchemy import Column, Integer, String
+
+from core.database import Base
+
+class DashboardCounter(Base):
+    """Materialised dashboard count, kept current by triggers (migration v0006).
+
+    metric "visits": visits per (doctor_username, status); metric "patients":
+    one row with the patient total. NULL doctor / status are stored as "" so
+    they fit the primary key.
+    """
+    __tablename__ = "dashboard_counters"
+
+    metric = Column(String, primary_key=True)
+    doctor_username = Column(String, primary_key=True, default="")
+    status = Column(String, primary_key=True, default="")
+    value = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DashboardCounter {self.metric} {self.doctor_username!r}/{self.status!r}={self.value}>"
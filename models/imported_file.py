@@ -0,0 +1,31 @@
+# models/imported_file.py
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from core.time_utils import now_utc
+
+from core.database import Base
+
+class ImportedFile(Base):
+    """Ledger of scan files ingested outside the upload page (bulk import, drop folder).
+
+    A source file whose path, size and mtime are unchanged is never imported twice.
+    The drop-folder watcher also records files it could not ingest: "failed"
+    rows are retried with backoff until SCAN_DROP_MAX_ATTEMPTS, "rejected"
+    rows (quality gate, second file of a series) only once the file changes.
+    """
+    __tablename__ = "imported_files"
+
+    id = Column(Integer, primary_key=True)
+    source_path = Column(String, index=True, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    sha256 = Column(String(64), index=True, nullable=False)  # "" when the file could not be read
+    visit_id = Column(Integer, ForeignKey("visits.id"), nullable=True)
+    origin = Column(String, nullable=False, default="bulk")  # bulk | watch
+    imported_at = Column(DateTime(timezone=True), default=now_utc)  # last attempt for failed rows
+    status = Column(String, nullable=False, default="imported", server_default="imported")  # imported | failed | rejected
+    attempts = Column(Integer, nullable=False, default=1, server_default="1")
+    error = Column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"<ImportedFile {self.source_path} -> visit {self.visit_id} ({self.status})>"
@@ -0,0 +1,20 @@
+# models/index_generation.py
+
+from sqlalchemy import Column, Integer, String
+
+from core.database import Base
+
+class IndexGeneration(Base):
+    """Counter bumped by triggers whenever an entry leaves a search index's source rows.
+
+    name "scan_phash": a scan_blobs row lost or changed its perceptual hash
+    (migration v0019); "scan_embedding": the same for its embedding (v0020). The in-process index rebuilds when the value moved
+    since its last sync; additions alone are caught by the row count.
+    """
+    __tablename__ = "index_generations"
+
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<IndexGeneration {self.name}={self.generation}>"
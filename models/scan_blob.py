@@ -0,0 +1,47 @@
+# models/scan_blob.py
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, LargeBinary, Index, text
+from core.time_utils import now_utc
+
+from core.database import Base
+
+class ScanBlob(Base):
+    """One stored scan file, shared by every visit that uploaded the same bytes."""
+    __tablename__ = "scan_blobs"
+    __table_args__ = (
+        # Covers the duplicate index's sync: COUNT of hashed rows and their hashes
+        Index("ix_scan_blobs_phashed", "sha256", "phash", sqlite_where=text("phash IS NOT NULL")),
+        # Same for the similar-case index (the vectors themselves stay in the table)
+        Index("ix_scan_blobs_embedded", "sha256", sqlite_where=text("embedding IS NOT NULL")),
+    )
+
+    # SHA-256 of the file content (also the file name inside data/uploads/store)
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    size_bytes = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=now_utc)
+
+    # Number of visits whose scan_path points at this blob
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    # Cached model output so re-uploads of identical bytes skip inference
+    prediction_label = Column(String, nullable=True)
+    prediction_confidence = Column(Float, nullable=True)
+    probabilities_json = Column(Text, nullable=True)
+    predicted_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Pre-inference quality gate (core.image_quality); NULL = not checked yet
+    quality_ok = Column(Boolean, nullable=True)
+    quality_reason = Column(Text, nullable=True)
+    quality_metrics_json = Column(Text, nullable=True)
+    quality_ms = Column(Float, nullable=True)
+
+    # 64-bit perceptual hash as 16 hex chars (core.phash), for near-duplicate search
+    phash = Column(String(16), nullable=True)
+
+    # Backbone feature vector from the same forward pass as the prediction,
+    # packed little-endian float32 (core.vector_index.pack_embedding)
+    embedding = Column(LargeBinary, nullable=True)
+
+    def __repr__(self):
+        return f"<ScanBlob {self.sha256[:12]} refs={self.ref_count}>"
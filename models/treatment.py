@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from core.database import Base
 
 class Treatment(Base):
     __tablename__ = "treatments"
+    __table_args__ = (
+        # Case review matches on all three; the other pages use the visit_id prefix
+        Index("ix_treatments_visit_patient", "visit_id", "patient_code", "patient_name"),
+    )
 
     id = Column(Integer, primary_key=True)
     visit_id = Column(Integer, ForeignKey("visits.id"))
@@ -1,6 +1,6 @@
 # models/visit.py
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy import Text
 from sqlalchemy.orm import relationship
 from core.time_utils import now_utc
@@ -9,6 +9,16 @@ from core.database import Base
 
 class Visit(Base):
     __tablename__ = "visits"
+    # Shaped after the page/service queries (see scripts/check_query_plans.py).
+    # SQLite appends the rowid (id) to every index entry, so "ORDER BY id"
+    # within an equality prefix needs no sort and no trailing id column.
+    __table_args__ = (
+        Index("ix_visits_doctor_status", "doctor_username", "status"),  # doctor dashboard / case list / queue
+        Index("ix_visits_doctor", "doctor_username"),  # a doctor's visits in id order (keyset pages, status IN)
+        Index("ix_visits_patient_doctor", "patient_id", "doctor_username"),  # history, latest visit per doctor
+        Index("ix_visits_status", "status"),  # technician counts and lists (covering for count)
+        Index("ix_visits_scan_path", "scan_path"),  # duplicate / similar-case lookups
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
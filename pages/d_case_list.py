@@ -1,11 +1,18 @@
 import streamlit as st
 from core.session_manager import require_role
-from core.helpers import render_doctor_sidebar, visit_code_display
+from core.helpers import (
+    keyset_cursor,
+    render_doctor_sidebar,
+    render_keyset_pager,
+    render_search_pager,
+    search_offset,
+    visit_code_display,
+)
 from services.user_service import get_current_user
-from core.database import get_db
+from core.database import request_scoped, request_db
+from services.search_service import search_visits
+from services.visit_service import doctor_visits_page
 from sqlalchemy.orm import Session
-from models.visit import Visit
-from models.patient import Patient
 
 
 def _status_label(status: str) -> str:
@@ -17,42 +24,36 @@ def _status_label(status: str) -> str:
     return m.get((status or "").strip(), status or "Cases")
 
 
+@request_scoped
 def main():
     require_role("doctor")
     render_doctor_sidebar()
 
-    db: Session = next(get_db())
+    db: Session = request_db()
     doctor = get_current_user()
 
     status = st.session_state.get("doctor_filter_status", "all")
     st.title(f"Cases — {_status_label(status) if status != 'all' else 'All'}")
 
     # Optional quick filter
-    q = st.text_input("Search (name, patient ID, or visit code)", placeholder="e.g., Jane or P003 or V001").strip().lower()
+    q = st.text_input("Search (name, patient ID, visit code, notes or plan)", placeholder="e.g., Jane or P003 or V001").strip().lower()
 
     # Load visits for this doctor by status
-    base_q = (
-        db.query(Visit, Patient)
-        .join(Patient, Visit.patient_id == Patient.id)
-        .filter(Visit.doctor_username == doctor.username)
-    )
-    if status and status != "all":
-        base_q = base_q.filter(Visit.status == status)
-    visits = base_q.order_by(Visit.id.desc()).all()
-
-    # Apply text filter
+    statuses = [status] if status and status != "all" else None
+    search_page = list_page = None
+    list_key = f"d_cases_{status}"
     if q:
-        def _match(vp):
-            v, p = vp
-            return (
-                q in (p.name or "").lower()
-                or q in (p.patient_id or "").lower()
-                or q in (v.visit_id or "").lower()
-            )
-        visits = [vp for vp in visits if _match(vp)]
+        # Ranked full-text search (services/search_service.py), one page at a time
+        search_page = search_visits(db, q, doctor.username, statuses, offset=search_offset("case_search", q))
+        visits = search_page["items"]
+    else:
+        list_page = doctor_visits_page(db, doctor.username, statuses, cursor=keyset_cursor(list_key))
+        visits = list_page["items"]
 
     if not visits:
         st.info("No cases found for this status.")
+        if list_page:
+            render_keyset_pager(list_page, list_key)  # "Previous" out of a page that emptied out
         if st.button("Back to Dashboard"):
             st.switch_page("pages/d_dashboard.py")
         return
@@ -86,6 +87,11 @@ def main():
                 st.switch_page("pages/d_view_case.py")
         st.markdown("---")
 
+    if search_page:
+        render_search_pager(search_page, "case_search")
+    else:
+        render_keyset_pager(list_page, list_key)
+
     cols = st.columns(2)
     with cols[0]:
         if st.button("Back to Dashboard", key="cases_footer_back_dashboard", use_container_width=True):
@@ -1,29 +1,18 @@
 import streamlit as st
 from services.user_service import get_current_user
-from services.visit_service import get_visits_for_patient
+from services.dashboard_counter_service import dashboard_metrics
+from services.visit_service import doctor_visits_page
 from core.session_manager import require_role
-from sqlalchemy.orm import Session
-from core.database import get_db
-from models.visit import Visit
-from models.patient import Patient
-from core.helpers import render_doctor_sidebar
+from core.database import request_scoped, request_db
+from core.helpers import keyset_cursor, render_doctor_sidebar, render_keyset_pager
 
-
-def get_doctor_visits(doctor_username: str, db: Session):
-    """Fetch all visits assigned to the logged-in doctor."""
-    return (
-        db.query(Visit)
-        .join(Patient, Visit.patient_id == Patient.id)
-        .filter(Visit.doctor_username == doctor_username)
-        .filter(Visit.status.in_(["sent_to_doctor", "in_review", "completed"]))
-        .order_by(Visit.id.desc())
-        .all()
-    )
+DASHBOARD_STATUSES = ["sent_to_doctor", "in_review", "completed"]
 
 
 # ----------------------------------------------
 # MAIN PAGE
 # ----------------------------------------------
+@request_scoped
 def main():
     require_role("doctor")  # Protect page (redirects if wrong role)
 
@@ -31,22 +20,21 @@ def main():
     st.title("Doctor Dashboard")
     st.write("Review cases assigned to you.")
 
-    db = next(get_db())
+    db = request_db()
     doctor = get_current_user()
 
-    # Fetch visit queue
-    visits = get_doctor_visits(doctor_username=doctor.username, db=db)
-
-    # Summary numbers
-    sent = len([v for v in visits if v.status == "sent_to_doctor"])
-    reviewing = len([v for v in visits if v.status == "in_review"])
-    done = len([v for v in visits if v.status == "completed"])
+    # Summary numbers (materialised counters, one lookup)
+    metrics = dashboard_metrics(db, doctor.username)
+    counts = metrics["visits"]
+    sent = counts.get("sent_to_doctor", 0)
+    reviewing = counts.get("in_review", 0)
+    done = counts.get("completed", 0)
 
     # Display summary stats
     st.subheader("Overview")
     # Compute all cases assigned and all patients in system
-    all_cases = len(visits)
-    all_patients = db.query(Patient).count()
+    all_cases = sum(counts.get(status, 0) for status in DASHBOARD_STATUSES)
+    all_patients = metrics["patients"]
 
     # Row 1: Waiting for Review, Completed
     r1c1, r1c2 = st.columns(2)
@@ -78,13 +66,14 @@ def main():
 
     st.subheader("Assigned Cases")
 
-    if not visits:
-        st.info("No cases assigned yet.")
-        return
-
-    for visit in visits:
-        patient = db.query(Patient).filter(Patient.id == visit.patient_id).first()
+    # One page of the visit queue with each visit's patient (keyset pagination)
+    cursor = keyset_cursor("d_dashboard")
+    page = doctor_visits_page(db, doctor.username, DASHBOARD_STATUSES, cursor=cursor)
+    if not page["items"]:
+        # Still render the pager (and logout) below: a later page can empty out
+        st.info("No more cases on this page." if cursor else "No cases assigned yet.")
 
+    for visit, patient in page["items"]:
         with st.container():
             st.write(f"### {patient.name} — ({patient.patient_id})")
             st.write(f"- Age: **{patient.age}**")
@@ -100,6 +89,8 @@ def main():
 
             # (Removed manual "Mark Completed" action as requested)
 
+    render_keyset_pager(page, "d_dashboard")
+
     st.divider()
     if st.button("Logout"):
         st.session_state.clear()
@@ -1,17 +1,18 @@
 import streamlit as st
 from core.session_manager import require_role
-from core.database import get_db
+from core.database import request_scoped, request_db
 from models.visit import Visit
 from models.treatment import Treatment
 import requests
 from core.helpers import render_doctor_sidebar
 
 
+@request_scoped
 def main():
     require_role("doctor")
     render_doctor_sidebar()
 
-    db = next(get_db())
+    db = request_db()
     visit_id = st.session_state.get("open_visit_id")
 
     if not visit_id:
@@ -3,8 +3,10 @@ from core.session_manager import require_role
 from core.helpers import render_doctor_sidebar, visit_code_display
 from services.patient_service import get_patient_by_id
 from services.visit_service import get_visits_for_patient
+from core.database import request_scoped
 
 
+@request_scoped
 def main():
     require_role("doctor")
     render_doctor_sidebar()
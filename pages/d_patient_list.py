@@ -1,13 +1,22 @@
 import streamlit as st
 from core.session_manager import require_role
-from core.helpers import render_doctor_sidebar, visit_code_display
+from core.helpers import (
+    keyset_cursor,
+    render_doctor_sidebar,
+    render_keyset_pager,
+    render_search_pager,
+    search_offset,
+    visit_code_display,
+)
 from services.user_service import get_current_user
-from core.database import get_db
-from models.patient import Patient
-from models.visit import Visit
+from services.patient_service import patients_page
+from services.search_service import search_patients
+from services.visit_service import latest_visits_by_patient
+from core.database import request_scoped, request_db
 from sqlalchemy.orm import Session
 
 
+@request_scoped
 def main():
     require_role("doctor")
     render_doctor_sidebar()
@@ -15,7 +24,7 @@ def main():
     st.title("Patient List")
     st.caption("Search by name or patient ID. View visit history.")
 
-    db: Session = next(get_db())
+    db: Session = request_db()
     doctor = get_current_user()
 
     # Optional visit status filter from session
@@ -24,27 +33,27 @@ def main():
     # Search
     q = st.text_input("Search", placeholder="e.g., Jane or P003").strip().lower()
 
-    # Base query: all patients; if a status filter is set, reduce to patients with such visits assigned to this doctor
-    patients_q = db.query(Patient)
-
-    if filter_status:
-        # Join with visits filtered by doctor + status, then distinct patients
-        patients_q = (
-            db.query(Patient)
-            .join(Visit, Visit.patient_id == Patient.id)
-            .filter(Visit.doctor_username == doctor.username)
-            .filter(Visit.status == filter_status)
-            .distinct()
-            .order_by(Patient.id.desc())
+    search_page = list_page = None
+    list_key = f"d_patients_{filter_status or 'all'}"
+    if q:
+        # Ranked full-text search (services/search_service.py), one page at a time
+        search_page = search_patients(
+            db,
+            q,
+            doctor_username=doctor.username if filter_status else None,
+            status=filter_status or None,
+            offset=search_offset("patient_search", q),
         )
+        patients = search_page["items"]
     else:
-        patients_q = patients_q.order_by(Patient.id.desc())
-
-    patients = patients_q.all()
-
-    # Search filter
-    if q:
-        patients = [p for p in patients if q in (p.name or "").lower() or q in (p.patient_id or "").lower()]
+        # If a status filter is set, only patients with such visits assigned to this doctor
+        list_page = patients_page(
+            db,
+            cursor=keyset_cursor(list_key),
+            doctor_username=doctor.username if filter_status else None,
+            status=filter_status or None,
+        )
+        patients = list_page["items"]
 
     # Empty state
     if not patients:
@@ -52,11 +61,16 @@ def main():
             st.info(f"No patients found with visits in status: {filter_status}.")
         else:
             st.info("No patients found.")
+        if list_page:
+            render_keyset_pager(list_page, list_key)  # "Previous" out of a page that emptied out
         if st.button("Clear Filter" if filter_status else "Back to Dashboard"):
             st.session_state.pop("doctor_filter_status", None)
             st.switch_page("pages/d_dashboard.py")
         return
 
+    # Most recent visit assigned to this doctor, for every patient on the page at once
+    latest = latest_visits_by_patient(db, doctor_username=doctor.username, patient_ids=[p.id for p in patients])
+
     # Render list
     for p in patients:
         with st.container():
@@ -64,13 +78,7 @@ def main():
             st.write(f"Age: {p.age}, Gender: {p.gender}")
 
             # Show last known status of the most recent visit assigned to this doctor
-            recent = (
-                db.query(Visit)
-                .filter(Visit.patient_id == p.id)
-                .filter(Visit.doctor_username == doctor.username)
-                .order_by(Visit.id.desc())
-                .first()
-            )
+            recent = latest.get(p.id)
             if recent:
                 st.caption(f"Latest Visit: {visit_code_display(recent.visit_id)} • Status: {recent.status}")
 
@@ -86,6 +94,11 @@ def main():
                         st.switch_page("pages/d_view_case.py")
         st.markdown("---")
 
+    if search_page:
+        render_search_pager(search_page, "patient_search")
+    else:
+        render_keyset_pager(list_page, list_key)
+
     # Footer actions
     cols = st.columns(2)
     with cols[0]:
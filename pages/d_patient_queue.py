@@ -1,6 +1,6 @@
 import streamlit as st
 from core.session_manager import require_role
-from core.database import get_db
+from core.database import request_scoped, request_db
 from sqlalchemy.orm import Session
 from models.visit import Visit
 from models.patient import Patient
@@ -16,13 +16,14 @@ def get_waiting_visits(doctor_username: str, db: Session):
     )
 
 
+@request_scoped
 def main():
     require_role("doctor")
 
     st.title("Patient Queue")
     st.write("Cases waiting for your review.")
 
-    db = next(get_db())
+    db = request_db()
     doctor = st.session_state["user"]
 
     visits = get_waiting_visits(doctor["username"], db)
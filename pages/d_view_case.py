@@ -1,14 +1,12 @@
 import streamlit as st
 from core.session_manager import require_role
-from core.database import get_db
+from core.database import request_scoped, request_db
 from sqlalchemy.orm import Session
 from models.visit import Visit
 from models.patient import Patient
 from models.treatment import Treatment
 from sqlalchemy import or_
 from core.helpers import render_doctor_sidebar
-from streamlit_drawable_canvas import st_canvas
-from PIL import Image
 import json, os, requests, re
 import hashlib
 from datetime import timezone
@@ -16,8 +14,27 @@ from core.time_utils import now_utc
 import openai
 from dotenv import load_dotenv
 from streamlit_searchbox import st_searchbox
-
-
+from services.scan_service import cached_prediction, get_scan_blob, infer_scans
+from core.archive_store import resolve_path
+from core.annotation_utils import (
+    annotation_history,
+    annotation_revision,
+    find_annotation,
+    get_annotation_paths,
+)
+from core.annotation_render import render_composite
+from core.annotation_writer import save_annotation_now, submit_annotation_save, save_status
+from core.media import render_image
+from core.scan_previews import preview_for
+from services.similar_case_service import similar_cases_for_visit
+
+try:
+    from core.annotation_canvas import annotation_canvas
+except ImportError:  # streamlit-drawable-canvas is optional
+    annotation_canvas = None
+
+
+@request_scoped
 def main():
     require_role("doctor")
     render_doctor_sidebar()
@@ -27,7 +44,7 @@ def main():
         st.error("No open case selected.")
         return
 
-    db = next(get_db())
+    db = request_db()
     visit = db.query(Visit).filter(Visit.id == visit_id).first()
     if not visit:
         st.error("Visit not found.")
@@ -130,9 +147,12 @@ def main():
         st.markdown("#### Annotate Scan")
         # Show prediction breakdown with top highlighted
         try:
-            from ml.predict import predict_scan
-            pred_result = predict_scan(visit.scan_path)
-            probs = pred_result.get("probabilities", []) or []
+            # Stored with the scan's blob when it was analysed; the model only runs if it wasn't
+            cached = cached_prediction(get_scan_blob(db, visit.scan_path))
+            if cached is not None:
+                probs = cached[2] or []
+            else:
+                probs = infer_scans([visit.scan_path], batch_size=1)[0].get("probabilities") or []
             if probs:
                 top = probs[0]
                 st.markdown(f"**Top Prediction:** :green[{top.get('label','—')} — {top.get('confidence',0)}%]")
@@ -144,14 +164,10 @@ def main():
         except Exception:
             st.caption("Predictions unavailable.")
         try:
-            from core.annotation_utils import get_annotation_paths
-            ann_img_path, ann_json_path = get_annotation_paths(visit)
-
-            bg_img = Image.open(visit.scan_path).convert("RGBA")
-            max_w = 900
-            if bg_img.width > max_w:
-                ratio = max_w / float(bg_img.width)
-                bg_img = bg_img.resize((int(bg_img.width * ratio), int(bg_img.height * ratio)))
+            if annotation_canvas is None:
+                raise ImportError("streamlit-drawable-canvas is not installed")
+            _, ann_json_path = get_annotation_paths(visit)
+            saved_annotation = find_annotation(visit)
 
             col_tools, col_canvas = st.columns([1, 4])
             with col_tools:
@@ -163,7 +179,9 @@ def main():
                 ann_show_key = f"show_ann_{visit.id}"
                 ann_loaded_key = f"loaded_ann_{visit.id}"
 
-                annotation_exists = os.path.exists(ann_json_path)
+                annotation_exists = bool(saved_annotation and saved_annotation[1])
+                if annotation_exists:
+                    ann_json_path = saved_annotation[1]
 
                 # Auto-load initial drawing if annotation exists and we've shown it before
                 auto_load = annotation_exists and st.session_state.get(ann_show_key, False)
@@ -188,50 +206,111 @@ def main():
                             initial = json.load(f)
                     except Exception:
                         initial = None
-                canvas_result = st_canvas(
+                # Scan decoded/resized/encoded once per scan (core.annotation_render)
+                canvas_result = annotation_canvas(
+                    visit.scan_path,
                     fill_color="rgba(255, 0, 0, 0.2)",
                     stroke_width=stroke_width,
                     stroke_color=stroke_color,
-                    background_color="#00000000",
-                    background_image=bg_img,
                     update_streamlit=True,
-                    height=bg_img.height,
-                    width=bg_img.width,
                     drawing_mode=draw_mode,
                     initial_drawing=initial,
                     key=f"canvas_{visit.id}",
                 )
 
-            save_col1, _, _ = st.columns([1,1,3])
+            save_token_key = f"ann_save_token_{visit.id}"
+            save_col1, save_col2, _ = st.columns([1,1,3])
             with save_col1:
                 if st.button("Save Annotation", key=f"save_ann_{visit.id}"):
-                    if canvas_result is not None and canvas_result.image_data is not None:
-                        img_data = canvas_result.image_data
-                        try:
-                            overlay = Image.fromarray(img_data.astype("uint8"), mode="RGBA")
-                        except Exception:
-                            overlay = Image.fromarray(img_data.astype("uint8"))
-                        if overlay.size != bg_img.size:
-                            overlay = overlay.resize(bg_img.size)
-                        try:
-                            base_rgba = bg_img if bg_img.mode == "RGBA" else bg_img.convert("RGBA")
-                            composed = Image.alpha_composite(base_rgba, overlay)
-                        except Exception:
-                            # Fallback: paste using alpha channel
-                            composed = bg_img.copy()
-                            composed.paste(overlay, (0, 0), overlay)
-                        composed.save(ann_img_path)
-                        if canvas_result.json_data is not None:
-                            with open(ann_json_path, "w", encoding="utf-8") as f:
-                                json.dump(canvas_result.json_data, f)
+                    if canvas_result is not None and canvas_result.json_data is not None:
+                        # Queued on the background writer (vector only; the composite is rendered lazily)
+                        author = getattr(st.session_state.get("user"), "username", None)
+                        st.session_state[save_token_key] = submit_annotation_save(
+                            visit, canvas_result.json_data, author=author, json_path=ann_json_path
+                        )
+                        st.session_state[ann_show_key] = True  # auto-show after save
+            with save_col2:
+                pending = (save_status(st.session_state.get(save_token_key)) or {}).get("state") in ("queued", "saving")
+
+                # Polls on its own while a save is pending; the page reruns once it is done
+                @st.fragment(run_every=1 if pending else None)
+                def save_status_panel():
+                    status = save_status(st.session_state.get(save_token_key))
+                    if status is None:
+                        return
+                    if status["state"] in ("queued", "saving"):
+                        st.caption("Saving annotation…")
+                    elif pending:
+                        st.rerun()
+                    elif status["state"] == "saved":
                         st.success("Annotation saved.")
                         st.session_state[f"ann_saved_{visit.id}"] = True
-                        st.session_state[ann_show_key] = True  # auto-show after save
+                        del st.session_state[save_token_key]
+                    elif status["state"] == "failed":
+                        st.error(f"Annotation could not be saved: {status['error']}")
+                        del st.session_state[save_token_key]
+                    elif status["state"] == "superseded":
+                        st.caption("Replaced by a newer save of this annotation.")
+                        del st.session_state[save_token_key]
+
+                save_status_panel()
+
+            # Saved revisions (stored as deltas; see services/annotation_revision_service.py)
+            history = annotation_history(visit)
+            if history:
+                with st.expander(f"Annotation History ({len(history)} revisions)"):
+                    for rev in history:
+                        saved = rev["saved_at"].strftime("%Y-%m-%d %H:%M") if rev["saved_at"] else "—"
+                        st.caption(
+                            f"r{rev['revision']} · {saved} · {rev['author'] or '—'} · "
+                            f"{rev['kind']} {rev['size_bytes']:,} B (full {rev['full_bytes']:,} B)"
+                        )
+                    chosen = st.selectbox(
+                        "Revision", [r["revision"] for r in history], key=f"ann_rev_{visit.id}"
+                    )
+                    rev_col1, rev_col2 = st.columns([1, 4])
+                    with rev_col1:
+                        if st.button("Restore", key=f"ann_restore_{visit.id}"):
+                            fabric = annotation_revision(visit, chosen)
+                            if fabric is not None:
+                                # Written before the rerun, so the canvas reloads the restored revision
+                                author = getattr(st.session_state.get("user"), "username", None)
+                                st.session_state[save_token_key] = save_annotation_now(
+                                    visit, fabric, author=author, json_path=ann_json_path
+                                )
+                                st.session_state[ann_show_key] = True
+                                st.rerun()
+                    with rev_col2:
+                        if st.checkbox("Preview", key=f"ann_rev_preview_{visit.id}"):
+                            fabric = annotation_revision(visit, chosen)
+                            if fabric is not None:
+                                st.image(render_composite(resolve_path(visit.scan_path), fabric), use_column_width=True)
 
             # Do not render the saved annotated image below; editing happens only in the canvas.
         except Exception:
             st.info("Annotation tool unavailable.")
 
+        # Most similar prior scans (cached embeddings) and how those cases went
+        try:
+            similar = similar_cases_for_visit(visit.id)
+        except Exception:
+            similar = []
+        if similar:
+            with st.expander(f"Similar Past Cases ({len(similar)})"):
+                for case in similar:
+                    col_img, col_info = st.columns([1, 3])
+                    with col_img:
+                        render_image(preview_for(case["scan_path"], 256))
+                    with col_info:
+                        conf = f" ({case['confidence']:.2f}%)" if case["confidence"] is not None else ""
+                        tpa = "—" if case["tpa_eligible"] is None else ("Eligible" if case["tpa_eligible"] else "NOT Eligible")
+                        st.markdown(
+                            f"**{case['patient_code']} · {case['visit_code']}** — similarity {case['similarity']:.2f}  \n"
+                            f"Prediction: {case['prediction'] or '—'}{conf} · tPA: {tpa} · Status: {case['status'] or '—'}"
+                        )
+                        if case["treatment"]:
+                            st.caption(case["treatment"][:300])
+
     if getattr(visit, 'tpa_eligible', None) is None:
         st.write("**tPA Eligibility:** —")
     else:
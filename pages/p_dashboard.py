@@ -1,18 +1,19 @@
 import streamlit as st
 from core.session_manager import require_role
 from core.helpers import render_patient_sidebar
-from core.database import get_db
+from core.database import request_scoped, request_db
 from sqlalchemy.orm import Session
 from models.patient import Patient
 from models.visit import Visit
 
 
+@request_scoped
 def main():
     require_role("patient")
     render_patient_sidebar()
 
     patient = st.session_state["user"]
-    db = next(get_db())
+    db = request_db()
 
     # Fetch Patient Object
     p = (
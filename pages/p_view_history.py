@@ -1,15 +1,18 @@
 import streamlit as st
 from core.session_manager import require_role
 from core.helpers import render_patient_sidebar
-from core.database import get_db
+from core.database import request_scoped, request_db
 from sqlalchemy.orm import Session
 from models.visit import Visit
 from models.patient import Patient
 from models.treatment import Treatment
 import os
 from core import database as db_core
+from core.scan_previews import preview_for
+from core.media import render_image
 
 
+@request_scoped
 def main():
     require_role("patient")
     render_patient_sidebar()
@@ -19,7 +22,7 @@ def main():
         return
 
     visit_id = st.session_state["patient_visit_id"]
-    db = next(get_db())
+    db = request_db()
 
     visit = db.query(Visit).filter(Visit.id == visit_id).first()
     if not visit:
@@ -48,20 +51,23 @@ def main():
 
     if visit.scan_path:
         try:
-            from core.annotation_utils import get_annotation_paths
-            ann_img_path, _ = get_annotation_paths(visit)
+            from core.annotation_utils import annotation_composite
+            ann_img_path = annotation_composite(visit)
         except Exception:
             base_dir = db_core.BASE_DIR
             ann_img_path = os.path.join(base_dir, "data", "uploads", "annotations", f"visit_{visit.id}.png")
 
+        from core.archive_store import resolve_path
+        ann_img_path = resolve_path(ann_img_path)
+
         col1, col2 = st.columns(2)
         with col1:
-            if os.path.exists(ann_img_path):
-                st.image(ann_img_path, caption="Annotated Scan", use_column_width=True)
+            if ann_img_path and os.path.exists(ann_img_path):
+                render_image(preview_for(ann_img_path, 768), caption="Annotated Scan")
             else:
                 st.info("No annotations available for this scan.")
         with col2:
-            st.image(visit.scan_path, caption="Original Uploaded Scan", use_column_width=True)
+            render_image(preview_for(visit.scan_path, 768), caption="Original Uploaded Scan")
 
     pred = getattr(visit, "prediction_label", None) or "—"
     conf = getattr(visit, "prediction_confidence", None)
@@ -1,12 +1,13 @@
 import streamlit as st
 from core.session_manager import require_role
 from core.helpers import render_patient_sidebar
-from core.database import get_db
+from core.database import request_scoped, request_db
 from sqlalchemy.orm import Session
 from models.treatment import Treatment
 from models.visit import Visit
 
 
+@request_scoped
 def main():
     require_role("patient")
     render_patient_sidebar()
@@ -16,7 +17,7 @@ def main():
         return
 
     visit_id = st.session_state["patient_visit_id"]
-    db = next(get_db())
+    db = request_db()
 
     treatment = (
         db.query(Treatment)
@@ -1,47 +1,33 @@
 import streamlit as st
-from sqlalchemy.orm import Session
 
 from core.session_manager import require_role
-from core.helpers import render_technician_sidebar, visit_code_display
-from core.database import get_db
-from models.visit import Visit
-from models.patient import Patient
-from sqlalchemy import or_
-
-
-def _get_filtered_visits(db: Session, status_filter: str):
-    q = (
-        db.query(Visit)
-        .join(Patient, Visit.patient_id == Patient.id)
-        .order_by(Visit.id.desc())
-    )
-
-    if status_filter == "not_reviewed":
-        not_reviewed_statuses = ["in_progress", "analysis_completed", "saved"]
-        q = q.filter(
-            or_(
-                Visit.status.is_(None),
-                Visit.status == "",
-                Visit.status.in_(not_reviewed_statuses),
-            )
-        )
-    elif status_filter == "completed":
-        q = q.filter(Visit.status == "completed")
-    elif status_filter == "all":
-        pass
-    else:
-        pass
-
-    return q.all()
-
-
+from core.helpers import (
+    keyset_cursor,
+    render_keyset_pager,
+    render_search_pager,
+    render_technician_sidebar,
+    search_offset,
+    visit_code_display,
+)
+from core.database import request_scoped, request_db
+from services.search_service import search_visits
+from services.visit_service import NOT_REVIEWED_STATUSES, technician_visits_page
+
+# Status sets passed to the search for each filter (None = no status yet)
+SEARCH_STATUSES = {
+    "not_reviewed": [None, ""] + NOT_REVIEWED_STATUSES,
+    "completed": ["completed"],
+}
+
+
+@request_scoped
 def main():
     require_role("technician")
     render_technician_sidebar()
 
     st.title("Technician Cases")
 
-    db = next(get_db())
+    db = request_db()
 
     status_filter = st.session_state.get("tech_filter_status", "all")
     human = {
@@ -52,32 +38,30 @@ def main():
 
     st.subheader(human)
 
-    visits = _get_filtered_visits(db, status_filter)
+    # Optional search by patient name or code
+    query = st.text_input("Search by patient name or patient ID", placeholder="e.g., Jane or P010").strip()
+
+    search_page = list_page = None
+    list_key = f"t_cases_{status_filter}"
+    if query:
+        # Ranked full-text search (services/search_service.py), one page at a time
+        search_page = search_visits(
+            db, query, statuses=SEARCH_STATUSES.get(status_filter), offset=search_offset("tech_case_search", query)
+        )
+        rows = search_page["items"]
+    else:
+        # One page of visits with their patients (keyset pagination)
+        list_page = technician_visits_page(db, status_filter, cursor=keyset_cursor(list_key))
+        rows = list_page["items"]
 
-    if not visits:
+    if not rows:
         st.info("No cases found for this filter.")
+        if list_page:
+            render_keyset_pager(list_page, list_key)  # "Previous" out of a page that emptied out
         if st.button("Back to Dashboard"):
             st.switch_page("pages/t_dashboard.py")
         return
 
-    # Optional search by patient name or code
-    query = st.text_input("Search by patient name or patient ID", placeholder="e.g., Jane or P010")
-
-    # Build list with patient details
-    rows = []
-    for v in visits:
-        p = db.query(Patient).filter(Patient.id == v.patient_id).first()
-        if not p:
-            continue
-        rows.append((v, p))
-
-    if query.strip():
-        q = query.lower()
-        rows = [
-            (v, p) for (v, p) in rows
-            if q in (p.name or "").lower() or q in (p.patient_id or "").lower()
-        ]
-
     for v, p in rows:
         with st.container():
             left, right = st.columns([3, 2])
@@ -100,6 +84,11 @@ def main():
                     st.write(f"Prediction: {pred}")
         st.markdown("---")
 
+    if search_page:
+        render_search_pager(search_page, "tech_case_search")
+    else:
+        render_keyset_pager(list_page, list_key)
+
     if st.button("Back to Dashboard", key="tech_back_dash"):
         st.switch_page("pages/t_dashboard.py")
 
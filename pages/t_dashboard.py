@@ -1,10 +1,9 @@
 import streamlit as st
 from core.session_manager import require_role, logout
 from core.helpers import render_technician_sidebar
-from services.patient_service import get_all_patients
+from services.dashboard_counter_service import dashboard_metrics
+from services.visit_service import NOT_REVIEWED_STATUSES
 from core.database import get_db_context
-from models.visit import Visit
-from sqlalchemy import or_
 
 # Page config is set globally in app.py
 
@@ -16,27 +15,18 @@ render_technician_sidebar()
 st.title("Technician Dashboard")
 
 
-# Load summary data
+# Load summary data (materialised counters, one lookup)
 with get_db_context() as db:
-    patients = get_all_patients(db)
-    total_patients = len(patients)
+    metrics = dashboard_metrics(db)
 
-    # Cases not reviewed yet (not sent to doctor and not completed)
-    not_reviewed_statuses = ["in_progress", "analysis_completed", "saved"]
-    not_reviewed = (
-        db.query(Visit)
-        .filter(
-            or_(
-                Visit.status.is_(None),
-                Visit.status == "",
-                Visit.status.in_(not_reviewed_statuses),
-            )
-        )
-        .count()
-    )
+total_patients = metrics["patients"]
+visit_counts = metrics["visits"]
 
-    # Completed cases
-    completed = db.query(Visit).filter(Visit.status == "completed").count()
+# Cases not reviewed yet (not sent to doctor and not completed); no status is ""
+not_reviewed = sum(visit_counts.get(status, 0) for status in [""] + NOT_REVIEWED_STATUSES)
+
+# Completed cases
+completed = visit_counts.get("completed", 0)
 
 st.subheader("Overview")
 colA, colB, colC = st.columns(3)
@@ -1,52 +1,74 @@
 import streamlit as st
 from core.session_manager import require_role
-from core.helpers import render_technician_sidebar
-from services.patient_service import list_patients, get_patient_by_id
+from core.helpers import (
+    keyset_cursor,
+    render_keyset_pager,
+    render_search_pager,
+    render_technician_sidebar,
+    search_offset,
+)
+from core.database import request_scoped, request_db
+from services.patient_service import patients_page
+from services.search_service import search_patients
 
 # Page config is set globally in app.py
 
-# Access control
-require_role("technician")
-render_technician_sidebar()
 
-st.title("Patient List")
-st.write("Select a patient to begin a new stroke visit or review past visits.")
+@request_scoped
+def main():
+    # Access control
+    require_role("technician")
+    render_technician_sidebar()
 
-# Search bar
-search_query = st.text_input("Search by name or patient ID", placeholder="e.g., John or P003")
+    st.title("Patient List")
+    st.write("Select a patient to begin a new stroke visit or review past visits.")
 
-# Load patients
-patients = list_patients()
+    db = request_db()
 
-# Filter
-if search_query.strip():
-    q = search_query.lower()
-    patients = [
-        p for p in patients
-        if q in p.name.lower() or q in p.patient_id.lower()
-    ]
+    # Search bar
+    search_query = st.text_input("Search by name or patient ID", placeholder="e.g., John or P003").strip()
 
-# If no patients
-if not patients:
-    st.info("No patients found.")
-    st.stop()
+    # Load one page of patients: ranked search results, or newest first
+    search_page = list_page = None
+    if search_query:
+        search_page = search_patients(db, search_query, offset=search_offset("tech_patient_search", search_query))
+        patients = search_page["items"]
+    else:
+        list_page = patients_page(db, cursor=keyset_cursor("t_patients"))
+        patients = list_page["items"]
 
-# Display table
-for p in patients:
-    with st.container():
-        st.write(f"**{p.name}**  —  {p.patient_id}")
-        st.write(f"Age: {p.age}, Gender: {p.gender}")
+    # If no patients
+    if not patients:
+        st.info("No patients found.")
+        if list_page:
+            render_keyset_pager(list_page, "t_patients")  # "Previous" out of a page that emptied out
+        st.stop()
 
-        col1, col2 = st.columns([1,1])
+    # Display table
+    for p in patients:
+        with st.container():
+            st.write(f"**{p.name}**  —  {p.patient_id}")
+            st.write(f"Age: {p.age}, Gender: {p.gender}")
 
-        with col1:
-            if st.button(f"Start New Visit ({p.patient_id})", key=f"new_{p.patient_id}"):
-                st.session_state["selected_patient"] = p.patient_id
-                st.switch_page("pages/t_patient_visit.py")
+            col1, col2 = st.columns([1,1])
 
-        with col2:
-            if st.button(f"View History ({p.patient_id})", key=f"history_{p.patient_id}"):
-                st.session_state["selected_patient"] = p.patient_id
-                st.switch_page("pages/t_patient_history.py")
+            with col1:
+                if st.button(f"Start New Visit ({p.patient_id})", key=f"new_{p.patient_id}"):
+                    st.session_state["selected_patient"] = p.patient_id
+                    st.switch_page("pages/t_patient_visit.py")
 
-        st.markdown("---")
+            with col2:
+                if st.button(f"View History ({p.patient_id})", key=f"history_{p.patient_id}"):
+                    st.session_state["selected_patient"] = p.patient_id
+                    st.switch_page("pages/t_patient_history.py")
+
+            st.markdown("---")
+
+    if search_page:
+        render_search_pager(search_page, "tech_patient_search")
+    else:
+        render_keyset_pager(list_page, "t_patients")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,39 +4,47 @@ from core.session_manager import require_role
 from core.helpers import render_technician_sidebar
 from services.patient_service import get_patient_by_id
 from services.visit_service import create_visit
+from core.database import request_scoped
 
-# Page config is set globally in app.py
 
-# Access control
-require_role("technician")
-render_technician_sidebar()
+@request_scoped
+def main():
+    # Page config is set globally in app.py
 
-st.title("New Stroke Visit")
+    # Access control
+    require_role("technician")
+    render_technician_sidebar()
 
-# Ensure a patient is selected
-if "selected_patient" not in st.session_state:
-    st.error("No patient selected. Please return to the patient list.")
-    st.stop()
+    st.title("New Stroke Visit")
 
-patient_id = st.session_state["selected_patient"]
-patient = get_patient_by_id(patient_id)
+    # Ensure a patient is selected
+    if "selected_patient" not in st.session_state:
+        st.error("No patient selected. Please return to the patient list.")
+        st.stop()
 
-if not patient:
-    st.error("Patient not found.")
-    st.stop()
+    patient_id = st.session_state["selected_patient"]
+    patient = get_patient_by_id(patient_id)
 
-# Show basic patient info
-st.subheader(f"Patient: {patient.name} ({patient.patient_id})")
-st.write(f"Age: {patient.age}, Gender: {patient.gender}")
-st.write("---")
+    if not patient:
+        st.error("Patient not found.")
+        st.stop()
 
-st.write("### Confirm that you want to start a new stroke visit for this patient.")
+    # Show basic patient info
+    st.subheader(f"Patient: {patient.name} ({patient.patient_id})")
+    st.write(f"Age: {patient.age}, Gender: {patient.gender}")
+    st.write("---")
 
-if st.button("Start Visit", type="primary"):
-    visit = create_visit(patient_id)
+    st.write("### Confirm that you want to start a new stroke visit for this patient.")
 
-    # Store visit ID in session so next pages can use it
-    st.session_state["current_visit_id"] = visit.id
+    if st.button("Start Visit", type="primary"):
+        visit = create_visit(patient_id)
 
-    st.success("Visit created successfully.")
-    st.switch_page("pages/t_vitals_entry.py")
+        # Store visit ID in session so next pages can use it
+        st.session_state["current_visit_id"] = visit.id
+
+        st.success("Visit created successfully.")
+        st.switch_page("pages/t_vitals_entry.py")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Move scans and annotation composites of old completed visits into
+monthly archives (data/archive/YYYY-MM.zip) and report the space saved.
+
+Run from the project root:
+
+    python -m scripts.archive_completed_scans --dry-run
+    python -m scripts.archive_completed_scans --min-age-days 60
+"""
+import argparse
+
+from core import migrations
+from core.database import get_db_context
+from core.archive_store import restore_cache_info
+from services.archive_service import archive_completed_visits, DEFAULT_MIN_AGE_DAYS
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-age-days", type=int, default=DEFAULT_MIN_AGE_DAYS,
+                        help="only archive visits older than this (default: 30)")
+    parser.add_argument("--dry-run", action="store_true", help="report only, move nothing")
+    args = parser.parse_args()
+
+    migrations.require_current()
+    with get_db_context() as db:
+        report = archive_completed_visits(db, min_age_days=args.min_age_days, dry_run=args.dry_run)
+
+    print(f"Files: {report['files']}")
+    print(f"Original: {_mb(report['original_bytes'])}  Archived: {_mb(report['archived_bytes'])}"
+          f"  Saved: {_mb(report['saved_bytes'])}")
+    for a in report["archives"]:
+        print(f"  {a}")
+    if args.dry_run:
+        print("Dry run — nothing moved.")
+    print(f"Restore cache: {restore_cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
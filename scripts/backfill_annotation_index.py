@@ -0,0 +1,90 @@
+"""Backfill: index existing annotation files in the ``annotations`` table.
+
+Walks data/uploads/annotations once and records every
+``ann_<patient>_<visit>_<scanhash>.png/.json`` pair (and legacy
+``visit_<id>.png/.json`` files) against its visit. Files whose visit no
+longer exists are reported and skipped. Safe to re-run.
+
+Run from the project root:
+
+    python -m scripts.backfill_annotation_index
+"""
+import os
+import re
+from datetime import datetime, timezone
+
+from core import migrations
+from core.database import DB_PATH, get_db_session
+from core.annotation_utils import ANNOTATION_DIR, LEGACY_SCAN_HASH, _rel
+from models.annotation import Annotation
+from models.visit import Visit
+
+_HASHED = re.compile(r"^ann_(?P<patient>.+?)_(?P<visit>.+)_(?P<hash>[0-9a-f]{12}|nohash)\.(?P<ext>png|json)$")
+_LEGACY = re.compile(r"^visit_(?P<pk>\d+)\.(?P<ext>png|json)$")
+
+
+def main():
+    print(f"Database: {DB_PATH}")
+    migrations.require_current()
+
+    session = get_db_session()
+    try:
+        visit_pk = dict(session.query(Visit.visit_id, Visit.id).all())
+        known_pks = set(visit_pk.values())
+
+        # (visit pk, scan hash) -> {"png": path, "json": path, "size": int, "mtime": float}
+        found = {}
+        unmatched = 0
+        try:
+            entries = list(os.scandir(ANNOTATION_DIR))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            m = _HASHED.match(entry.name)
+            if m:
+                pk, scan_hash = visit_pk.get(m.group("visit")), m.group("hash")
+            else:
+                m = _LEGACY.match(entry.name)
+                if not m:
+                    continue
+                pk, scan_hash = int(m.group("pk")), LEGACY_SCAN_HASH
+                if pk not in known_pks:
+                    pk = None
+            if pk is None:
+                unmatched += 1
+                continue
+            st = entry.stat()
+            rec = found.setdefault((pk, scan_hash), {"png": None, "json": None, "size": 0, "mtime": 0.0})
+            rec[m.group("ext")] = entry.path
+            rec["size"] += st.st_size
+            rec["mtime"] = max(rec["mtime"], st.st_mtime)
+
+        existing = {
+            (v, h): row
+            for row in session.query(Annotation).all()
+            for v, h in [(row.visit_id, row.scan_hash)]
+        }
+        added = updated = 0
+        for (pk, scan_hash), rec in found.items():
+            row = existing.get((pk, scan_hash))
+            if row is None:
+                row = Annotation(visit_id=pk, scan_hash=scan_hash)
+                session.add(row)
+                added += 1
+            else:
+                updated += 1
+            row.image_path = _rel(rec["png"])
+            row.json_path = _rel(rec["json"])
+            row.size_bytes = rec["size"]
+            row.saved_at = datetime.fromtimestamp(rec["mtime"], tz=timezone.utc)
+        session.commit()
+        print(f"Indexed {added} new and {updated} existing annotations ({unmatched} files without a visit skipped).")
+    finally:
+        session.close()
+    print("Backfill complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Backfill: embed every analysed scan into ``scan_blobs.embedding``.
+
+Runs the model in batches over blobs that have no embedding yet (the
+prediction cache is refreshed from the same forward pass). Needs the ML
+stack (ultralytics/torch). Safe to re-run.
+
+Run from the project root:
+
+    python -m scripts.backfill_scan_embeddings
+    python -m scripts.backfill_scan_embeddings --batch-size 32
+"""
+import argparse
+import os
+import time
+
+from core import migrations
+from core.database import BASE_DIR, DB_PATH, get_db_session
+from models.scan_blob import ScanBlob
+from services.scan_service import infer_scans, cache_prediction
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)
+    print(f"Database: {DB_PATH}")
+    migrations.require_current()
+
+    session = get_db_session()
+    try:
+        blobs = (
+            session.query(ScanBlob)
+            .filter(ScanBlob.embedding.is_(None))
+            .filter((ScanBlob.quality_ok.is_(None)) | (ScanBlob.quality_ok.is_(True)))
+            .all()
+        )
+        t0 = time.perf_counter()
+        embedded = 0
+        for start in range(0, len(blobs), args.batch_size):
+            chunk = blobs[start:start + args.batch_size]
+            for blob, r in zip(chunk, infer_scans([b.path for b in chunk], batch_size=args.batch_size)):
+                if r["embedding"] is None:
+                    continue
+                cache_prediction(blob, r["label"], r["confidence"], r["probabilities"], r["embedding"])
+                embedded += 1
+            session.commit()
+        print(f"Embedded {embedded} of {len(blobs)} scans in {time.perf_counter() - t0:.2f}s.")
+        if blobs and not embedded:
+            print("No embeddings produced - is the ML stack installed?")
+    finally:
+        session.close()
+    print("Backfill complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure the per-rerun cost of an image: st.image vs a signed media URL.
+
+Pages show each scan and annotation composite at its 768 px preview
+(core.scan_previews). This takes those same preview files and compares, per
+rerun of a page:
+
+* st.image: Streamlit's image_to_url, which reads the whole file, hashes
+  it and registers the bytes with the in-memory media manager every time,
+  and whose /media endpoint sends no Cache-Control header; and
+* media URL: core.media_server.signed_path, which stats the file and signs
+  a content-hashed URL (the file is hashed once per process).
+
+Both columns use the same file, so the preview downscaling is not counted.
+Finally one URL is fetched from the media server to show the cache headers
+the browser gets (a repeat view within the URL window costs no request).
+
+Run from the project root:
+
+    python -m scripts.bench_media_payload
+"""
+import argparse
+import os
+import time
+import urllib.request
+
+from streamlit.testing.v1 import AppTest
+
+from core.annotation_utils import get_annotation_paths
+from core.archive_store import resolve_path
+from core.database import BASE_DIR, get_db_context
+from core.media_server import MEDIA_PORT, ensure_server, signed_path
+from core.scan_previews import generate_previews, preview_for
+from models.visit import Visit
+
+RUNS = 20
+
+# image_to_url needs a Streamlit script run; AppTest provides one
+_ST_IMAGE_SCRIPT = """
+import time
+import streamlit as st
+import streamlit.elements.image as st_image
+
+timings = []
+for i, path in enumerate(st.session_state["paths"]):
+    best = float("inf")
+    for _ in range(st.session_state["runs"]):
+        t0 = time.perf_counter()
+        st_image.image_to_url(path, -1, False, "RGB", "auto", f"bench-{i}")
+        best = min(best, time.perf_counter() - t0)
+    timings.append(best)
+st.session_state["timings"] = timings
+"""
+
+
+def _st_image_seconds(paths):
+    at = AppTest.from_string(_ST_IMAGE_SCRIPT, default_timeout=120)
+    at.session_state["paths"] = paths
+    at.session_state["runs"] = RUNS
+    at.run()
+    return at.session_state["timings"]
+
+
+def _url_seconds(path, local):
+    signed_path(path, local)  # first use hashes the file
+    best = float("inf")
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        signed_path(path, local)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    os.chdir(BASE_DIR)
+    images = []
+    with get_db_context() as db:
+        for v in db.query(Visit).filter(Visit.scan_path.isnot(None)).all():
+            images.append(v.scan_path)
+            ann_png, _ = get_annotation_paths(v)
+            images.append(ann_png)
+
+    previews = []
+    for path in images:
+        local = resolve_path(path)
+        if not local or not os.path.exists(local):
+            continue
+        generate_previews(local)
+        previews.append(preview_for(local, 768))
+    if not previews:
+        print("No images found.")
+        return
+
+    st_times = _st_image_seconds(previews)
+    print(f"{'preview':<48} {'bytes':>9} {'st.image ms':>12} {'URL ms':>8}")
+    tot_bytes = tot_st = tot_url = 0.0
+    for preview, t_st in zip(previews, st_times):
+        size = os.path.getsize(preview)
+        t_url = _url_seconds(preview, preview)
+        tot_bytes += size
+        tot_st += t_st
+        tot_url += t_url
+        print(f"{os.path.basename(preview)[:48]:<48} {size:>9} {t_st * 1000:>12.3f} {t_url * 1000:>8.3f}")
+    print(f"\nPer rerun over {len(previews)} images: st.image reads, hashes and holds {int(tot_bytes)} B"
+          f" in {tot_st * 1000:.2f} ms; media URLs read 0 B in {tot_url * 1000:.2f} ms.")
+
+    if ensure_server():
+        url = f"http://127.0.0.1:{MEDIA_PORT}{signed_path(previews[0], previews[0])}"
+        with urllib.request.urlopen(url) as resp:
+            print(f"Media server: {resp.status}, {len(resp.read())} B, Cache-Control: {resp.headers['Cache-Control']}")
+    else:
+        print(f"Media server could not listen on port {MEDIA_PORT}; cache headers not checked.")
+
+
+if __name__ == "__main__":
+    main()
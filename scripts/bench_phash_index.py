@@ -0,0 +1,56 @@
+"""Benchmark near-duplicate lookups in the perceptual-hash index.
+
+Fills core.phash.MultiIndexHash with random 64-bit hashes, queries it with
+perturbed copies of stored hashes, and checks a sample of the results
+against a brute-force scan.
+
+Run from the project root:
+
+    python -m scripts.bench_phash_index
+    python -m scripts.bench_phash_index --size 500000 --radius 8
+"""
+import argparse
+import random
+import time
+
+from core.phash import MultiIndexHash, hamming
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="number of stored hashes")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--radius", type=int, default=6, help="Hamming radius (PHASH_MAX_DISTANCE)")
+    parser.add_argument("--verify", type=int, default=20, help="queries checked against brute force")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    items = [(rng.getrandbits(64), str(i)) for i in range(args.size)]
+    t0 = time.perf_counter()
+    index = MultiIndexHash(items)
+    build_s = time.perf_counter() - t0
+
+    queries = []
+    for _ in range(args.queries):
+        value = rng.choice(items)[0]
+        for bit in rng.sample(range(64), rng.randint(0, args.radius)):
+            value ^= 1 << bit
+        queries.append(value)
+
+    t0 = time.perf_counter()
+    results = [index.search(q, args.radius) for q in queries]
+    query_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    t0 = time.perf_counter()
+    for q, got in zip(queries[:args.verify], results[:args.verify]):
+        expected = sorted((d, k) for h, k in items if (d := hamming(q, h)) <= args.radius)
+        assert got == expected, f"mismatch for {q:016x}"
+    brute_ms = (time.perf_counter() - t0) * 1000 / max(1, min(args.verify, len(queries)))
+
+    print(f"Stored hashes: {args.size}  (built in {build_s:.2f}s)")
+    print(f"Index lookup:  {query_ms:.3f} ms/query at radius {args.radius}")
+    print(f"Brute force:   {brute_ms:.1f} ms/query (results identical on {args.verify} queries)")
+
+
+if __name__ == "__main__":
+    main()
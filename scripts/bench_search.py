@@ -0,0 +1,132 @@
+"""Benchmark full-text case search (services.search_service) against the old scan.
+
+Builds a temp database with the app schema and the FTS index (migration
+v0005). It seeds --visits visits through plain INSERTs, so the sync triggers
+do the indexing, then times a mix of queries two ways:
+
+  fts   search_visits(): ranked FTS5 match, one page of results
+  scan  what the case list did before: load every visit with its patient,
+        then filter with Python substring checks
+
+Run from the project root:
+
+    python -m scripts.bench_search
+    python -m scripts.bench_search --visits 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  (registers every table on Base.metadata)
+from core import migrations
+from core.database import Base, make_engine
+from models.patient import Patient
+from models.visit import Visit
+from services.search_service import search_visits
+
+FIRST = ["Jane", "John", "Amina", "Chen", "Olga", "Pedro", "Fatima", "Liam", "Noor", "Sven", "Mei", "Tariq"]
+LAST = ["Smith", "Okafor", "Garcia", "Ivanova", "Nakamura", "Haddad", "Kowalski", "Mensah", "Rossi", "Singh"]
+NOTES = [
+    "left sided weakness", "slurred speech since morning", "patient on warfarin", "facial droop noted",
+    "CT repeated due to motion", "family reports fall", "aphasia improving", "BP high on arrival",
+]
+PLANS = ["start tPA protocol", "admit to stroke unit", "antiplatelet therapy", "refer for thrombectomy"]
+QUERIES = ["jane", "okafor", "P0123", "V002", "warfarin", "thrombectomy", "amina garcia", "speech morning"]
+
+
+def _seed(conn, visits: int, doctors: int) -> None:
+    rng = random.Random(7)
+    patients = max(1, visits // 2)
+    conn.executemany(
+        "INSERT INTO patients (id, patient_id, name, age, gender) VALUES (?, ?, ?, ?, ?)",
+        [(i, f"P{i:05d}", f"{rng.choice(FIRST)} {rng.choice(LAST)}", rng.randint(30, 90), "F") for i in range(1, patients + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO visits (id, patient_id, visit_id, status, doctor_username, technician_notes) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (v, (v - 1) // 2 + 1, f"P{(v - 1) // 2 + 1:05d}-V{(v - 1) % 2 + 1:03d}",
+             rng.choice(["sent_to_doctor", "in_review", "completed"]), f"dr{v % doctors}", rng.choice(NOTES))
+            for v in range(1, visits + 1)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO treatments (visit_id, plan_text) VALUES (?, ?)",
+        [(v, rng.choice(PLANS)) for v in range(1, visits + 1, 3)],
+    )
+
+
+def _scan(db, query: str, doctor: str):
+    """The pre-FTS behaviour: every visit of the doctor, filtered in Python."""
+    rows = (
+        db.query(Visit, Patient)
+        .join(Patient, Visit.patient_id == Patient.id)
+        .filter(Visit.doctor_username == doctor)
+        .order_by(Visit.id.desc())
+        .all()
+    )
+    q = query.lower()
+    return [
+        (v, p) for v, p in rows
+        if q in (p.name or "").lower() or q in (p.patient_id or "").lower() or q in (v.visit_id or "").lower()
+    ]
+
+
+def _percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--visits", type=int, default=100000)
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=10, help="runs per query")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench-search-")
+    path = os.path.join(tmp, "search.db")
+    try:
+        eng = make_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=eng)
+        migrations.upgrade(path, report=lambda msg: None)
+
+        t0 = time.perf_counter()
+        raw = eng.raw_connection()
+        _seed(raw, args.visits, args.doctors)
+        raw.commit()
+        raw.close()
+        seed_s = time.perf_counter() - t0
+        print(f"Seeded {args.visits} visits in {seed_s:.1f}s ({args.visits / seed_s:.0f} visits/s with the FTS triggers)\n")
+
+        db = sessionmaker(bind=eng)()
+        print(f"{'query':<16} | {'fts p50':>8} {'p95':>7} {'page':>5} | {'scan p50':>8} {'p95':>7} {'hits':>6}  (ms, doctor dr1)")
+        for query in QUERIES:
+            fts, scan = [], []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                page = search_visits(db, query, doctor_username="dr1")
+                fts.append(time.perf_counter() - t)
+                db.expunge_all()
+            for _ in range(max(1, args.repeat // 5)):
+                t = time.perf_counter()
+                hits = _scan(db, query, "dr1")
+                scan.append(time.perf_counter() - t)
+                db.expunge_all()
+            print(
+                f"{query:<16} | {_percentile(fts, .5) * 1000:8.2f} {_percentile(fts, .95) * 1000:7.2f} "
+                f"{len(page['items']):>5} | {_percentile(scan, .5) * 1000:8.1f} {_percentile(scan, .95) * 1000:7.1f} "
+                f"{len(hits):>6}"
+            )
+        db.close()
+        eng.dispose()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
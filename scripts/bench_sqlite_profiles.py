@@ -0,0 +1,145 @@
+"""Benchmark the SQLite PRAGMA profiles in core.database under concurrency.
+
+For each profile a fresh database with the app schema is seeded in a temp
+directory. Writer threads then update visits and commit (technicians
+saving vitals), while reader threads run the doctor dashboard query, for a
+fixed time. The report shows throughput, latency percentiles and how many
+operations failed with "database is locked".
+
+Run from the project root:
+
+    python -m scripts.bench_sqlite_profiles
+    python -m scripts.bench_sqlite_profiles --profiles current balanced --writers 4 --readers 8 --seconds 10
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  (registers every table on Base.metadata)
+from core.database import Base, SQLITE_PROFILES, make_engine, sqlite_pragmas
+from models.patient import Patient
+from models.visit import Visit
+
+
+def _seed(Session, patients: int, visits_per: int) -> None:
+    db = Session()
+    try:
+        for p in range(patients):
+            patient = Patient(patient_id=f"P{p + 1:05d}", name=f"Bench {p}", age=40 + p % 50, gender="F")
+            db.add(patient)
+            db.flush()
+            for v in range(visits_per):
+                db.add(Visit(patient_id=patient.id, visit_id=f"P{p + 1:05d}-V{v + 1:03d}", status="in_progress"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_profile(profile: str, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix="bench-sqlite-")
+    engine = make_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    _seed(Session, args.patients, args.visits_per)
+    visit_ids = [pk for (pk,) in Session().query(Visit.id).all()]
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"write": [], "read": [], "locked": 0, "errors": 0}
+
+    def writer(seed: int):
+        rng = random.Random(seed)
+        db = Session()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                visit = db.get(Visit, rng.choice(visit_ids))
+                visit.heart_rate = rng.randint(50, 140)
+                visit.systolic_bp = rng.randint(90, 200)
+                db.commit()
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    stats["write"].append(elapsed)
+            except OperationalError as e:
+                db.rollback()
+                with lock:
+                    stats["locked" if "locked" in str(e) else "errors"] += 1
+        db.close()
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        db = Session()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                (
+                    db.query(Visit, Patient)
+                    .join(Patient, Patient.id == Visit.patient_id)
+                    .filter(Visit.status == rng.choice(["in_progress", "completed"]))
+                    .order_by(Visit.id.desc())
+                    .limit(50)
+                    .all()
+                )
+                db.commit()  # end the read transaction like a page rerun does
+                elapsed = time.perf_counter() - t0
+                with lock:
+                    stats["read"].append(elapsed)
+            except OperationalError as e:
+                db.rollback()
+                with lock:
+                    stats["locked" if "locked" in str(e) else "errors"] += 1
+        db.close()
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(1000 + i,)) for i in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    shutil.rmtree(tmp, ignore_errors=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--visits-per", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers / {args.readers} readers, {args.seconds:.0f}s per profile\n")
+    print(f"{'profile':>9} | {'writes/s':>8} {'p50 ms':>7} {'p95 ms':>7} | {'reads/s':>8} {'p50 ms':>7} {'p95 ms':>7} | {'locked':>6}")
+    for profile in args.profiles:
+        s = run_profile(profile, args)
+        print(
+            f"{profile:>9} | {len(s['write']) / args.seconds:8.0f} {_percentile(s['write'], .5) * 1000:7.2f} "
+            f"{_percentile(s['write'], .95) * 1000:7.2f} | {len(s['read']) / args.seconds:8.0f} "
+            f"{_percentile(s['read'], .5) * 1000:7.2f} {_percentile(s['read'], .95) * 1000:7.2f} | {s['locked']:6d}"
+        )
+    print("\nPRAGMAs per profile:")
+    for profile in args.profiles:
+        print(f"  {profile}: {sqlite_pragmas(profile) or '(SQLite defaults)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark similar-case lookups in core.vector_index.
+
+Builds exact and IVF indexes over synthetic clustered embeddings and reports
+build time, ms/query and the IVF recall@k against exact search.
+
+Run from the project root:
+
+    python -m scripts.bench_vector_index
+    python -m scripts.bench_vector_index --size 200000 --dim 256
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.vector_index import VectorIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(max(1, args.size // 250), args.dim)).astype(np.float32)
+    data = centers[rng.integers(0, len(centers), args.size)] + 0.3 * rng.normal(size=(args.size, args.dim)).astype(np.float32)
+    queries = data[rng.integers(0, args.size, args.queries)] + 0.1 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+
+    results = {}
+    for name, ivf_min in (("exact", args.size + 1), ("ivf", 1)):
+        t0 = time.perf_counter()
+        index = VectorIndex(((str(i), v) for i, v in enumerate(data)), ivf_min_size=ivf_min)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        results[name] = [index.search(q, args.k) for q in queries]
+        query_ms = (time.perf_counter() - t0) * 1000 / args.queries
+        print(f"{name:>5}: built in {build_s:.2f}s, {query_ms:.2f} ms/query")
+
+    recall = np.mean([
+        len({key for _, key in a} & {key for _, key in b}) / args.k
+        for a, b in zip(results["exact"], results["ivf"])
+    ])
+    print(f"IVF recall@{args.k}: {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
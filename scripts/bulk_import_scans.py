@@ -0,0 +1,58 @@
+"""Import a backlog of scans listed in a manifest CSV.
+
+The manifest has the columns file, patient_code and (optional) visit_code;
+file paths are relative to the manifest. Rows without a visit_code get a new
+visit. Files already imported (same path, size and mtime) are skipped, so an
+interrupted run can simply be started again.
+
+Run from the project root:
+
+    python -m scripts.bulk_import_scans backlog/manifest.csv
+    python -m scripts.bulk_import_scans backlog/manifest.csv --workers 8 --batch-size 32
+"""
+import argparse
+
+from core import migrations
+from services.bulk_import_service import (
+    import_manifest,
+    DEFAULT_WORKERS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_COMMIT_EVERY,
+)
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="CSV with file,patient_code,visit_code columns")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="threads hashing/storing files")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="images per model call")
+    parser.add_argument("--commit-every", type=int, default=DEFAULT_COMMIT_EVERY, help="files per DB transaction")
+    args = parser.parse_args()
+
+    migrations.require_current()
+    report = import_manifest(
+        args.manifest,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        commit_every=args.commit_every,
+    )
+
+    elapsed = max(report["elapsed_seconds"], 1e-9)
+    print(f"Manifest rows: {report['total']}  (already imported: {report['skipped']})")
+    print(f"Imported: {report['imported']} files, {_mb(report['bytes'])}"
+          f" ({report['new_blobs']} new in store, {report['inferred']} sent to the model)")
+    print(f"Time: {elapsed:.2f}s total, {report['store_seconds']:.2f}s hashing/storing,"
+          f" {report['inference_seconds']:.2f}s inference")
+    print(f"Throughput: {report['imported'] / elapsed:.1f} files/s, {report['bytes'] / (1024 * 1024) / elapsed:.2f} MB/s")
+    if report["failed"]:
+        print(f"Failed: {len(report['failed'])}")
+        for source, reason in report["failed"]:
+            print(f"  {source}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
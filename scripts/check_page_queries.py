@@ -0,0 +1,127 @@
+"""Count the SQL statements and time each list page per render.
+
+The doctor dashboard, case list and patient list, and the technician
+dashboard, case and patient lists, are rendered headlessly with Streamlit's
+AppTest. The database is a temp copy of the app schema (models plus
+migrations), seeded at two sizes. Every statement sent to SQLite during
+the render is counted. A page fails when:
+  - it issues more than --budget statements,
+  - its statement count grows with the number of cases (an N+1 loop), or
+  - its render time grows more than --max-growth times (an unpaginated list).
+
+Run from the project root:
+
+    python -m scripts.check_page_queries
+    python -m scripts.check_page_queries --sizes 200 20000 --budget 8
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from streamlit.testing.v1 import AppTest
+
+import models  # noqa: F401  (registers every table on Base.metadata)
+from core import migrations
+from core.database import BASE_DIR, Base, SessionLocal, engine, make_engine
+from models.patient import Patient
+from models.visit import Visit
+
+DOCTOR = "dr_check"
+RUNS = 3  # renders per size; the fastest is compared, to damp timer noise
+STATUSES = ["in_progress", "sent_to_doctor", "in_review", "completed"]
+PAGES = [
+    ("pages/d_dashboard.py", "doctor", {}),
+    ("pages/d_case_list.py", "doctor", {"doctor_filter_status": "all"}),
+    ("pages/d_case_list.py", "doctor", {"doctor_filter_status": "sent_to_doctor"}),
+    ("pages/d_patient_list.py", "doctor", {}),
+    ("pages/d_patient_list.py", "doctor", {"doctor_filter_status": "completed"}),
+    ("pages/t_case_list.py", "technician", {"tech_filter_status": "all"}),
+    ("pages/t_case_list.py", "technician", {"tech_filter_status": "not_reviewed"}),
+    ("pages/t_patient_list.py", "technician", {}),
+    ("pages/t_dashboard.py", "technician", {}),
+]
+
+
+def _seed(eng, cases: int) -> None:
+    db = SessionLocal(bind=eng)
+    try:
+        for i in range(cases // 2):
+            patient = Patient(patient_id=f"P{i + 1:05d}", name=f"Check {i}", age=40 + i % 50, gender="M")
+            db.add(patient)
+            db.flush()
+            for v in range(2):  # two visits per patient, one of them another doctor's
+                db.add(Visit(
+                    patient_id=patient.id,
+                    visit_id=f"{patient.patient_id}-V{v + 1:03d}",
+                    status=STATUSES[(i + v) % len(STATUSES)],
+                    doctor_username=DOCTOR if v == 0 or i % 3 else "dr_other",
+                ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def render(page: str, role: str, state: dict, cases: int):
+    """(statements, best seconds of RUNS renders) for ``page`` over ``cases`` seeded visits."""
+    tmp = tempfile.mkdtemp(prefix="page-queries-")
+    path = os.path.join(tmp, "pages.db")
+    eng = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=eng)
+    migrations.upgrade(path, report=lambda msg: None)  # search index, dashboard counters
+    _seed(eng, cases)
+
+    statements = []
+    event.listen(eng, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    SessionLocal.configure(bind=eng)  # pages open their sessions from SessionLocal
+    counts, times = [], []
+    try:
+        for _ in range(RUNS):
+            statements.clear()
+            at = AppTest.from_file(os.path.join(BASE_DIR, page), default_timeout=120)
+            at.session_state["user"] = SimpleNamespace(username=DOCTOR if role == "doctor" else "tech_check", role=role)
+            at.session_state["role"] = role
+            for key, value in state.items():
+                at.session_state[key] = value
+            t0 = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - t0)
+            counts.append(len(statements))
+            if at.exception:
+                raise RuntimeError(f"{page} raised: {at.exception[0].message}")
+    finally:
+        SessionLocal.configure(bind=engine)
+        eng.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return max(counts), min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs=2, type=int, default=[200, 5000], metavar=("SMALL", "LARGE"),
+                        help="number of visits seeded for the two runs")
+    parser.add_argument("--budget", type=int, default=6, help="max statements per page render")
+    parser.add_argument("--max-growth", type=float, default=2.0, help="max render time ratio LARGE / SMALL")
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)
+    small, large = args.sizes
+    failures = 0
+    print(f"{'page':<48} {'statements':>14} {'render ms':>15}")
+    print(f"{'':<48} {small:>6} {large:>7} {small:>7} {large:>7}")
+    for page, role, state in PAGES:
+        (q_small, t_small), (q_large, t_large) = [render(page, role, state, n) for n in (small, large)]
+        ok = q_large <= q_small and q_large <= args.budget and t_large <= t_small * args.max_growth
+        label = page + "".join(f" [{v}]" for v in state.values())
+        print(f"{label:<48} {q_small:>6} {q_large:>7} {t_small * 1000:>7.0f} {t_large * 1000:>7.0f}  {'ok' if ok else 'FAIL'}")
+        failures += not ok
+    print(f"\n{failures} page(s) over budget ({args.budget} statements), or growing with the number of cases.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Assert that the hot visit, treatment and scan queries are served by an index.
+
+Each query below has the same shape as the one issued by the page or
+service named next to it. Every query is compiled by SQLAlchemy and run
+through EXPLAIN QUERY PLAN. A query fails the check when the plan contains
+a full "SCAN visits", "SCAN treatments" or "SCAN scan_blobs" step, meaning
+no index was used for that table. Temp B-tree sorts are reported, and fail
+the keyset-paginated queries (PAGED): those must read one page in index
+order, not sort every matching row on each page.
+
+By default the check runs against a fresh schema in a temp directory, built
+from the models (what a new install gets). Use --live to check
+data/stroke.db instead. That needs scripts.migrate_query_indexes to have
+run first. Exits 1 if any query fails.
+
+Run from the project root:
+
+    python -m scripts.check_query_plans
+    python -m scripts.check_query_plans --live --verbose
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import sessionmaker
+
+import models  # noqa: F401  (registers every table on Base.metadata)
+from core.database import Base, engine as live_engine, make_engine
+from models.index_generation import IndexGeneration
+from models.patient import Patient
+from models.scan_blob import ScanBlob
+from models.treatment import Treatment
+from models.visit import Visit
+
+CHECKED_TABLES = ("visits", "treatments", "scan_blobs")
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+NOT_REVIEWED = ["in_progress", "analysis_completed", "saved"]  # t_case_list / t_dashboard
+
+# Queries behind services.pagination pages; a temp sort fails these
+PAGED = {
+    "d_dashboard: doctor + status IN, newest first",
+    "d_case_list: doctor, newest first",
+    "d_case_list: doctor + status, newest first",
+    "visit_service.doctor_visits_page: next page of a doctor's queue",
+    "visit_service.technician_visits_page: next page of completed",
+    "patient_service.patients_page: patients with a doctor's visits in a status",
+}
+
+
+def hot_queries(db):
+    """(name, Query) for every hot query shape."""
+    return [
+        ("d_dashboard: doctor + status IN, newest first",
+         db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+         .filter(Visit.doctor_username == "dr")
+         .filter(Visit.status.in_(["sent_to_doctor", "in_review", "completed"]))
+         .order_by(Visit.id.desc())),
+        ("d_case_list: doctor, newest first",
+         db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+         .filter(Visit.doctor_username == "dr").order_by(Visit.id.desc())),
+        ("d_case_list: doctor + status, newest first",
+         db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+         .filter(Visit.doctor_username == "dr").filter(Visit.status == "in_review").order_by(Visit.id.desc())),
+        ("d_patient_queue: doctor + sent_to_doctor",
+         db.query(Visit).filter(Visit.doctor_username == "dr").filter(Visit.status == "sent_to_doctor")
+         .order_by(Visit.id.desc())),
+        ("d_patient_list: patients with a doctor's visits in a status",
+         db.query(Patient).join(Visit, Visit.patient_id == Patient.id)
+         .filter(Visit.doctor_username == "dr").filter(Visit.status == "completed")
+         .distinct().order_by(Patient.id.desc())),
+        ("d_patient_list: latest visit of a patient for a doctor",
+         db.query(Visit).filter(Visit.patient_id == 1).filter(Visit.doctor_username == "dr")
+         .order_by(Visit.id.desc()).limit(1)),
+        ("p_dashboard / d_view_case: visits of a patient",
+         db.query(Visit).filter(Visit.patient_id == 1).order_by(Visit.id.desc())),
+        ("visit_service: visit count of a patient",
+         db.query(Visit).filter(Visit.patient_id == 1).with_entities(Visit.id)),
+        ("drop_folder_service: open visits of a patient",
+         db.query(Visit).filter(Visit.patient_id == 1).filter(Visit.status.in_(["in_progress", "sent_to_doctor"]))
+         .order_by(Visit.timestamp.desc(), Visit.id.desc())),
+        ("t_dashboard: completed count",
+         db.query(Visit.id).filter(Visit.status == "completed")),
+        ("t_case_list: not reviewed",
+         db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+         .filter(or_(Visit.status.is_(None), Visit.status == "", Visit.status.in_(NOT_REVIEWED)))
+         .order_by(Visit.id.desc())),
+        ("archive_service: completed visits",
+         db.query(Visit.id, Visit.scan_path).filter(Visit.status == "completed")),
+        ("duplicate_service / similar_case_service: visits by scan path",
+         db.query(Visit.id, Visit.patient_id, Visit.scan_path).filter(Visit.scan_path.in_(["a.png", "b.png"]))),
+        ("visit_service.doctor_visits_page: next page of a doctor's queue",
+         db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+         .filter(Visit.doctor_username == "dr").filter(Visit.status.in_(["sent_to_doctor", "in_review"]))
+         .filter(Visit.id < 5000).order_by(Visit.id.desc()).limit(21)),
+        ("visit_service.technician_visits_page: next page of completed",
+         db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+         .filter(Visit.status == "completed").filter(Visit.id < 5000).order_by(Visit.id.desc()).limit(21)),
+        ("patient_service.patients_page: patients with a doctor's visits in a status",
+         db.query(Patient).filter(
+             db.query(Visit.id).filter(Visit.patient_id == Patient.id, Visit.doctor_username == "dr",
+                                       Visit.status == "completed").exists()
+         ).filter(Patient.id < 5000).order_by(Patient.id.desc()).limit(21)),
+        ("d_view_case: treatment of a visit for the patient",
+         db.query(Treatment).filter(Treatment.visit_id == 1)
+         .filter(Treatment.patient_code == "P001").filter(Treatment.patient_name == "Jane").limit(1)),
+        ("d_finalise / p_view_treatment / p_view_history: treatment of a visit",
+         db.query(Treatment).filter(Treatment.visit_id == 1).limit(1)),
+        ("duplicate_service: hashed scan count (index sync)",
+         db.query(func.count(ScanBlob.sha256)).filter(ScanBlob.phash.isnot(None))),
+        ("duplicate_service: hash removal generation (index sync)",
+         db.query(IndexGeneration.generation).filter(IndexGeneration.name == "scan_phash")),
+        ("duplicate_service: hashed scans (index top-up)",
+         db.query(ScanBlob.sha256, ScanBlob.phash).filter(ScanBlob.phash.isnot(None))),
+        ("similar_case_service: embedded scan count (index sync)",
+         db.query(func.count(ScanBlob.sha256)).filter(ScanBlob.embedding.isnot(None))),
+        ("similar_case_service: embedding removal generation (index sync)",
+         db.query(IndexGeneration.generation).filter(IndexGeneration.name == "scan_embedding")),
+        ("similar_case_service: embedded shas (index top-up)",
+         db.query(ScanBlob.sha256).filter(ScanBlob.embedding.isnot(None))),
+    ]
+
+
+def query_plan(conn, query):
+    sql = str(query.statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+def full_scans(plan):
+    """Checked tables that a plan reads without an index."""
+    scans = []
+    for detail in plan:
+        m = _FULL_SCAN.match(detail.strip())
+        if m and m.group(1) in CHECKED_TABLES:
+            scans.append(m.group(1))
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="check data/stroke.db instead of a fresh schema")
+    parser.add_argument("--verbose", "-v", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.live:
+        eng = live_engine
+    else:
+        tmp = tempfile.mkdtemp(prefix="query-plans-")
+        eng = make_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        Base.metadata.create_all(bind=eng)
+
+    failures = 0
+    db = sessionmaker(bind=eng)()
+    queries = hot_queries(db)
+    try:
+        with eng.connect() as conn:
+            for name, query in queries:
+                plan = query_plan(conn, query)
+                scans = full_scans(plan)
+                sort = any("TEMP B-TREE" in d for d in plan)
+                failed = bool(scans) or (sort and name in PAGED)
+                if scans:
+                    note = f"  full scan of {', '.join(scans)}"
+                elif sort:
+                    note = "  temp sort of a paginated query" if name in PAGED else "  (temp sort)"
+                else:
+                    note = ""
+                print(f"{'FAIL' if failed else 'ok':>4}  {name}{note}")
+                if args.verbose or failed:
+                    for detail in plan:
+                        print(f"        {detail}")
+                failures += failed
+    finally:
+        db.close()
+        if tmp:
+            eng.dispose()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{failures} of {len(queries)} hot queries fall back to a table scan or sort a page.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
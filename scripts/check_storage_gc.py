@@ -0,0 +1,106 @@
+"""Dry-run the upload garbage collector over seeded scans of every extension.
+
+A temp database gets one visit per scan type (.png, .jpg, .jpeg), each
+with its stored file and previews under data/uploads. Previews are also
+written for a scan that no row references. The collector then runs in
+dry-run mode (nothing is deleted). The check fails when a referenced scan
+or any of its previews is reported as an orphan, or the unreferenced
+previews are not. The seeded files are removed afterwards.
+
+Run from the project root:
+
+    python -m scripts.check_storage_gc
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+import models  # noqa: F401  (registers every table on Base.metadata)
+from core import migrations
+from core.database import BASE_DIR, Base, SessionLocal, make_engine
+from core.scan_previews import generate_previews
+from core.scan_store import put_bytes
+from models.patient import Patient
+from models.scan_blob import ScanBlob
+from models.visit import Visit
+from services.storage_gc import collect_garbage
+
+CASES = [(".png", "PNG"), (".jpg", "JPEG"), (".jpeg", "JPEG")]
+
+
+def _image_bytes(fmt: str, seed: int) -> bytes:
+    # Random pixels, so each run stores new blobs instead of reusing real ones
+    pixels = np.random.default_rng(seed).integers(0, 255, (96, 128), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    os.chdir(BASE_DIR)
+    tmp = tempfile.mkdtemp(prefix="storage-gc-")
+    path = os.path.join(tmp, "gc.db")
+    eng = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=eng)
+    migrations.upgrade(path, report=lambda msg: None)
+    db = SessionLocal(bind=eng)
+
+    seed = int.from_bytes(os.urandom(4), "little")
+    kept, created = {}, []
+    try:
+        patient = Patient(patient_id="P90001", name="GC Check", age=50, gender="F")
+        db.add(patient)
+        db.flush()
+        for i, (ext, fmt) in enumerate(CASES):
+            scan, digest, _ = put_bytes(_image_bytes(fmt, seed + i), ext)
+            files = [scan] + generate_previews(scan)
+            created += files
+            kept[ext] = [os.path.normpath(os.path.join(BASE_DIR, f)) for f in files]
+            db.add(ScanBlob(sha256=digest, path=scan, size_bytes=os.path.getsize(scan), ref_count=1))
+            db.add(Visit(patient_id=patient.id, visit_id=f"P90001-V{i + 1:03d}", scan_path=scan,
+                         status="completed"))
+        db.commit()
+
+        # A scan whose row is gone: its previews are real orphans
+        gone, _, _ = put_bytes(_image_bytes("JPEG", seed + len(CASES)), ".jpg")
+        stale = generate_previews(gone)
+        os.remove(gone)
+        created += stale
+        stale = {os.path.normpath(os.path.join(BASE_DIR, f)) for f in stale}
+
+        report = collect_garbage(db, grace_seconds=0, dry_run=True)
+        orphans = {p for p, _ in report["orphans"]}
+    finally:
+        db.close()
+        eng.dispose()
+        for f in created:
+            if os.path.exists(f):
+                os.remove(f)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    failures = 0
+    for ext, files in kept.items():
+        wrong = [f for f in files if f in orphans]
+        print(f"  {'ok' if not wrong else 'FAIL'}  {ext:<6} scan + {len(files) - 1} previews kept")
+        for f in wrong:
+            print(f"        reported as orphan: {os.path.relpath(f, BASE_DIR)}")
+        failures += bool(wrong)
+    missed = stale - orphans
+    print(f"  {'ok' if not missed else 'FAIL'}  stale previews of a deleted scan reported: "
+          f"{len(stale) - len(missed)}/{len(stale)}")
+    failures += bool(missed)
+    print(f"\n{failures} check(s) failed (dry run, nothing deleted).")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Maintain annotation revision history (``annotation_revisions``).
+
+* Refuses to run while migrations are pending (run scripts.migrate first).
+* Annotations that were saved before versioning existed get their current
+  JSON as revision 1.
+* Re-snapshots delta chains longer than ANNOTATION_SNAPSHOT_EVERY.
+* With ``--fold-older-than DAYS``, collapses revisions older than that into
+  a single snapshot (older history is dropped).
+* Prints storage per revision before and after.
+
+Safe to re-run. Run from the project root:
+
+    python -m scripts.compact_annotation_revisions
+    python -m scripts.compact_annotation_revisions --fold-older-than 365
+"""
+import argparse
+import json
+from datetime import timedelta
+
+from core.annotation_utils import _abs
+from core import migrations
+from core.database import DB_PATH, get_db_session
+from core.time_utils import now_utc
+from models.annotation import Annotation
+from models.annotation_revision import AnnotationRevision
+from services.annotation_revision_service import (
+    SNAPSHOT_EVERY,
+    add_revision,
+    compact_revisions,
+    storage_report,
+)
+
+
+def _print_report(label: str, report: dict) -> None:
+    saved = 1 - report["stored_bytes"] / report["full_bytes"] if report["full_bytes"] else 0.0
+    print(
+        f"{label}: {report['revisions']} revisions ({report['snapshots']} snapshots, {report['deltas']} deltas), "
+        f"{report['stored_bytes']} bytes stored, {report['bytes_per_revision']:.0f} bytes/revision, "
+        f"{saved:.0%} smaller than full copies"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fold-older-than", type=int, default=None, metavar="DAYS",
+                        help="Collapse revisions saved more than DAYS ago into one snapshot")
+    args = parser.parse_args()
+
+    print(f"Database: {DB_PATH}")
+    migrations.require_current()
+
+    session = get_db_session()
+    try:
+        versioned = set(session.query(AnnotationRevision.visit_id, AnnotationRevision.scan_hash).distinct().all())
+        seeded = 0
+        for row in session.query(Annotation).filter(Annotation.json_path.isnot(None)).all():
+            if (row.visit_id, row.scan_hash) in versioned:
+                continue
+            try:
+                with open(_abs(row.json_path), "r", encoding="utf-8") as f:
+                    fabric = json.load(f)
+            except (OSError, ValueError):
+                continue
+            rev = add_revision(session, row.visit_id, row.scan_hash, fabric, author=row.author)
+            if rev is not None and row.saved_at is not None:
+                rev.saved_at = row.saved_at
+            seeded += 1
+        session.commit()
+        if seeded:
+            print(f"Seeded history for {seeded} existing annotations.")
+
+        _print_report("Before", storage_report(session))
+        fold_before = now_utc() - timedelta(days=args.fold_older_than) if args.fold_older_than is not None else None
+        stats = compact_revisions(session, fold_before=fold_before)
+        print(
+            f"Compacted {stats['annotations']} annotations (snapshot every {SNAPSHOT_EVERY}): "
+            f"{stats['snapshotted']} deltas folded into snapshots, {stats['deleted']} old revisions removed, "
+            f"{stats['bytes_before']} -> {stats['bytes_after']} bytes."
+        )
+        _print_report("After", storage_report(session))
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
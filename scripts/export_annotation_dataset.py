@@ -0,0 +1,59 @@
+"""Export saved annotations as a COCO-style segmentation dataset.
+
+Every annotation in the ``annotations`` index whose scan is still attached
+to its visit is rasterised per canvas object into a binary mask at the
+scan's full resolution and stored as COCO compressed RLE. Writes
+``<out>/annotations.json`` and links or copies the scans into
+``<out>/images/``. Work is done in batches on a process pool with a bounded
+number of batches in flight.
+
+Run from the project root:
+
+    python -m scripts.export_annotation_dataset
+    python -m scripts.export_annotation_dataset --out data/exports/ds1 --workers 4 --batch-size 64
+    python -m scripts.export_annotation_dataset --no-images
+"""
+import argparse
+import os
+import time
+
+from core.database import BASE_DIR, DB_PATH, get_db_session
+from core.time_utils import now_utc
+from services.dataset_export_service import EXPORT_BATCH_SIZE, export_annotation_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=None, help="Output directory (default data/exports/annotations-<timestamp>)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-images", action="store_true", help="Write the manifest only")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join(BASE_DIR, "data", "exports", f"annotations-{now_utc():%Y%m%d-%H%M%S}")
+    print(f"Database: {DB_PATH}")
+    print(f"Output:   {out_dir}")
+
+    t0 = time.perf_counter()
+
+    def report(stats):
+        print(f"  {stats['processed']} annotations processed, {stats['images']} images, {stats['annotations']} masks", end="\r")
+
+    session = get_db_session()
+    try:
+        stats = export_annotation_dataset(
+            session, out_dir, batch_size=args.batch_size, workers=args.workers,
+            copy_images=not args.no_images, report=report,
+        )
+    finally:
+        session.close()
+    print()
+    skipped = ", ".join(f"{k}: {v}" for k, v in sorted(stats["skipped"].items())) or "none"
+    print(f"Exported {stats['images']} images / {stats['annotations']} masks in {time.perf_counter() - t0:.1f}s (skipped {skipped}).")
+    for err in stats["errors"][:10]:
+        print(f"  error: {err}")
+    print(f"Manifest: {stats['manifest']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Report or delete upload files that no visit references any more.
+
+Dry run by default; pass --delete to actually remove files.
+
+Run from the project root:
+
+    python -m scripts.gc_uploads                 # report only
+    python -m scripts.gc_uploads --delete        # remove orphans older than 24h
+    python -m scripts.gc_uploads --grace-hours 1 --delete
+"""
+import argparse
+
+from core.database import get_db_context
+from services.storage_gc import collect_garbage, DEFAULT_GRACE_SECONDS
+
+
+def _mb(n: int) -> str:
+    return f"{n / (1024 * 1024):.2f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delete", action="store_true", help="delete orphaned files (default: dry run)")
+    parser.add_argument("--grace-hours", type=float, default=DEFAULT_GRACE_SECONDS / 3600,
+                        help="keep orphans modified within this many hours (default: 24)")
+    parser.add_argument("--list", type=int, default=20, help="print up to N largest orphans")
+    args = parser.parse_args()
+
+    with get_db_context() as db:
+        report = collect_garbage(db, grace_seconds=int(args.grace_hours * 3600), dry_run=not args.delete)
+
+    print(f"Scanned: {report['scanned_files']} files, {_mb(report['scanned_bytes'])}")
+    print(f"Orphaned: {report['orphan_files']} files, {_mb(report['orphan_bytes'])}"
+          f" (plus {report['kept_recent']} inside the grace period)")
+    for path, size in report["orphans"][:args.list]:
+        print(f"  {_mb(size):>10}  {path}")
+    if args.delete:
+        print(f"Deleted: {report['deleted_files']} files, {_mb(report['deleted_bytes'])}")
+    else:
+        print("Dry run — nothing deleted. Re-run with --delete to remove.")
+
+
+if __name__ == "__main__":
+    main()
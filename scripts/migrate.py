@@ -0,0 +1,47 @@
+"""Apply pending schema migrations (core/migrations) to data/stroke.db.
+
+Migrations run in version order and each is recorded in schema_migrations.
+Backfills run in primary-key batches with a checkpoint per batch. The app
+can stay up during a long backfill, and an interrupted run continues where
+it stopped.
+
+Run from the project root:
+
+    python -m scripts.migrate                 # apply everything pending
+    python -m scripts.migrate --status        # list applied / pending versions
+    python -m scripts.migrate --to 3 --batch-size 500
+"""
+import argparse
+import sys
+
+from core import migrations
+from core.database import DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="show migration state and exit")
+    parser.add_argument("--to", type=int, default=None, metavar="VERSION", help="stop after this version")
+    parser.add_argument("--batch-size", type=int, default=migrations.BATCH_SIZE)
+    parser.add_argument("--db", default=DB_PATH, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    print(f"Database: {args.db}")
+    if args.status:
+        for row in migrations.status(args.db):
+            state = f"applied {row['applied_at']}" if row["applied_at"] else "pending"
+            print(f"  v{row['version']:04d} {row['name']:<70} {state}")
+            for cp in row["checkpoints"]:
+                print(f"        {cp['step']}: {cp['rows_done']} rows, last id {cp['last_id']}")
+        return
+
+    try:
+        applied = migrations.upgrade(args.db, target=args.to, batch_size=args.batch_size)
+    except Exception as e:
+        print(f"Migration failed: {e}")
+        sys.exit(1)
+    print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,14 @@
-import sqlite3
-import os
-
-# Resolve DB path relative to repo root
-ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH = os.path.join(ROOT_DIR, 'data', 'stroke.db')
+# scripts/migrate_onset_time.py
+# Kept for existing instructions; the change is now migration v0001 in
+# core/migrations. Prefer: python -m scripts.migrate
 
-conn = sqlite3.connect(DB_PATH)
-c = conn.cursor()
+import os
+import sys
 
-c.execute("PRAGMA table_info('visits')")
-cols = [r[1] for r in c.fetchall()]
-print("Existing columns:", cols)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if 'onset_time' not in cols:
-    c.execute("ALTER TABLE visits ADD COLUMN onset_time DATETIME")
-    print("Added 'onset_time' column to 'visits'.")
-else:
-    print("'onset_time' already exists.")
+from core import migrations  # noqa: E402
 
-conn.commit()
-conn.close()
-print("Migration complete.")
+if __name__ == "__main__":
+    migrations.upgrade(target=1)
+    print("Migration complete.")
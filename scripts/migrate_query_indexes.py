@@ -0,0 +1,28 @@
+"""Create the query indexes declared on the visits and treatments models.
+
+This is now migration v0004 in core/migrations. This script applies every
+migration up to and including it. Prefer ``python -m scripts.migrate``.
+
+No ANALYZE is run. With seed-sized tables, fresh statistics make SQLite
+prefer table scans, and those statistics stay stale as the tables grow
+unless ANALYZE is run again. Without sqlite_stat1 the planner assumes large
+tables and uses the indexes. scripts.check_query_plans --live verifies the
+result.
+
+Run from the project root:
+
+    python -m scripts.migrate_query_indexes
+"""
+import argparse
+
+from core import migrations
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+    migrations.upgrade(target=4)
+    print("Migration complete.")
+
+
+if __name__ == "__main__":
+    main()
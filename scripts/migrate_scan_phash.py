@@ -0,0 +1,14 @@
+# scripts/migrate_scan_phash.py
+# Kept for existing instructions; the change is now migration v0011 in
+# core/migrations. Prefer: python -m scripts.migrate
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import migrations  # noqa: E402
+
+if __name__ == "__main__":
+    migrations.upgrade(target=11)
+    print("Migration complete.")
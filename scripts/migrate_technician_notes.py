@@ -1,22 +1,14 @@
-import sqlite3
-import os
-
-ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH = os.path.join(ROOT_DIR, 'data', 'stroke.db')
+# scripts/migrate_technician_notes.py
+# Kept for existing instructions; the change is now migration v0002 in
+# core/migrations. Prefer: python -m scripts.migrate
 
-conn = sqlite3.connect(DB_PATH)
-c = conn.cursor()
+import os
+import sys
 
-c.execute("PRAGMA table_info('visits')")
-cols = [r[1] for r in c.fetchall()]
-print("Existing columns:", cols)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-if 'technician_notes' not in cols:
-    c.execute("ALTER TABLE visits ADD COLUMN technician_notes TEXT")
-    print("Added 'technician_notes' column to 'visits'.")
-else:
-    print("'technician_notes' already exists.")
+from core import migrations  # noqa: E402
 
-conn.commit()
-conn.close()
-print("Migration complete.")
+if __name__ == "__main__":
+    migrations.upgrade(target=2)
+    print("Migration complete.")
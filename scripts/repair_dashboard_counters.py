@@ -0,0 +1,43 @@
+"""Check or rebuild the materialised dashboard counters.
+
+The counters in dashboard_counters (migration v0006) are kept current by
+triggers. This job recounts them from the visits and patients tables and
+reports any drift, e.g. after rows were edited with the triggers missing or
+the database was restored from a partial copy.
+
+Repairs by default; pass --check to only report (exits 1 on drift).
+
+Run from the project root:
+
+    python -m scripts.repair_dashboard_counters --check
+    python -m scripts.repair_dashboard_counters
+"""
+import argparse
+import sys
+
+from core.database import get_db_context
+from services.dashboard_counter_service import counter_drift, rebuild_counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="report drift only, do not rebuild")
+    args = parser.parse_args()
+
+    with get_db_context() as db:
+        drift = counter_drift(db) if args.check else rebuild_counters(db)
+
+    for row in drift:
+        who = row["doctor_username"] or "-"
+        print(f"  {row['metric']:<8} {who:<16} {row['status'] or '(none)':<20} stored {row['stored']:>7}  actual {row['actual']:>7}")
+    if not drift:
+        print("Dashboard counters match the live counts.")
+    elif args.check:
+        print(f"{len(drift)} counter(s) drifted. Re-run without --check to rebuild.")
+        sys.exit(1)
+    else:
+        print(f"Rebuilt dashboard counters ({len(drift)} counter(s) corrected).")
+
+
+if __name__ == "__main__":
+    main()
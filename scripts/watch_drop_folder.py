@@ -0,0 +1,57 @@
+"""Watch the modality drop folder and ingest finished scans.
+
+Files named with a patient code (e.g. P003_ct.png or P003-V002.png) are
+attached to that patient's open visit and analysed like a manual upload.
+A visit holds one scan: further files of a series for the same visit are
+rejected. Failed files are retried with backoff up to
+SCAN_DROP_MAX_ATTEMPTS times.
+Configure with SCAN_DROP_DIR, SCAN_DROP_POLL_SECONDS and
+SCAN_DROP_SETTLE_SECONDS (.env) or the options below.
+
+Run from the project root:
+
+    python -m scripts.watch_drop_folder
+    python -m scripts.watch_drop_folder --dir /mnt/modality_export --interval 2
+"""
+import argparse
+import os
+import time
+
+from core import migrations
+from services.drop_folder_service import DropFolderWatcher, DROP_DIR, POLL_SECONDS, SETTLE_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=DROP_DIR, help="folder to watch")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS, help="seconds between polls")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="minimum age (seconds) before a file counts as finished")
+    parser.add_argument("--polls", type=int, default=None, help="stop after N polls (default: run forever)")
+    args = parser.parse_args()
+
+    migrations.require_current()
+    os.makedirs(args.dir, exist_ok=True)
+    watcher = DropFolderWatcher(root=args.dir, settle_seconds=args.settle)
+    print(f"Watching {args.dir} every {args.interval:g}s (Ctrl+C to stop)")
+
+    polls = 0
+    try:
+        while args.polls is None or polls < args.polls:
+            report = watcher.poll_once()
+            stamp = time.strftime("%H:%M:%S")
+            if report["imported"]:
+                print(f"[{stamp}] imported {report['imported']} file(s), {report['bytes'] / 1024:.0f} KB")
+            for path in report["unmatched"]:
+                print(f"[{stamp}] no open visit matches {os.path.basename(path)}; will retry")
+            for path, reason in report["failed"]:
+                print(f"[{stamp}] failed {os.path.basename(path)}: {reason}")
+            polls += 1
+            if args.polls is None or polls < args.polls:
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
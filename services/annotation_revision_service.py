@@ -0,0 +1,212 @@
+"""Annotation revision history (annotation_revisions).
+
+Every canvas save adds a revision. Most rows hold a compact delta against
+the previous one (core.annotation_delta); every ANNOTATION_SNAPSHOT_EVERY-th
+revision, and any whose delta is not smaller than the JSON, is a full
+snapshot, so a revision is rebuilt from one snapshot plus at most
+SNAPSHOT_EVERY - 1 deltas. compact_revisions() re-snapshots long chains and
+can fold old history into one snapshot.
+"""
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from core import annotation_delta
+from core.time_utils import now_utc
+from models.annotation_revision import AnnotationRevision
+
+SNAPSHOT_EVERY = max(1, int(os.getenv("ANNOTATION_SNAPSHOT_EVERY", "10")))
+
+
+def _naive_utc(dt: datetime | None) -> datetime | None:
+    # SQLite hands back naive datetimes; compare everything as naive UTC
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _rows(db: Session, visit_id: int, scan_hash: str):
+    return (
+        db.query(AnnotationRevision)
+        .filter(AnnotationRevision.visit_id == visit_id, AnnotationRevision.scan_hash == scan_hash)
+    )
+
+
+def _chain(db: Session, visit_id: int, scan_hash: str, revision: int | None = None) -> List[AnnotationRevision]:
+    """Rows needed to rebuild ``revision`` (latest if None): base snapshot first."""
+    q = _rows(db, visit_id, scan_hash)
+    if revision is not None:
+        q = q.filter(AnnotationRevision.revision <= revision)
+    base = (
+        q.filter(AnnotationRevision.kind == "snapshot")
+        .with_entities(func.max(AnnotationRevision.revision))
+        .scalar()
+    )
+    if base is None:
+        return []
+    return q.filter(AnnotationRevision.revision >= base).order_by(AnnotationRevision.revision).all()
+
+
+def _replay(chain: List[AnnotationRevision]) -> Dict | None:
+    state = None
+    for row in chain:
+        data = json.loads(row.payload)
+        state = data if row.kind == "snapshot" else annotation_delta.apply(state, data)
+    return state
+
+
+def load_revision(db: Session, visit_id: int, scan_hash: str, revision: int | None = None) -> Dict | None:
+    """Return the canvas JSON of a revision (latest if None), or None if there is none."""
+    chain = _chain(db, visit_id, scan_hash, revision)
+    if revision is not None and (not chain or chain[-1].revision != revision):
+        return None
+    return _replay(chain)
+
+
+def add_revision(db: Session, visit_id: int, scan_hash: str, fabric: Dict, author: str | None = None) -> AnnotationRevision | None:
+    """Append a revision for the saved canvas state.
+
+    Returns None when the state equals the latest revision. Does not commit;
+    the caller commits together with the annotation index row.
+    """
+    chain = _chain(db, visit_id, scan_hash)
+    previous = _replay(chain)
+    full = annotation_delta.dumps(fabric)
+    kind, payload = "snapshot", full
+    if previous is not None:
+        delta = annotation_delta.diff(previous, fabric)
+        if not delta:
+            return None
+        encoded = annotation_delta.dumps(delta)
+        # chain includes its base snapshot, so len(chain) deltas would follow it
+        if len(chain) < SNAPSHOT_EVERY and len(encoded) < len(full):
+            kind, payload = "delta", encoded
+    latest = _rows(db, visit_id, scan_hash).with_entities(func.max(AnnotationRevision.revision)).scalar() or 0
+    row = AnnotationRevision(
+        visit_id=visit_id,
+        scan_hash=scan_hash,
+        revision=latest + 1,
+        kind=kind,
+        payload=payload,
+        size_bytes=len(payload.encode("utf-8")),
+        full_bytes=len(full.encode("utf-8")),
+        saved_at=now_utc(),
+        author=author,
+    )
+    db.add(row)
+    return row
+
+
+def revision_history(db: Session, visit_id: int, scan_hash: str) -> List[Dict]:
+    """Revisions of one annotation, newest first, with their storage cost.
+
+    Returns
+    -------
+    list of dict
+        [{"revision", "kind", "size_bytes", "full_bytes", "saved_at", "author"}]
+    """
+    rows = (
+        _rows(db, visit_id, scan_hash)
+        .with_entities(
+            AnnotationRevision.revision,
+            AnnotationRevision.kind,
+            AnnotationRevision.size_bytes,
+            AnnotationRevision.full_bytes,
+            AnnotationRevision.saved_at,
+            AnnotationRevision.author,
+        )
+        .order_by(AnnotationRevision.revision.desc())
+        .all()
+    )
+    return [
+        {"revision": r, "kind": k, "size_bytes": s, "full_bytes": f, "saved_at": t, "author": a}
+        for r, k, s, f, t, a in rows
+    ]
+
+
+def storage_report(db: Session) -> Dict:
+    """Totals across all annotation revisions (stored vs. full-copy bytes)."""
+    rows = (
+        db.query(
+            AnnotationRevision.kind,
+            func.count(AnnotationRevision.id),
+            func.coalesce(func.sum(AnnotationRevision.size_bytes), 0),
+            func.coalesce(func.sum(AnnotationRevision.full_bytes), 0),
+        )
+        .group_by(AnnotationRevision.kind)
+        .all()
+    )
+    report = {"revisions": 0, "snapshots": 0, "deltas": 0, "stored_bytes": 0, "full_bytes": 0}
+    for kind, count, stored, full in rows:
+        report["revisions"] += count
+        report["snapshots" if kind == "snapshot" else "deltas"] += count
+        report["stored_bytes"] += stored
+        report["full_bytes"] += full
+    report["bytes_per_revision"] = report["stored_bytes"] / report["revisions"] if report["revisions"] else 0.0
+    return report
+
+
+def delete_revisions(db: Session, visit_ids: List[int]) -> None:
+    """Drop the history of the given visits (does not commit)."""
+    if not visit_ids:
+        return
+    try:
+        db.query(AnnotationRevision).filter(AnnotationRevision.visit_id.in_(visit_ids)).delete(synchronize_session=False)
+    except OperationalError:
+        pass  # history table not created yet
+
+
+def compact_revisions(db: Session, fold_before: datetime | None = None) -> Dict:
+    """Fold old deltas into snapshots.
+
+    * Revisions saved before ``fold_before`` are collapsed: the newest of them
+      becomes a snapshot and the older ones are deleted.
+    * Any chain with SNAPSHOT_EVERY or more deltas after its snapshot gets a
+      new snapshot so reconstruction stays bounded.
+
+    Commits once at the end. Returns counts of rewritten and deleted rows.
+    """
+    fold_before = _naive_utc(fold_before)
+    stats = {"annotations": 0, "snapshotted": 0, "deleted": 0, "bytes_before": 0, "bytes_after": 0}
+    keys = db.query(AnnotationRevision.visit_id, AnnotationRevision.scan_hash).distinct().all()
+    for visit_id, scan_hash in keys:
+        rows = _rows(db, visit_id, scan_hash).order_by(AnnotationRevision.revision).all()
+        stats["annotations"] += 1
+        stats["bytes_before"] += sum(r.size_bytes for r in rows)
+
+        # Full state of every revision, in order (the first row is always a snapshot)
+        states, state = [], None
+        for row in rows:
+            data = json.loads(row.payload)
+            state = data if row.kind == "snapshot" else annotation_delta.apply(state, data)
+            states.append(state)
+
+        start = 0
+        if fold_before is not None:
+            old = [i for i, r in enumerate(rows) if r.saved_at is not None and _naive_utc(r.saved_at) < fold_before]
+            if old:
+                start = old[-1]
+                for row in rows[:start]:
+                    db.delete(row)
+                stats["deleted"] += start
+
+        since_snapshot = SNAPSHOT_EVERY  # forces rows[start] to be a snapshot
+        for row, state in zip(rows[start:], states[start:]):
+            if row.kind == "snapshot":
+                since_snapshot = 0
+                continue
+            since_snapshot += 1
+            if since_snapshot >= SNAPSHOT_EVERY:
+                row.kind = "snapshot"
+                row.payload = annotation_delta.dumps(state)
+                row.size_bytes = len(row.payload.encode("utf-8"))
+                stats["snapshotted"] += 1
+                since_snapshot = 0
+        stats["bytes_after"] += sum(r.size_bytes for r in rows[start:])
+    db.commit()
+    return stats
@@ -0,0 +1,112 @@
+"""Archival tier for completed visits.
+
+Scans and annotation composites of old completed visits are moved, byte for
+byte and LZMA-compressed, into one zip per month (data/archive/YYYY-MM.zip);
+core.archive_store.resolve_path restores them when a page asks for them.
+"""
+import lzma
+import os
+from datetime import timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from core.archive_store import ARCHIVE_DIR, archive_key, append_to_archive
+from core.annotation_utils import get_annotation_paths
+from core.database import BASE_DIR
+from core.scan_store import normalize_scan_path
+from core.time_utils import now_utc
+from models.archived_file import ArchivedFile
+from models.visit import Visit
+
+DEFAULT_MIN_AGE_DAYS = 30
+
+
+def packed_size(data: bytes) -> int:
+    """Estimate of the archived size of data (LZMA, as append_to_archive stores it)."""
+    return len(lzma.compress(data, preset=6))
+
+
+def _aware(dt):
+    if dt is not None and getattr(dt, "tzinfo", None) is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def find_archivable(db: Session, min_age_days: int = DEFAULT_MIN_AGE_DAYS) -> List[Tuple[str, str]]:
+    """Return [(file_path, "YYYY-MM")] for completed visits older than min_age_days.
+
+    A scan shared with a visit that is not completed stays live.
+    """
+    cutoff = now_utc() - timedelta(days=min_age_days)
+    live_scans = {
+        normalize_scan_path(p)
+        for (p,) in db.query(Visit.scan_path)
+        .filter(Visit.scan_path.isnot(None))
+        .filter((Visit.status != "completed") | Visit.status.is_(None))
+        .all()
+    }
+    visits = (
+        db.query(Visit)
+        .options(joinedload(Visit.patient))
+        .filter(Visit.status == "completed")
+        .filter(Visit.scan_path.isnot(None))
+        .all()
+    )
+    out: Dict[str, str] = {}
+    for v in visits:
+        ts = _aware(v.timestamp)
+        if ts is None or ts > cutoff:
+            continue
+        month = ts.strftime("%Y-%m")
+        scan = normalize_scan_path(v.scan_path)
+        if scan not in live_scans:
+            out.setdefault(scan, month)
+        ann_png, _ = get_annotation_paths(v)
+        out.setdefault(ann_png, month)
+    return sorted(out.items())
+
+
+def archive_completed_visits(db: Session, min_age_days: int = DEFAULT_MIN_AGE_DAYS, dry_run: bool = False) -> Dict:
+    """Move old completed-visit files into monthly archives.
+
+    Returns
+    -------
+    dict
+        {"files": int, "original_bytes": int, "archived_bytes": int,
+         "saved_bytes": int, "archives": [str]}
+    """
+    report = {"files": 0, "original_bytes": 0, "archived_bytes": 0, "saved_bytes": 0, "archives": []}
+    archives = set()
+    for path, month in find_archivable(db, min_age_days):
+        disk_path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+        if not os.path.exists(disk_path):
+            continue  # already archived or missing
+        with open(disk_path, "rb") as f:
+            data = f.read()
+
+        report["files"] += 1
+        report["original_bytes"] += len(data)
+        archive_rel = "/".join(["data", "archive", f"{month}.zip"])
+        archives.add(archive_rel)
+        if dry_run:
+            report["archived_bytes"] += packed_size(data)
+            continue
+
+        key = archive_key(path)
+        member, archived_size = append_to_archive(os.path.join(ARCHIVE_DIR, f"{month}.zip"), key, data)
+        report["archived_bytes"] += archived_size
+        row = db.query(ArchivedFile).filter(ArchivedFile.path == key).first() or ArchivedFile(path=key)
+        row.archive = archive_rel
+        row.member = member
+        row.original_size = len(data)
+        row.archived_size = archived_size
+        row.archived_at = now_utc()
+        db.add(row)
+        db.commit()
+        # Only drop the live copy once the archive entry is committed
+        os.remove(disk_path)
+
+    report["saved_bytes"] = report["original_bytes"] - report["archived_bytes"]
+    report["archives"] = sorted(archives)
+    return report
@@ -0,0 +1,249 @@
+"""Bulk scan import from a manifest CSV.
+
+    file,patient_code,visit_code
+    scans/p003_ct.png,P003,P003-V002
+    scans/p004_ct.png,P004,            # empty visit_code -> new visit
+
+Files are hashed and stored in parallel, inference runs in batches and DB
+writes are committed in groups. Imported files are recorded in the
+imported_files ledger (path + size + mtime), so re-running a manifest skips
+what is already in.
+"""
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from core.annotation_utils import delete_all_visit_annotations
+from core.database import get_db_context
+from core.image_quality import assess_scan_quality, QUALITY_GATE_MODE
+from core.scan_previews import schedule_previews
+from core.scan_store import put_file, normalize_scan_path
+from models.imported_file import ImportedFile
+from models.patient import Patient
+from models.visit import Visit
+from services.scan_service import (
+    attach_scan_to_visit,
+    cached_prediction,
+    cache_prediction,
+    record_quality,
+    apply_tpa_result,
+    infer_scans,
+)
+from services.duplicate_service import ensure_phash, index_scan_blob
+from services.similar_case_service import index_case_embedding
+from services.tpa_service import evaluate_tpa_eligibility
+from services.visit_service import next_visit_code
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_COMMIT_EVERY = 50
+
+
+def read_manifest(manifest_path: str) -> List[Dict]:
+    """Parse the manifest; file paths are resolved relative to the manifest."""
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    rows, seen = [], set()
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        for line_no, rec in enumerate(csv.DictReader(f), start=2):
+            src = (rec.get("file") or "").strip()
+            code = (rec.get("patient_code") or "").strip().upper()
+            if not src or not code:
+                continue
+            src = os.path.normpath(src if os.path.isabs(src) else os.path.join(base, src))
+            if src in seen:
+                continue
+            seen.add(src)
+            rows.append({
+                "line": line_no,
+                "source": src,
+                "patient_code": code,
+                "visit_code": (rec.get("visit_code") or "").strip() or None,
+            })
+    return rows
+
+
+def store_source(row: Dict) -> Dict:
+    """Copy row["source"] into the scan store and run the quality gate on it.
+
+    Adds scan_path/sha256/size/mtime_ns/created/quality/error to the row.
+    """
+    try:
+        st = os.stat(row["source"])
+        path, digest, created = put_file(row["source"])
+        return {**row, "scan_path": normalize_scan_path(path), "sha256": digest, "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns, "created": created,
+                "quality": assess_scan_quality(path), "error": None}
+    except Exception as e:
+        return {**row, "error": str(e)}
+
+
+def _resolve_visit(db: Session, row: Dict, patients: Dict[str, Patient]) -> Visit | None:
+    code = row["patient_code"]
+    if code not in patients:
+        patients[code] = db.query(Patient).filter(Patient.patient_id == code).first()
+    patient = patients[code]
+    if not patient:
+        return None
+    if row["visit_code"]:
+        return (
+            db.query(Visit)
+            .filter(Visit.visit_id == row["visit_code"])
+            .filter(Visit.patient_id == patient.id)
+            .first()
+        )
+    visit = Visit(patient_id=patient.id, visit_id=next_visit_code(db, patient), status="in_progress")
+    db.add(visit)
+    db.flush()
+    return visit
+
+
+def ingest_group(db: Session, items: List[Dict], batch_size: int, origin: str, report: Dict) -> List[Dict]:
+    """Attach stored files to their visits, run the model and commit once.
+
+    items come from store_source; report must carry the "failed",
+    "inferred", "inference_seconds", "imported" and "bytes" keys. Returns
+    the items that were ingested (rows whose visit was not found are
+    reported as failed). The in-process duplicate and similar-case indexes
+    are only updated once the group is committed.
+    """
+    patients: Dict[str, Patient] = {}
+    attached = []
+    for item in items:
+        if not item["quality"]["ok"] and QUALITY_GATE_MODE == "reject":
+            report["failed"].append((item["source"], f"quality check: {item['quality']['reason']}"))
+            continue
+        visit = _resolve_visit(db, item, patients)
+        if visit is None:
+            report["failed"].append((item["source"], f"line {item['line']}: patient/visit not found"))
+            continue
+        old_scan = normalize_scan_path(visit.scan_path)
+        blob = attach_scan_to_visit(db, visit, item["scan_path"], item["sha256"], item["size"])
+        item["scan_path"] = visit.scan_path
+        record_quality(blob, item["quality"])
+        ensure_phash(blob)  # stored with the group; indexed after the commit
+        # Flush per item so a later row with the same bytes finds this blob
+        db.flush()
+        attached.append((item, visit, blob, old_scan))
+
+    # One batched model call for every distinct blob without a cached result
+    pending = {}
+    for item, _, blob, _ in attached:
+        if not item["quality"]["ok"]:
+            continue
+        if cached_prediction(blob) is None and blob.sha256 not in pending:
+            pending[blob.sha256] = blob
+    t0 = time.perf_counter()
+    results = infer_scans([b.path for b in pending.values()], batch_size=batch_size)
+    report["inference_seconds"] += time.perf_counter() - t0
+    report["inferred"] += len(pending)
+    for blob, r in zip(pending.values(), results):
+        cache_prediction(blob, r["label"], r["confidence"], r["probabilities"], r["embedding"])
+
+    for item, visit, blob, _ in attached:
+        label, conf, _ = (item["quality"]["ok"] and cached_prediction(blob)) or (None, None, [])
+        visit.prediction_label = label
+        visit.prediction_confidence = conf
+    db.flush()
+
+    for item, visit, blob, _ in attached:
+        apply_tpa_result(visit, evaluate_tpa_eligibility(db, visit.id))
+        if not visit.status:
+            visit.status = "analysis_completed"
+        db.add(ImportedFile(
+            source_path=item["source"], size_bytes=item["size"], mtime_ns=item["mtime_ns"],
+            sha256=item["sha256"], visit_id=visit.id, origin=origin,
+        ))
+    db.commit()
+
+    for blob in {blob.sha256: blob for _, _, blob, _ in attached}.values():
+        index_scan_blob(db, blob)
+        index_case_embedding(db, blob)
+    for item, visit, _, old_scan in attached:
+        if old_scan and old_scan != item["scan_path"]:
+            delete_all_visit_annotations(visit)
+        schedule_previews(item["scan_path"])
+        report["imported"] += 1
+        report["bytes"] += item["size"]
+    return [item for item, _, _, _ in attached]
+
+
+def import_manifest(
+    manifest_path: str,
+    workers: int = DEFAULT_WORKERS,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    commit_every: int = DEFAULT_COMMIT_EVERY,
+    origin: str = "bulk",
+) -> Dict:
+    """Import every not-yet-imported file listed in the manifest.
+
+    Returns
+    -------
+    dict
+        {"total", "skipped", "imported", "failed": [(source, reason)],
+         "bytes", "new_blobs", "inferred", "store_seconds",
+         "inference_seconds", "elapsed_seconds"}
+    """
+    started = time.perf_counter()
+    rows = read_manifest(manifest_path)
+    report = {
+        "total": len(rows), "skipped": 0, "imported": 0, "failed": [],
+        "bytes": 0, "new_blobs": 0, "inferred": 0,
+        "store_seconds": 0.0, "inference_seconds": 0.0, "elapsed_seconds": 0.0,
+    }
+
+    with get_db_context() as db:
+        # 1) Skip files already in the ledger with the same size + mtime
+        # (failed drop-folder attempts do not count)
+        known = set()
+        sources = [r["source"] for r in rows]
+        for start in range(0, len(sources), 500):
+            chunk = sources[start:start + 500]
+            known.update(
+                db.query(ImportedFile.source_path, ImportedFile.size_bytes, ImportedFile.mtime_ns)
+                .filter(ImportedFile.source_path.in_(chunk))
+                .filter(ImportedFile.status != "failed")
+                .all()
+            )
+        todo = []
+        for r in rows:
+            try:
+                st = os.stat(r["source"])
+            except OSError as e:
+                report["failed"].append((r["source"], str(e)))
+                continue
+            if (r["source"], st.st_size, st.st_mtime_ns) in known:
+                report["skipped"] += 1
+            else:
+                todo.append(r)
+
+        # 2) Hash + store in a thread pool (I/O bound)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            stored = list(pool.map(store_source, todo))
+        report["store_seconds"] = time.perf_counter() - t0
+        ok = []
+        for item in stored:
+            if item["error"]:
+                report["failed"].append((item["source"], item["error"]))
+            else:
+                report["new_blobs"] += int(item["created"])
+                ok.append(item)
+
+        # 3) Inference + tPA + ledger, one transaction per group
+        for start in range(0, len(ok), max(1, commit_every)):
+            # A rolled-back group leaves no trace in the report besides its items' failure
+            snapshot = {k: list(v) if isinstance(v, list) else v for k, v in report.items()}
+            try:
+                ingest_group(db, ok[start:start + commit_every], batch_size, origin, report)
+            except Exception as e:
+                db.rollback()
+                report.update(snapshot)
+                for item in ok[start:start + commit_every]:
+                    report["failed"].append((item["source"], f"group rolled back: {e}"))
+
+    report["elapsed_seconds"] = time.perf_counter() - started
+    return report
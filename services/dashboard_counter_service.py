@@ -0,0 +1,121 @@
+"""Materialised dashboard counters (migration v0006).
+
+dashboard_counters holds one row per (doctor, status) for visits and one
+with the patient total, adjusted by triggers in the same transaction as the
+write that changes them. rebuild_counters() recounts from the source
+tables (scripts/repair_dashboard_counters.py). Until the migration has
+run, dashboard_metrics() falls back to live counts.
+"""
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from core.migrations.v0006_dashboard_counters import REBUILD
+from models.dashboard_counter import DashboardCounter
+from models.patient import Patient
+from models.visit import Visit
+
+CounterKey = Tuple[str, str, str]  # (metric, doctor_username, status)
+
+
+_counters_ready = False  # set once the table is seen; it is never dropped
+
+
+def _counters_available(db: Session) -> bool:
+    global _counters_ready
+    if not _counters_ready:
+        found = db.execute(text(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_counter_%'"
+        )).scalar()
+        _counters_ready = bool(found)
+    return _counters_ready
+
+
+def dashboard_metrics(db: Session, doctor_username: str | None = None) -> Dict:
+    """Patient total and visit counts per status, in one query.
+
+    With ``doctor_username`` only that doctor's visits are counted. Visits
+    without a status are reported under "".
+
+    Returns
+    -------
+    dict
+        {"patients": int, "visits": {status: count}}
+    """
+    if not _counters_available(db):
+        return _live_metrics(db, doctor_username)
+    q = db.query(DashboardCounter.metric, DashboardCounter.status, func.sum(DashboardCounter.value))
+    if doctor_username is not None:
+        q = q.filter(
+            (DashboardCounter.metric == "patients")
+            | ((DashboardCounter.metric == "visits") & (DashboardCounter.doctor_username == doctor_username))
+        )
+    else:
+        q = q.filter(DashboardCounter.metric.in_(["patients", "visits"]))
+    metrics = {"patients": 0, "visits": {}}
+    for metric, status, value in q.group_by(DashboardCounter.metric, DashboardCounter.status):
+        if metric == "patients":
+            metrics["patients"] = int(value or 0)
+        elif value:
+            metrics["visits"][status] = int(value)
+    return metrics
+
+
+def _live_metrics(db: Session, doctor_username: str | None) -> Dict:
+    status = func.coalesce(Visit.status, "")
+    q = db.query(status, func.count(Visit.id))
+    if doctor_username is not None:
+        q = q.filter(Visit.doctor_username == doctor_username)
+    return {
+        "patients": db.query(func.count(Patient.id)).scalar() or 0,
+        "visits": {st: count for st, count in q.group_by(status)},
+    }
+
+
+def live_counts(db: Session) -> Dict[CounterKey, int]:
+    """What every counter should hold, counted from visits and patients."""
+    doctor = func.coalesce(Visit.doctor_username, "")
+    status = func.coalesce(Visit.status, "")
+    counts = {
+        ("visits", d, st): n
+        for d, st, n in db.query(doctor, status, func.count(Visit.id)).group_by(doctor, status)
+    }
+    counts[("patients", "", "")] = db.query(func.count(Patient.id)).scalar() or 0
+    return counts
+
+
+def stored_counts(db: Session) -> Dict[CounterKey, int]:
+    """Current contents of dashboard_counters (zero rows left out)."""
+    return {
+        (c.metric, c.doctor_username, c.status): c.value
+        for c in db.query(DashboardCounter).all()
+        if c.value
+    }
+
+
+def counter_drift(db: Session) -> List[Dict]:
+    """Counters whose stored value differs from a live recount."""
+    live = {k: v for k, v in live_counts(db).items() if v}
+    stored = stored_counts(db)
+    return [
+        {"metric": k[0], "doctor_username": k[1], "status": k[2], "stored": stored.get(k, 0), "actual": live.get(k, 0)}
+        for k in sorted(set(live) | set(stored))
+        if stored.get(k, 0) != live.get(k, 0)
+    ]
+
+
+def rebuild_counters(db: Session) -> List[Dict]:
+    """Recount every counter from the source tables, in one transaction.
+
+    Returns the drift found before the rebuild (see counter_drift()).
+    """
+    drift = counter_drift(db)
+    try:
+        for sql in REBUILD:
+            db.execute(text(sql))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return drift
@@ -0,0 +1,222 @@
+"""COCO-style segmentation export of the doctors' canvas annotations.
+
+Each visible Fabric object becomes one annotation whose mask is rasterised
+at the scan's full resolution (the canvas coordinates and stroke widths are
+scaled up, not the canvas-size mask) and stored as compressed RLE
+(core.mask_rle).
+Images are keyed by the scan's sha256 (``<sha256><ext>``): visits that share
+a scan get one image entry, and their annotations all point at it.
+Visits are read in primary-key batches and rasterised in a process pool
+with at most ``workers * 2`` batches in flight; records are spooled to disk
+and the manifest is assembled at the end, so memory stays bounded.
+"""
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List
+
+from sqlalchemy.orm import Session
+
+from core.annotation_utils import LEGACY_SCAN_HASH, _abs, _scan_hash
+from core.time_utils import now_utc
+from models.annotation import Annotation
+from models.patient import Patient
+from models.visit import Visit
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "32"))
+CATEGORIES = [{"id": 1, "name": "lesion", "supercategory": "stroke"}]
+
+
+def _iter_batches(db: Session, batch_size: int) -> Iterator[List[Dict]]:
+    """Annotated visits as plain task dicts, keyset-paged on annotations.id."""
+    last_id = 0
+    while True:
+        rows = (
+            db.query(Annotation.id, Annotation.scan_hash, Annotation.json_path, Visit, Patient.patient_id)
+            .join(Visit, Visit.id == Annotation.visit_id)
+            .join(Patient, Patient.id == Visit.patient_id)
+            .filter(Annotation.id > last_id)
+            .order_by(Annotation.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        batch = []
+        for ann_id, scan_hash, json_path, visit, patient_code in rows:
+            batch.append({
+                "annotation_id": ann_id,
+                "json_path": _abs(json_path),
+                "scan_path": visit.scan_path,
+                # Drawn on a scan that has since been replaced
+                "stale": scan_hash != LEGACY_SCAN_HASH and scan_hash != _scan_hash(visit.scan_path),
+                "visit_code": visit.visit_id,
+                "patient_code": patient_code,
+                "prediction": visit.prediction_label,
+                "icd_code": visit.icd_code,
+            })
+        db.expunge_all()
+        yield batch
+
+
+def _export_one(task: Dict, images_dir: str | None) -> Dict:
+    """Worker: rasterise one annotation. Returns {"image", "annotations"} or {"skipped": reason}."""
+    from PIL import Image
+
+    from core import mask_rle
+    from core.annotation_render import canvas_size, render_object_masks
+    from core.archive_store import resolve_path
+    from core.scan_store import digest_from_path, sha256_file
+
+    if task["stale"]:
+        return {"skipped": "stale"}
+    if not task["json_path"] or not task["scan_path"]:
+        return {"skipped": "no_json"}
+    try:
+        with open(task["json_path"], "r", encoding="utf-8") as f:
+            fabric = json.load(f)
+    except (OSError, ValueError):
+        return {"skipped": "no_json"}
+    local = resolve_path(task["scan_path"])
+    if not local or not os.path.exists(local):
+        return {"skipped": "no_scan"}
+    with Image.open(local) as img:
+        width, height = img.size
+
+    # Objects are in canvas coordinates; rasterise them scaled to the scan's resolution
+    masks = render_object_masks(fabric, (width, height), canvas=canvas_size((width, height)))
+    if not masks:
+        return {"skipped": "empty"}
+    digest = digest_from_path(task["scan_path"]) or sha256_file(local)
+    file_name = digest + os.path.splitext(local)[1].lower()
+    if images_dir:
+        dest = os.path.join(images_dir, file_name)
+        if not os.path.exists(dest):
+            try:
+                os.link(local, dest)
+            except FileExistsError:
+                pass  # same scan linked by another worker
+            except OSError:
+                shutil.copy2(local, dest)
+    anns = []
+    for kind, mask in masks:
+        rle = mask_rle.encode(mask)
+        anns.append({
+            "category_id": 1,
+            "segmentation": rle,
+            "area": mask_rle.area(rle),
+            "bbox": list(mask_rle.bbox(mask)),
+            "iscrowd": 0,
+            "fabric_type": kind,
+            "visit_id": task["visit_code"],
+        })
+    return {
+        "sha256": digest,
+        "image": {
+            "file_name": file_name,
+            "width": width,
+            "height": height,
+            "visit_id": task["visit_code"],
+            "patient_id": task["patient_code"],
+            "prediction": task["prediction"],
+            "icd_code": task["icd_code"],
+        },
+        "annotations": anns,
+    }
+
+
+def _export_batch(tasks: List[Dict], images_dir: str | None) -> List[Dict]:
+    out = []
+    for task in tasks:
+        try:
+            out.append(_export_one(task, images_dir))
+        except Exception as e:
+            out.append({"skipped": "error", "error": f"{task.get('visit_code')}: {e}"})
+    return out
+
+
+def export_annotation_dataset(
+    db: Session,
+    out_dir: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    workers: int | None = None,
+    copy_images: bool = True,
+    report: Callable[[Dict], None] | None = None,
+) -> Dict:
+    """Write ``out_dir/annotations.json`` (COCO) and optionally ``out_dir/images/``.
+
+    Returns
+    -------
+    dict
+        {"manifest", "processed", "images", "annotations", "skipped": {reason: count}, "errors": [str]}
+
+        "processed" counts annotated visits handled (exported or skipped);
+        "images" counts distinct scans.
+    """
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    os.makedirs(out_dir, exist_ok=True)
+    images_dir = os.path.join(out_dir, "images") if copy_images else None
+    if images_dir:
+        os.makedirs(images_dir, exist_ok=True)
+
+    stats = {"processed": 0, "images": 0, "annotations": 0, "skipped": {}, "errors": []}
+    image_ids: Dict[str, int] = {}  # scan sha256 -> image id
+    spool_dir = tempfile.mkdtemp(prefix=".export-", dir=out_dir)
+    images_spool = os.path.join(spool_dir, "images.jsonl")
+    anns_spool = os.path.join(spool_dir, "annotations.jsonl")
+    try:
+        with open(images_spool, "w", encoding="utf-8") as img_f, open(anns_spool, "w", encoding="utf-8") as ann_f:
+
+            def collect(results: List[Dict]) -> None:
+                for res in results:
+                    stats["processed"] += 1
+                    if "skipped" in res:
+                        reason = res["skipped"]
+                        stats["skipped"][reason] = stats["skipped"].get(reason, 0) + 1
+                        if res.get("error"):
+                            stats["errors"].append(res["error"])
+                        continue
+                    image_id = image_ids.get(res["sha256"])
+                    if image_id is None:
+                        # First visit seen with this scan describes the image
+                        stats["images"] += 1
+                        image_id = image_ids[res["sha256"]] = stats["images"]
+                        img_f.write(json.dumps(dict(res["image"], id=image_id)) + "\n")
+                    for ann in res["annotations"]:
+                        stats["annotations"] += 1
+                        ann_f.write(json.dumps(dict(ann, id=stats["annotations"], image_id=image_id)) + "\n")
+                if report:
+                    report(stats)
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for batch in _iter_batches(db, batch_size):
+                    pending.add(pool.submit(_export_batch, batch, images_dir))
+                    if len(pending) >= workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in done:
+                            collect(fut.result())
+                for fut in pending:
+                    collect(fut.result())
+
+        # Assemble the manifest by streaming the spool files
+        manifest = os.path.join(out_dir, "annotations.json")
+        tmp = manifest + ".part"
+        with open(tmp, "w", encoding="utf-8") as out:
+            info = {"description": "Stroke scan annotations", "date_created": now_utc().isoformat()}
+            out.write('{"info": ' + json.dumps(info) + ', "categories": ' + json.dumps(CATEGORIES))
+            for key, path in (("images", images_spool), ("annotations", anns_spool)):
+                out.write(f', "{key}": [')
+                with open(path, "r", encoding="utf-8") as src:
+                    for i, line in enumerate(src):
+                        out.write(("," if i else "") + line.rstrip("\n"))
+                out.write("]")
+            out.write("}\n")
+        os.replace(tmp, manifest)
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+    stats["manifest"] = manifest
+    return stats
@@ -0,0 +1,282 @@
+"""Drop-folder watcher for modality exports (SCAN_DROP_DIR).
+
+The folder is polled with os.scandir and files are only opened once their
+(size, mtime) held still for two polls and SCAN_DROP_SETTLE_SECONDS. A file
+is attached to its patient's open ("in_progress") visit - the newest one,
+unless the name carries a visit code (P003-V002). Ingested files are
+recorded in imported_files (origin="watch"), so restarts, a second watcher
+or a re-export never process the same file twice. Unmatched files are
+retried when they change or after SCAN_DROP_RETRY_SECONDS. Files that fail
+to store or ingest are recorded as "failed" and retried with doubling
+delays until SCAN_DROP_MAX_ATTEMPTS; quality rejects and the extra files
+of a series (one visit holds one scan) are recorded as "rejected".
+"""
+import os
+import re
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.database import BASE_DIR, get_db_context
+from core.image_quality import QUALITY_GATE_MODE
+from core.time_utils import now_utc
+from models.imported_file import ImportedFile
+from models.patient import Patient
+from models.visit import Visit
+from services.bulk_import_service import store_source, ingest_group
+
+DROP_DIR = os.getenv("SCAN_DROP_DIR", os.path.join(BASE_DIR, "data", "incoming"))
+POLL_SECONDS = float(os.getenv("SCAN_DROP_POLL_SECONDS", "5"))
+SETTLE_SECONDS = float(os.getenv("SCAN_DROP_SETTLE_SECONDS", "10"))
+RETRY_SECONDS = float(os.getenv("SCAN_DROP_RETRY_SECONDS", "60"))
+MAX_ATTEMPTS = max(1, int(os.getenv("SCAN_DROP_MAX_ATTEMPTS", "5")))
+SCAN_EXTENSIONS = (".png", ".jpg", ".jpeg")
+OPEN_VISIT_STATUSES = ("in_progress",)
+
+_CODE_RE = re.compile(r"(?<![A-Za-z0-9])(P\d{3,})(?:[-_](V\d{3,}))?", re.IGNORECASE)
+
+Signature = Tuple[int, int]  # (size, mtime_ns)
+
+
+def parse_codes(filename: str) -> Tuple[str | None, str | None]:
+    """Return (patient_code, visit_code) found in a file name, e.g. ("P003", "P003-V002")."""
+    m = _CODE_RE.search(os.path.basename(filename))
+    if not m:
+        return None, None
+    patient = m.group(1).upper()
+    visit = f"{patient}-{m.group(2).upper()}" if m.group(2) else None
+    return patient, visit
+
+
+def snapshot(root: str) -> Dict[str, Signature]:
+    """Map every candidate file directly under root to (size, mtime_ns)."""
+    out: Dict[str, Signature] = {}
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                name = entry.name.lower()
+                if name.startswith(".") or not name.endswith(SCAN_EXTENSIONS):
+                    continue
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                out[os.path.normpath(entry.path)] = (st.st_size, st.st_mtime_ns)
+    except FileNotFoundError:
+        pass
+    return out
+
+
+def find_open_visit(db: Session, patient_code: str, visit_code: str | None = None) -> Visit | None:
+    patient = db.query(Patient).filter(Patient.patient_id == patient_code).first()
+    if not patient:
+        return None
+    q = db.query(Visit).filter(Visit.patient_id == patient.id).filter(Visit.status.in_(OPEN_VISIT_STATUSES))
+    if visit_code:
+        q = q.filter(Visit.visit_id == visit_code)
+    return q.order_by(Visit.timestamp.desc(), Visit.id.desc()).first()
+
+
+def _retry_delay(attempts: int) -> float:
+    """Seconds to wait after the given number of failed attempts (doubling)."""
+    return RETRY_SECONDS * (2 ** max(0, attempts - 1))
+
+
+def record_outcome(db: Session, path: str, sig: Signature, status: str, error: str,
+                   sha256: str = "", visit_id: int | None = None) -> ImportedFile:
+    """Record a failed or rejected file in the ledger (one row per path + signature).
+
+    Failed rows count their attempts; once SCAN_DROP_MAX_ATTEMPTS is reached
+    the row turns "rejected". Does not commit.
+    """
+    row = (
+        db.query(ImportedFile)
+        .filter(ImportedFile.source_path == path, ImportedFile.size_bytes == sig[0],
+                ImportedFile.mtime_ns == sig[1])
+        .first()
+    )
+    if row is None:
+        row = ImportedFile(source_path=path, size_bytes=sig[0], mtime_ns=sig[1], sha256=sha256,
+                           origin="watch", attempts=0)
+        db.add(row)
+    row.attempts = (row.attempts or 0) + 1
+    if status == "failed" and row.attempts >= MAX_ATTEMPTS:
+        status, error = "rejected", f"{error} (gave up after {row.attempts} attempts)"
+    row.status = status
+    row.error = error
+    row.sha256 = sha256 or row.sha256 or ""
+    row.visit_id = visit_id
+    row.imported_at = now_utc()
+    return row
+
+
+class DropFolderWatcher:
+    """Polls one directory and pushes finished scans through the analysis pipeline."""
+
+    def __init__(self, root: str = DROP_DIR, settle_seconds: float = SETTLE_SECONDS, batch_size: int = 16):
+        self.root = root
+        self.settle_seconds = settle_seconds
+        self.batch_size = batch_size
+        self._previous: Dict[str, Signature] = {}
+        self._done: Dict[str, Signature] = {}      # imported or rejected (mirrors the ledger)
+        self._failed: Dict[str, Tuple[Signature, float]] = {}  # failed: (signature, retry at, wall clock)
+        self._rejected: Dict[str, Tuple[Signature, float]] = {}  # unmatched: (signature, when)
+        self._loaded = False
+
+    def _load_ledger(self, db: Session) -> None:
+        prefix = os.path.normpath(self.root) + os.sep
+        rows = (
+            db.query(ImportedFile.source_path, ImportedFile.size_bytes, ImportedFile.mtime_ns,
+                     ImportedFile.status, ImportedFile.attempts, ImportedFile.imported_at)
+            .filter(ImportedFile.source_path.like(prefix + "%"))
+            .all()
+        )
+        for path, size, mtime_ns, status, attempts, at in rows:
+            if status == "failed":
+                last = at.timestamp() if at is not None else 0.0
+                self._failed[path] = ((size, mtime_ns), last + _retry_delay(attempts))
+            else:
+                self._done[path] = (size, mtime_ns)
+        self._loaded = True
+
+    def _settled(self, path: str, sig: Signature) -> bool:
+        """True when the ledger or a pending retry delay says to leave the file alone."""
+        if self._done.get(path) == sig:
+            return True
+        failed = self._failed.get(path)
+        if failed and failed[0] == sig and time.time() < failed[1]:
+            return True
+        rejected = self._rejected.get(path)
+        return bool(rejected and rejected[0] == sig and time.monotonic() - rejected[1] < RETRY_SECONDS)
+
+    def _stable(self, current: Dict[str, Signature]) -> Dict[str, Signature]:
+        """Files unchanged since the previous poll and older than the settle time."""
+        now_ns = time.time_ns()
+        settle_ns = int(self.settle_seconds * 1e9)
+        ready = {}
+        for path, sig in current.items():
+            if self._settled(path, sig):
+                continue
+            if self._previous.get(path) != sig:
+                continue  # new or still being written
+            if now_ns - sig[1] < settle_ns:
+                continue
+            ready[path] = sig
+        return ready
+
+    def _fail(self, db: Session, report: Dict, path: str, sig: Signature, status: str, reason: str,
+              sha256: str = "", visit_id: int | None = None) -> None:
+        row = record_outcome(db, path, sig, status, reason, sha256, visit_id)
+        db.commit()
+        if row.status == "failed":
+            self._failed[path] = (sig, time.time() + _retry_delay(row.attempts))
+        else:
+            self._done[path] = sig
+        report["failed"].append((path, row.error))
+
+    def _series_owner(self, db: Session, visit: Visit, path: str) -> str | None:
+        """Another watched file already imported into this visit, if any."""
+        row = (
+            db.query(ImportedFile.source_path)
+            .filter(ImportedFile.visit_id == visit.id, ImportedFile.origin == "watch",
+                    ImportedFile.status == "imported", ImportedFile.source_path != path)
+            .first()
+        )
+        return row[0] if row else None
+
+    def poll_once(self) -> Dict:
+        """Run one poll.
+
+        Returns
+        -------
+        dict
+            {"seen", "ready", "imported", "unmatched": [path], "failed": [(path, reason)],
+             "bytes", "inferred", "inference_seconds"}
+        """
+        current = snapshot(self.root)
+        ready = self._stable(current)
+        self._previous = current
+        report = {
+            "seen": len(current), "ready": len(ready), "imported": 0, "unmatched": [],
+            "failed": [], "bytes": 0, "inferred": 0, "inference_seconds": 0.0,
+        }
+        if not ready and self._loaded:
+            return report
+
+        with get_db_context() as db:
+            if not self._loaded:
+                self._load_ledger(db)
+                ready = {p: s for p, s in ready.items() if not self._settled(p, s)}
+
+            items = []
+            claimed: Dict[int, str] = {}  # visit id -> file taken this poll
+            for path, sig in sorted(ready.items()):
+                # Another watcher (or a bulk import) may have taken it already
+                if db.query(ImportedFile.id).filter(
+                    ImportedFile.source_path == path,
+                    ImportedFile.size_bytes == sig[0],
+                    ImportedFile.mtime_ns == sig[1],
+                    ImportedFile.status != "failed",
+                ).first():
+                    self._done[path] = sig
+                    continue
+                patient_code, visit_code = parse_codes(path)
+                visit = find_open_visit(db, patient_code, visit_code) if patient_code else None
+                if visit is None:
+                    self._rejected[path] = (sig, time.monotonic())
+                    report["unmatched"].append(path)
+                    continue
+                # A visit holds one scan: the files of a series (P003_ct_0001.png,
+                # P003_ct_0002.png, ...) would overwrite each other, so only the
+                # first is attached and the rest are rejected explicitly
+                owner = claimed.get(visit.id) or self._series_owner(db, visit, path)
+                if owner:
+                    self._fail(db, report, path, sig, "rejected",
+                               f"visit {visit.visit_id} already has a scan from {os.path.basename(owner)}; "
+                               "series are not supported (one scan per visit)", visit_id=visit.id)
+                    continue
+                item = store_source({"line": 0, "source": path, "patient_code": patient_code,
+                                     "visit_code": visit.visit_id})
+                if item["error"]:
+                    self._fail(db, report, path, sig, "failed", item["error"])
+                    continue
+                if (item["size"], item["mtime_ns"]) != sig:
+                    continue  # changed while copying; picked up again once settled
+                if not item["quality"]["ok"] and QUALITY_GATE_MODE == "reject":
+                    # Not retried until the modality rewrites the file
+                    self._fail(db, report, path, sig, "rejected", f"quality check: {item['quality']['reason']}",
+                               sha256=item["sha256"])
+                    continue
+                claimed[visit.id] = path
+                items.append(item)
+
+            if items:
+                # ingest_group reports the items it drops in report["failed"];
+                # they are taken back out and go through _fail like any other
+                # failure (ledger row, retry delay)
+                reported = len(report["failed"])
+                try:
+                    ingested = ingest_group(db, items, self.batch_size, "watch", report)
+                    dropped = dict(report["failed"][reported:])
+                    del report["failed"][reported:]
+                    taken = {item["source"] for item in ingested}
+                    for item in items:
+                        if item["source"] not in taken:
+                            self._fail(db, report, item["source"], (item["size"], item["mtime_ns"]), "failed",
+                                       dropped.get(item["source"], "not ingested"), sha256=item["sha256"])
+                    for item in ingested:
+                        self._done[item["source"]] = (item["size"], item["mtime_ns"])
+                        self._failed.pop(item["source"], None)
+                    # Earlier failed attempts of the files that made it in
+                    db.query(ImportedFile).filter(
+                        ImportedFile.source_path.in_([item["source"] for item in ingested]),
+                        ImportedFile.status == "failed",
+                    ).delete(synchronize_session=False)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    del report["failed"][reported:]
+                    for item in items:
+                        self._fail(db, report, item["source"], (item["size"], item["mtime_ns"]), "failed",
+                                   str(e), sha256=item["sha256"])
+        return report
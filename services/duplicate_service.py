@@ -0,0 +1,144 @@
+"""Near-duplicate scan detection.
+
+Every stored scan gets a 64-bit perceptual hash (core.phash) on its
+scan_blobs row. The hashes are loaded once per process into a multi-index
+hash table, so a check against all prior scans is a Hamming-radius search
+over a few dozen buckets. Hashes written by other processes (new blobs, or
+the backfill hashing existing rows) are picked up when the number of
+hashed rows changes; removed or rewritten hashes rebuild the table.
+"""
+import os
+import threading
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from core.archive_store import resolve_path
+from core.database import get_db_context
+from core.phash import MultiIndexHash, phash_file, to_hex, from_hex
+from core.scan_store import digest_from_path, normalize_scan_path
+from models.index_generation import IndexGeneration
+from models.scan_blob import ScanBlob
+from models.visit import Visit
+
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "6"))
+
+_lock = threading.Lock()
+_index: MultiIndexHash | None = None
+_indexed: set = set()  # shas already in the index
+_db_state = (-1, -1)  # (hashed rows, scan_phash generation) at the last sync
+
+
+def _load_index(db: Session) -> MultiIndexHash:
+    """Return the process-wide index, building or topping it up from the DB.
+
+    The sync is keyed on (hashed row count, removal generation), two
+    lookups on the partial index and on index_generations. A new hash, from
+    an upload or the phash backfill, raises the count and is topped up. A
+    deleted, cleared or rewritten hash bumps the generation (triggers of
+    migration v0019) and the index is rebuilt, also when an insert in the
+    meantime left the count where it was.
+    """
+    global _index, _indexed, _db_state
+    with _lock:
+        count = db.query(func.count(ScanBlob.sha256)).filter(ScanBlob.phash.isnot(None)).scalar()
+        generation = db.query(IndexGeneration.generation).filter(IndexGeneration.name == "scan_phash").scalar() or 0
+        if _index is None or generation != _db_state[1]:
+            _index, _indexed = MultiIndexHash(), set()
+            _db_state = (-1, generation)
+        if count != _db_state[0]:
+            for sha, phash in db.query(ScanBlob.sha256, ScanBlob.phash).filter(ScanBlob.phash.isnot(None)):
+                if sha not in _indexed:
+                    _index.add(from_hex(phash), sha)
+                    _indexed.add(sha)
+            _db_state = (count, generation)
+        return _index
+
+
+def ensure_phash(blob: ScanBlob | None) -> str | None:
+    """Compute the blob's perceptual hash if missing (not committed). None if unreadable."""
+    if blob is None:
+        return None
+    if not blob.phash:
+        try:
+            blob.phash = to_hex(phash_file(resolve_path(blob.path)))
+        except Exception:
+            return None
+    return blob.phash
+
+
+def index_scan_blob(db: Session, blob: ScanBlob | None) -> str | None:
+    """Compute (if missing) the blob's perceptual hash and add it to the index.
+
+    Does not commit. Returns the hex hash, or None when the image cannot be read.
+    """
+    if ensure_phash(blob) is None:
+        return None
+    index = _load_index(db)
+    with _lock:
+        index.add(from_hex(blob.phash), blob.sha256)
+        _indexed.add(blob.sha256)
+    return blob.phash
+
+
+def find_similar_scans(db: Session, visit: Visit, max_distance: int = PHASH_MAX_DISTANCE) -> List[Dict]:
+    """List other visits whose scan is identical or perceptually close to this visit's.
+
+    Returns
+    -------
+    list of dict
+        [{"visit_pk", "visit_code", "patient_code", "patient_name",
+          "same_patient": bool, "distance": int, "exact": bool}], closest first
+    """
+    digest = digest_from_path(getattr(visit, "scan_path", None))
+    if not digest:
+        return []
+    blob = db.query(ScanBlob).filter(ScanBlob.sha256 == digest).first()
+    phash = index_scan_blob(db, blob)
+    if not phash:
+        return []
+
+    matches = _load_index(db).search(from_hex(phash), max_distance)
+    distance_by_sha = {sha: d for d, sha in matches}
+    paths = {
+        normalize_scan_path(p): sha
+        for sha, p in db.query(ScanBlob.sha256, ScanBlob.path)
+        .filter(ScanBlob.sha256.in_(list(distance_by_sha)))
+        .all()
+    }
+    if not paths:
+        return []
+    others = (
+        db.query(Visit)
+        .options(joinedload(Visit.patient))
+        .filter(Visit.scan_path.in_(list(paths)))
+        .filter(Visit.id != visit.id)
+        .all()
+    )
+    out = []
+    for other in others:
+        sha = paths.get(normalize_scan_path(other.scan_path))
+        patient = other.patient
+        out.append({
+            "visit_pk": other.id,
+            "visit_code": other.visit_id,
+            "patient_code": patient.patient_id if patient else None,
+            "patient_name": patient.name if patient else None,
+            "same_patient": other.patient_id == visit.patient_id,
+            "distance": distance_by_sha.get(sha, 0),
+            "exact": sha == digest,
+        })
+    out.sort(key=lambda m: (m["distance"], m["same_patient"], m["visit_pk"]))
+    return out
+
+
+def similar_scans_for_visit(visit_id: int, max_distance: int = PHASH_MAX_DISTANCE) -> List[Dict]:
+    """Page helper: opens a session, runs find_similar_scans and keeps any new hash."""
+    with get_db_context() as db:
+        visit = db.query(Visit).filter(Visit.id == visit_id).first()
+        if not visit:
+            return []
+        matches = find_similar_scans(db, visit, max_distance)
+        db.commit()
+        return matches
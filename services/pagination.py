@@ -0,0 +1,73 @@
+"""Keyset pagination.
+
+List pages seek past the sort key of the last row shown ("WHERE id < :last
+ORDER BY id DESC LIMIT n") instead of using OFFSET, so every page costs the
+same given an index on the sort key. The position is an opaque cursor:
+URL-safe base64 of the last row's sort-key values (see
+core.helpers.keyset_cursor / render_keyset_pager).
+"""
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+PAGE_SIZE = max(1, int(os.getenv("LIST_PAGE_SIZE", "20")))
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque cursor for the sort-key values of a row."""
+    payload = [{"dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List:
+    """Sort-key values from a cursor made by encode_cursor(). Raises ValueError if malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    if not isinstance(payload, list):
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return [datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v for v in payload]
+
+
+def keyset_page(
+    query: Query,
+    keys: Sequence,
+    row_key: Callable,
+    cursor: str | None = None,
+    page_size: int = PAGE_SIZE,
+    descending: bool = True,
+) -> Dict:
+    """One page of ``query`` ordered by ``keys``, starting after ``cursor``.
+
+    Parameters
+    ----------
+    keys : columns
+        Sort key, most significant first; must be unique together (end with a PK).
+    row_key : callable
+        Maps a result row to its values for ``keys``.
+
+    Returns
+    -------
+    dict
+        {"items": [...], "next_cursor": str | None}
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise ValueError("Page cursor does not match this list.")
+        if len(keys) == 1:
+            seek = keys[0] < values[0] if descending else keys[0] > values[0]
+        else:
+            seek = tuple_(*keys) < tuple_(*values) if descending else tuple_(*keys) > tuple_(*values)
+        query = query.filter(seek)
+    order = [k.desc() if descending else k.asc() for k in keys]
+    rows = query.order_by(None).order_by(*order).limit(page_size + 1).all()
+    items = rows[:page_size]
+    next_cursor = encode_cursor(row_key(items[-1])) if len(rows) > page_size else None
+    return {"items": items, "next_cursor": next_cursor}
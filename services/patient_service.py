@@ -1,8 +1,14 @@
 from sqlalchemy.orm import Session
 from models.patient import Patient
 from models.visit import Visit
+from models.treatment import Treatment
+from models.annotation import Annotation
+from models.imported_file import ImportedFile
 from core.time_utils import now_utc
 from core.database import get_db_context
+from services.pagination import PAGE_SIZE, keyset_page
+from services.scan_service import release_scan_blob
+from services.annotation_revision_service import delete_revisions
 
 
 # ------------------------------------------
@@ -158,6 +164,28 @@ def list_patients(db: Session = None):
     return db.query(Patient).all()
 
 
+def patients_page(
+    db: Session,
+    cursor: str | None = None,
+    page_size: int = PAGE_SIZE,
+    doctor_username: str | None = None,
+    status: str | None = None,
+):
+    """One page of patients, newest first (keyset on id; see services.pagination).
+
+    With ``doctor_username`` / ``status`` only patients having such a visit are listed.
+    """
+    q = db.query(Patient)
+    if doctor_username is not None or status is not None:
+        visits = db.query(Visit.id).filter(Visit.patient_id == Patient.id)
+        if doctor_username is not None:
+            visits = visits.filter(Visit.doctor_username == doctor_username)
+        if status is not None:
+            visits = visits.filter(Visit.status == status)
+        q = q.filter(visits.exists())
+    return keyset_page(q, [Patient.id], lambda p: (p.id,), cursor, page_size)
+
+
 def get_patient_by_id(patient_id: str, db: Session = None):
     if db is None:
         with get_db_context() as db:
@@ -192,6 +220,14 @@ def update_patient(patient_code: str, *, name: str | None = None, age: int | Non
 # ------------------------------------------
 # Delete a single visit
 # ------------------------------------------
+def _detach_visit_rows(db: Session, visit_ids: list) -> None:
+    """Remove or unlink rows referencing the visits (foreign keys are enforced)."""
+    db.query(Treatment).filter(Treatment.visit_id.in_(visit_ids)).delete(synchronize_session=False)
+    db.query(ImportedFile).filter(ImportedFile.visit_id.in_(visit_ids)).update(
+        {ImportedFile.visit_id: None}, synchronize_session=False
+    )
+
+
 def delete_visit(visit_id: int, db: Session | None = None) -> bool:
     if db is None:
         with get_db_context() as _db:
@@ -200,6 +236,11 @@ def delete_visit(visit_id: int, db: Session | None = None) -> bool:
     v = db.query(Visit).filter(Visit.id == visit_id).first()
     if not v:
         return False
+    release_scan_blob(db, v.scan_path)
+    # Annotation files become orphans for the upload GC; drop their index rows
+    db.query(Annotation).filter(Annotation.visit_id == v.id).delete()
+    delete_revisions(db, [v.id])
+    _detach_visit_rows(db, [v.id])
     db.delete(v)
     db.commit()
     return True
@@ -217,7 +258,16 @@ def delete_patient(patient_code: str, db: Session | None = None) -> bool:
     if not patient:
         return False
 
-    # Delete all visits first to avoid FK constraint issues
+    # Drop scan references held by the visits, then delete the visits
+    # first to avoid FK constraint issues
+    visit_ids = []
+    for (pk, scan_path) in db.query(Visit.id, Visit.scan_path).filter(Visit.patient_id == patient.id).all():
+        release_scan_blob(db, scan_path)
+        visit_ids.append(pk)
+    if visit_ids:
+        db.query(Annotation).filter(Annotation.visit_id.in_(visit_ids)).delete(synchronize_session=False)
+        delete_revisions(db, visit_ids)
+        _detach_visit_rows(db, visit_ids)
     db.query(Visit).filter(Visit.patient_id == patient.id).delete()
     db.delete(patient)
     db.commit()
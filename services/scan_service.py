@@ -1,20 +1,29 @@
 import os
-import uuid
+import json
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
 
 from sqlalchemy.orm import Session
 
 from models.visit import Visit
+from models.scan_blob import ScanBlob
 from services.tpa_service import evaluate_tpa_eligibility
+from services.duplicate_service import index_scan_blob
+from services.similar_case_service import index_case_embedding
 from core.database import get_db_context
 from core.annotation_utils import delete_all_visit_annotations
+from core.scan_store import put_stream, normalize_scan_path, digest_from_path
+from core.scan_previews import schedule_previews
+from core.archive_store import resolve_path
+from core.time_utils import now_utc
+from core.image_quality import assess_scan_quality, QUALITY_GATE_MODE
+from core.vector_index import pack_embedding
 _ML_AVAILABLE = True
 try:
     # Try lightweight import to detect if ML stack is available.
-    from ml.predict import predict_scan  # type: ignore
+    from ml.predict import predict_scans  # type: ignore
 except Exception:
-    predict_scan = None  # type: ignore
+    predict_scans = None  # type: ignore
     _ML_AVAILABLE = False
 
 
@@ -31,6 +40,29 @@ def _ensure_upload_dir_exists() -> None:
     UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def store_uploaded_scan(uploaded_file) -> Tuple[str, str, int]:
+    """
+    Save the uploaded scan into the content-addressed store.
+
+    Identical bytes map to the same file, so re-uploading a scan does not
+    consume more disk. The upload is streamed in chunks (never read whole
+    into memory) and is limited to MAX_UPLOAD_MB. Previews are not built
+    here; the caller schedules them once the scan passed the quality gate.
+
+    Returns
+    -------
+    (scan_path, sha256, size_bytes)
+    """
+    _ensure_upload_dir_exists()
+
+    # Get extension from original file name, default to .png if missing
+    original_name = uploaded_file.name or "scan.png"
+    ext = os.path.splitext(original_name)[1] or ".png"
+
+    scan_path, digest, size_bytes, _ = put_stream(uploaded_file, ext)
+    return scan_path, digest, size_bytes
+
+
 def save_uploaded_scan(uploaded_file) -> str:
     """
     Save the uploaded scan file to disk and return the file path.
@@ -45,55 +77,161 @@ def save_uploaded_scan(uploaded_file) -> str:
     str
         Path to the saved scan file (relative to project root).
     """
-    _ensure_upload_dir_exists()
+    scan_path, _, _ = store_uploaded_scan(uploaded_file)
+    # Thumbnail/medium previews are built off the request path
+    schedule_previews(scan_path)
+    return scan_path
+
+
+def get_scan_blob(db: Session, scan_path: str | None):
+    """Return the ScanBlob behind a stored scan path (None for legacy files)."""
+    digest = digest_from_path(scan_path)
+    if not digest:
+        return None
+    return db.query(ScanBlob).filter(ScanBlob.sha256 == digest).first()
 
-    # Get extension from original file name, default to .png if missing
-    original_name = uploaded_file.name or "scan.png"
-    ext = os.path.splitext(original_name)[1] or ".png"
 
-    # Generate a unique file name so we do not overwrite anything
-    filename = f"scan_{uuid.uuid4().hex}{ext}"
-    dest_path = UPLOAD_DIR / filename
+def retain_scan_blob(db: Session, scan_path: str, sha256: str, size_bytes: int) -> ScanBlob:
+    """Record one more visit referencing the blob (creating the row if needed).
 
-    # Save bytes to disk
-    with open(dest_path, "wb") as f:
-        f.write(uploaded_file.read())
+    Does not commit; the caller commits together with the visit update.
+    """
+    blob = db.query(ScanBlob).filter(ScanBlob.sha256 == sha256).first()
+    if not blob:
+        blob = ScanBlob(sha256=sha256, path=normalize_scan_path(scan_path), size_bytes=size_bytes, ref_count=0)
+        db.add(blob)
+    blob.ref_count = (blob.ref_count or 0) + 1
+    return blob
 
-    # Return string path (you can store this directly in the DB)
-    return str(dest_path)
 
+def release_scan_blob(db: Session, scan_path: str | None) -> None:
+    """Drop one visit reference from the blob behind scan_path.
 
-def run_model_on_scan(scan_path: str) -> Tuple[str, float, list]:
+    The file itself is left on disk; unreferenced blobs are reclaimed by the
+    upload garbage collector. Does not commit.
     """
-    Run the ML model on the saved scan and return (label, confidence).
+    blob = get_scan_blob(db, scan_path)
+    if blob and (blob.ref_count or 0) > 0:
+        blob.ref_count -= 1
 
-    Parameters
-    ----------
-    scan_path : str
-        Path to the scan image on disk.
 
-    Returns
-    -------
-    (label, confidence)
-        label: predicted class label as a string
-        confidence: prediction confidence as a float between 0 and 1
+def attach_scan_to_visit(db: Session, visit: Visit, scan_path: str, sha256: str, size_bytes: int) -> ScanBlob:
+    """Point visit at a stored scan, moving its blob reference. Does not commit.
+
+    The blob row's path is canonical: when the same bytes were stored
+    earlier under another extension (scan.png vs scan.jpg), the visit
+    points at the existing file and the new copy is left unreferenced for
+    the upload garbage collector. Read the path back from visit.scan_path.
+    """
+    existing = db.query(ScanBlob).filter(ScanBlob.sha256 == sha256).first()
+    if existing is not None:
+        scan_path = existing.path
+    old_scan_path = getattr(visit, 'scan_path', None)
+    if normalize_scan_path(old_scan_path) != scan_path:
+        blob = retain_scan_blob(db, scan_path, sha256, size_bytes)
+        release_scan_blob(db, old_scan_path)
+    else:
+        blob = existing or retain_scan_blob(db, scan_path, sha256, size_bytes)
+    visit.scan_path = scan_path
+    return blob
+
+
+def cached_prediction(blob: ScanBlob | None):
+    """Return (label, confidence, probabilities) cached on the blob, or None."""
+    if blob is None or blob.predicted_at is None:
+        return None
+    return blob.prediction_label, blob.prediction_confidence, json.loads(blob.probabilities_json or "[]")
+
+
+def cache_prediction(blob: ScanBlob, label, confidence, probabilities, embedding=None) -> None:
+    """Remember a model result on the blob (skipped when the model gave nothing)."""
+    if label is None:
+        return
+    blob.prediction_label = label
+    blob.prediction_confidence = confidence
+    blob.probabilities_json = json.dumps(probabilities or [])
+    blob.predicted_at = now_utc()
+    if embedding is not None:
+        blob.embedding = pack_embedding(embedding)
+
+
+def check_scan_quality(db: Session, scan_path: str, sha256: str) -> Dict:
+    """Run the quality gate on a stored scan, reusing the result cached on its blob."""
+    blob = db.query(ScanBlob).filter(ScanBlob.sha256 == sha256).first()
+    if blob is not None and blob.quality_ok is not None:
+        return {
+            "ok": bool(blob.quality_ok),
+            "reason": blob.quality_reason or "",
+            "metrics": json.loads(blob.quality_metrics_json or "{}"),
+            "elapsed_ms": 0.0,
+            "cached": True,
+        }
+    return assess_scan_quality(resolve_path(scan_path))
+
+
+def record_quality(blob: ScanBlob, quality: Dict) -> None:
+    """Store a quality gate result (and its timing) on the blob."""
+    if quality.get("cached"):
+        return
+    blob.quality_ok = bool(quality["ok"])
+    blob.quality_reason = quality.get("reason") or None
+    blob.quality_metrics_json = json.dumps(quality.get("metrics") or {})
+    blob.quality_ms = quality.get("elapsed_ms")
+
+
+def reject_scan(db: Session, scan_path: str, sha256: str, size_bytes: int, quality: Dict) -> None:
+    """Persist a failed quality gate on the (unreferenced) blob and commit.
+
+    A re-upload of the same bytes is then rejected from the cached result,
+    and the upload garbage collector reclaims the file and the row.
+    """
+    blob = db.query(ScanBlob).filter(ScanBlob.sha256 == sha256).first()
+    if blob is None:
+        blob = ScanBlob(sha256=sha256, path=normalize_scan_path(scan_path), size_bytes=size_bytes, ref_count=0)
+        db.add(blob)
+    record_quality(blob, quality)
+    db.commit()
+
+
+def apply_tpa_result(visit: Visit, tpa_result: Dict) -> None:
+    """Copy an evaluate_tpa_eligibility result onto the visit.
+
+    Only persist a definitive eligible flag when evaluate_tpa_eligibility
+    returns True/False. If it returns None (indeterminate due to missing
+    imaging), persist only the reason and leave tpa_eligible unset.
     """
-    # If ML stack is unavailable (e.g., missing NumPy/PyTorch), return
-    # empty prediction values rather than raising — the UI can still show
-    # the uploaded scan and allow manual review.
-    if not _ML_AVAILABLE or predict_scan is None:
-        return None, None, []
+    if tpa_result.get("eligible") is None:
+        visit.tpa_reason = tpa_result.get("reason", "")
+    else:
+        visit.tpa_eligible = tpa_result.get("eligible", False)
+        visit.tpa_reason = tpa_result.get("reason", "")
+
 
+def infer_scans(scan_paths: List[str], batch_size: int = 16) -> List[Dict]:
+    """
+    Batched inference returning one dict per path:
+    {"label", "confidence", "probabilities", "embedding"} (embedding is a
+    float32 vector, or None). Values are None when the ML stack is
+    unavailable or fails.
+    """
+    empty = {"label": None, "confidence": None, "probabilities": [], "embedding": None}
+    if not scan_paths:
+        return []
+    if not _ML_AVAILABLE or predict_scans is None:
+        return [dict(empty) for _ in scan_paths]
     try:
-        result = predict_scan(scan_path)
-        label = result.get("label")
-        confidence = result.get("confidence")
-        probabilities = result.get("probabilities", [])
-        return label, confidence, probabilities
+        results = predict_scans([resolve_path(p) for p in scan_paths], batch_size=batch_size, with_embeddings=True)
+        return [{**empty, **r} for r in results]
     except Exception:
-        # On any runtime failure inside the model/predict code, do not
-        # raise — return empty prediction so the caller can continue.
-        return None, None, []
+        return [dict(empty) for _ in scan_paths]
+
+
+def run_model_on_scans(scan_paths: List[str], batch_size: int = 16) -> List[Tuple[str, float, list]]:
+    """
+    Batched inference returning one (label, confidence, probabilities) per
+    path, with None values when the ML stack is unavailable or fails.
+    """
+    return [(r["label"], r["confidence"], r["probabilities"]) for r in infer_scans(scan_paths, batch_size)]
 
 
 def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
@@ -102,11 +240,15 @@ def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
 
     Steps:
     1. Fetch the Visit row.
-    2. Save the uploaded scan to disk.
-    3. Run the ML model to get diagnosis + confidence.
-    4. Evaluate tPA eligibility using tpa_service.
-    5. Update and commit the Visit row.
-    6. Return a result dict for the UI.
+    2. Save the uploaded scan into the content-addressed store.
+    3. Run the quality gate (core.image_quality). Failing scans are rejected
+       with a ValueError, or kept without a prediction when
+       QUALITY_GATE_MODE=flag.
+    4. Run the ML model to get diagnosis + confidence (reused from the
+       blob cache when the same bytes were analysed before).
+    5. Evaluate tPA eligibility using tpa_service.
+    6. Update and commit the Visit row.
+    7. Return a result dict for the UI.
 
     Parameters
     ----------
@@ -127,12 +269,15 @@ def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
           "confidence": float,
           "tpa_eligible": bool,
           "tpa_reason": str,
+          "quality": {"ok", "reason", "metrics", "elapsed_ms"},
         }
 
     Raises
     ------
     ValueError
-        If the visit is not found or the file is missing.
+        If the visit is not found, the file is missing, the upload is
+        larger than MAX_UPLOAD_MB (UploadTooLargeError), or the scan fails
+        the quality gate in reject mode.
     """
     if uploaded_file is None:
         raise ValueError("No scan file provided.")
@@ -141,15 +286,37 @@ def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
     if not visit:
         raise ValueError(f"Visit with id {visit_id} not found.")
 
-    # 1) Save scan to disk
-    scan_path = save_uploaded_scan(uploaded_file)
+    # 1) Save scan into the content-addressed store
+    scan_path, digest, size_bytes = store_uploaded_scan(uploaded_file)
 
-    # 2) Run ML model (may return None values if the ML stack is unavailable)
-    prediction_label, prediction_conf, probabilities = run_model_on_scan(scan_path)
+    # 2) Quality gate: blank, truncated or unreadable images never reach the model
+    quality = check_scan_quality(db, scan_path, digest)
+    if not quality["ok"] and QUALITY_GATE_MODE == "reject":
+        reject_scan(db, scan_path, digest, size_bytes, quality)
+        raise ValueError(f"Scan rejected by quality check: {quality['reason']}")
 
-    # 3) Update visit with scan and ML outputs
     old_scan_path = getattr(visit, 'scan_path', None)
-    visit.scan_path = scan_path
+    blob = attach_scan_to_visit(db, visit, scan_path, digest, size_bytes)
+    scan_path = visit.scan_path
+    record_quality(blob, quality)
+    index_scan_blob(db, blob)
+    # Thumbnail/medium previews are built off the request path
+    schedule_previews(scan_path)
+
+    # 3) Run ML model, unless these exact bytes were already analysed
+    # (may return None values if the ML stack is unavailable)
+    cached = cached_prediction(blob)
+    if not quality["ok"]:
+        prediction_label, prediction_conf, probabilities = None, None, []
+    elif cached is not None:
+        prediction_label, prediction_conf, probabilities = cached
+    else:
+        result = infer_scans([scan_path], batch_size=1)[0]
+        prediction_label, prediction_conf, probabilities = result["label"], result["confidence"], result["probabilities"]
+        cache_prediction(blob, prediction_label, prediction_conf, probabilities, result["embedding"])
+        index_case_embedding(db, blob)
+
+    # 4) Update visit with scan and ML outputs
     # Map to Visit model fields
     visit.prediction_label = prediction_label
     visit.prediction_confidence = prediction_conf
@@ -158,20 +325,12 @@ def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
     db.refresh(visit)
 
     # Delete old annotations if scan path changed
-    if old_scan_path and old_scan_path != scan_path:
+    if old_scan_path and normalize_scan_path(old_scan_path) != scan_path:
         delete_all_visit_annotations(visit)
 
-    # 4) Evaluate tPA eligibility based on updated visit
+    # 5) Evaluate tPA eligibility based on updated visit
     tpa_result = evaluate_tpa_eligibility(db, visit.id)
-
-    # Only persist a definitive eligible flag when evaluate_tpa_eligibility
-    # returns True/False. If it returns None (indeterminate due to missing
-    # imaging), persist only the reason and leave tpa_eligible unset.
-    if tpa_result.get("eligible") is None:
-        visit.tpa_reason = tpa_result.get("reason", "")
-    else:
-        visit.tpa_eligible = tpa_result.get("eligible", False)
-        visit.tpa_reason = tpa_result.get("reason", "")
+    apply_tpa_result(visit, tpa_result)
     # Optional: mark status to show this visit is processed
     if not visit.status:
         visit.status = "analysis_completed"
@@ -179,7 +338,7 @@ def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
     db.commit()
     db.refresh(visit)
 
-    # 5) Build clean response for the UI
+    # 6) Build clean response for the UI
     return {
         "visit_id": visit.id,
         "scan_path": visit.scan_path,
@@ -188,6 +347,7 @@ def process_scan_for_visit(db: Session, visit_id: int, uploaded_file) -> Dict:
         "probabilities": probabilities,
         "tpa_eligible": bool(visit.tpa_eligible),
         "tpa_reason": visit.tpa_reason or "",
+        "quality": quality,
     }
 
 
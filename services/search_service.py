@@ -0,0 +1,198 @@
+"""Full-text case and patient search (SQLite FTS5, migration v0005).
+
+visit_search and patient_search are kept in sync by triggers. Every term is
+matched as a prefix ("jan" finds "Jane") and all terms must match; results
+are ranked by bm25 with name and code above notes and returned one page at
+a time. FTS only matches from the start of a token, so queries with a
+digit-only or very short term ("042" in "P042-V001") go through LIKE
+substring filters instead, newest first; so does everything until the
+migration has run.
+"""
+import re
+from typing import Dict, Iterable, List
+
+from sqlalchemy import bindparam, or_, text
+from sqlalchemy.orm import Session
+
+from models.patient import Patient
+from models.treatment import Treatment
+from models.visit import Visit
+
+PAGE_SIZE = 25
+
+# bm25 column weights, in table column order
+_VISIT_WEIGHTS = "10.0, 10.0, 8.0, 1.0, 1.0"  # name, code, visit code, notes, plan
+_PATIENT_WEIGHTS = "10.0, 10.0"  # name, code
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+# Terms shorter than this (or all digits) are matched as substrings with LIKE
+SUBSTRING_TERM_LEN = 3
+
+
+def match_expression(query: str) -> str | None:
+    """FTS5 MATCH string for free text: every term as a quoted prefix, all required."""
+    terms = _TERM_RE.findall((query or "").lower())
+    if not terms:
+        return None
+    return " ".join(f'"{t}"*' for t in terms)
+
+
+def needs_substring_match(query: str) -> bool:
+    """True when some term is digit-only or short, which prefix matching would miss inside codes."""
+    return any(t.isdigit() or len(t) < SUBSTRING_TERM_LEN for t in _TERM_RE.findall((query or "").lower()))
+
+
+def _page(items: List, limit: int, offset: int) -> Dict:
+    return {"items": items[:limit], "offset": offset, "limit": limit, "has_more": len(items) > limit}
+
+
+_fts_ready = False  # set once the FTS tables are seen; they are never dropped
+
+
+def _fts_available(db: Session) -> bool:
+    global _fts_ready
+    if not _fts_ready:
+        found = db.execute(text(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('visit_search', 'patient_search')"
+        )).scalar()
+        _fts_ready = found == 2
+    return _fts_ready
+
+
+def search_visits(
+    db: Session,
+    query: str,
+    doctor_username: str | None = None,
+    statuses: Iterable[str] | None = None,
+    limit: int = PAGE_SIZE,
+    offset: int = 0,
+) -> Dict:
+    """Ranked visits matching ``query``.
+
+    ``statuses`` may include None to match visits without a status.
+
+    Returns
+    -------
+    dict
+        {"items": [(visit, patient)], "offset", "limit", "has_more"}
+    """
+    match = match_expression(query)
+    if match is None:
+        return _page([], limit, offset)
+    statuses = list(statuses or [])
+    if needs_substring_match(query) or not _fts_available(db):
+        return _like_visits(db, query, doctor_username, statuses, limit, offset)
+    named = [st for st in statuses if st is not None]
+    status_sql = ""
+    if statuses:
+        status_sql = " AND (v.status IN :statuses" + (" OR v.status IS NULL)" if None in statuses else ")")
+    sql = (
+        "SELECT s.rowid FROM visit_search s JOIN visits v ON v.id = s.rowid "
+        "WHERE visit_search MATCH :match"
+        + (" AND v.doctor_username = :doctor" if doctor_username is not None else "")
+        + status_sql
+        + f" ORDER BY bm25(visit_search, {_VISIT_WEIGHTS}), s.rowid DESC LIMIT :limit OFFSET :offset"
+    )
+    stmt = text(sql)
+    params = {"match": match, "limit": limit + 1, "offset": offset}
+    if doctor_username is not None:
+        params["doctor"] = doctor_username
+    if statuses:
+        stmt = stmt.bindparams(bindparam("statuses", expanding=True))
+        params["statuses"] = named
+    ids = [row[0] for row in db.execute(stmt, params)]
+
+    rows = (
+        db.query(Visit, Patient)
+        .join(Patient, Visit.patient_id == Patient.id)
+        .filter(Visit.id.in_(ids))
+        .all()
+    ) if ids else []
+    order = {pk: i for i, pk in enumerate(ids)}
+    rows.sort(key=lambda vp: order[vp[0].id])
+    return _page(rows, limit, offset)
+
+
+def search_patients(
+    db: Session,
+    query: str,
+    doctor_username: str | None = None,
+    status: str | None = None,
+    limit: int = PAGE_SIZE,
+    offset: int = 0,
+) -> Dict:
+    """Ranked patients matching ``query``.
+
+    With ``doctor_username`` / ``status`` only patients having such a visit
+    are returned (the patient list's status filter).
+
+    Returns
+    -------
+    dict
+        {"items": [patient], "offset", "limit", "has_more"}
+    """
+    match = match_expression(query)
+    if match is None:
+        return _page([], limit, offset)
+    if needs_substring_match(query) or not _fts_available(db):
+        return _like_patients(db, query, doctor_username, status, limit, offset)
+    visit_filter = []
+    params = {"match": match, "limit": limit + 1, "offset": offset}
+    if doctor_username is not None:
+        visit_filter.append("v.doctor_username = :doctor")
+        params["doctor"] = doctor_username
+    if status is not None:
+        visit_filter.append("v.status = :status")
+        params["status"] = status
+    sql = "SELECT s.rowid FROM patient_search s WHERE patient_search MATCH :match"
+    if visit_filter:
+        sql += f" AND EXISTS (SELECT 1 FROM visits v WHERE v.patient_id = s.rowid AND {' AND '.join(visit_filter)})"
+    sql += f" ORDER BY bm25(patient_search, {_PATIENT_WEIGHTS}), s.rowid DESC LIMIT :limit OFFSET :offset"
+    ids = [row[0] for row in db.execute(text(sql), params)]
+
+    patients = db.query(Patient).filter(Patient.id.in_(ids)).all() if ids else []
+    order = {pk: i for i, pk in enumerate(ids)}
+    patients.sort(key=lambda p: order[p.id])
+    return _page(patients, limit, offset)
+
+
+# -----------------------------
+# LIKE fallback (substring terms, or no FTS tables yet)
+# -----------------------------
+def _like_terms(query: str) -> List[str]:
+    return [f"%{t}%" for t in _TERM_RE.findall((query or "").lower())]
+
+
+def _like_visits(db, query, doctor_username, statuses, limit, offset) -> Dict:
+    q = db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+    for term in _like_terms(query):
+        plan_match = db.query(Treatment.id).filter(
+            Treatment.visit_id == Visit.id, Treatment.plan_text.ilike(term)
+        ).exists()
+        q = q.filter(or_(
+            Patient.name.ilike(term),
+            Patient.patient_id.ilike(term),
+            Visit.visit_id.ilike(term),
+            Visit.technician_notes.ilike(term),
+            plan_match,
+        ))
+    if doctor_username is not None:
+        q = q.filter(Visit.doctor_username == doctor_username)
+    if statuses:
+        named = [st for st in statuses if st is not None]
+        q = q.filter(or_(Visit.status.in_(named), Visit.status.is_(None)) if None in statuses else Visit.status.in_(named))
+    return _page(q.order_by(Visit.id.desc()).offset(offset).limit(limit + 1).all(), limit, offset)
+
+
+def _like_patients(db, query, doctor_username, status, limit, offset) -> Dict:
+    q = db.query(Patient)
+    for term in _like_terms(query):
+        q = q.filter(or_(Patient.name.ilike(term), Patient.patient_id.ilike(term)))
+    if doctor_username is not None or status is not None:
+        visits = db.query(Visit.id).filter(Visit.patient_id == Patient.id)
+        if doctor_username is not None:
+            visits = visits.filter(Visit.doctor_username == doctor_username)
+        if status is not None:
+            visits = visits.filter(Visit.status == status)
+        q = q.filter(visits.exists())
+    return _page(q.order_by(Patient.id.desc()).offset(offset).limit(limit + 1).all(), limit, offset)
@@ -0,0 +1,155 @@
+"""Similar-case retrieval over scan embeddings.
+
+The backbone embedding captured during inference (scan_blobs.embedding) is
+loaded once per process into a core.vector_index.VectorIndex. New scans are
+added as they are analysed; embeddings written by other processes (new
+blobs, or the backfill on existing rows) are picked up when the number of
+embedded rows changes; removed or rewritten embeddings rebuild the index.
+"""
+import os
+import threading
+from typing import Dict, List
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload
+
+from core.database import get_db_context
+from core.scan_store import digest_from_path, normalize_scan_path
+from core.vector_index import VectorIndex, unpack_embedding
+from models.index_generation import IndexGeneration
+from models.scan_blob import ScanBlob
+from models.treatment import Treatment
+from models.visit import Visit
+
+SIMILAR_CASES_K = int(os.getenv("SIMILAR_CASES_K", "5"))
+
+_lock = threading.Lock()
+_index: VectorIndex | None = None
+_indexed: set = set()  # shas already in the index (or skipped as unusable)
+_db_state = (-1, -1)  # (embedded rows, scan_embedding generation) at the last sync
+_FETCH_CHUNK = 500
+
+
+def _load_index(db: Session) -> VectorIndex:
+    """Return the process-wide index, building or topping it up from the DB.
+
+    The sync is keyed on (embedded row count, removal generation), as in
+    duplicate_service. A higher count, from new scans or the backfill, only
+    fetches the missing vectors. A deleted, cleared or rewritten embedding
+    bumps the generation (triggers of migration v0020) and the index is
+    rebuilt, also when an insert in the meantime kept the count the same.
+    """
+    global _index, _indexed, _db_state
+    with _lock:
+        embedded = ScanBlob.embedding.isnot(None)
+        count = db.query(func.count(ScanBlob.sha256)).filter(embedded).scalar()
+        generation = db.query(IndexGeneration.generation).filter(IndexGeneration.name == "scan_embedding").scalar() or 0
+        if _index is None or generation != _db_state[1]:
+            _index, _indexed = VectorIndex(), set()
+            _db_state = (-1, generation)
+        if count != _db_state[0]:
+            missing = [sha for (sha,) in db.query(ScanBlob.sha256).filter(embedded) if sha not in _indexed]
+            for start in range(0, len(missing), _FETCH_CHUNK):
+                chunk = missing[start:start + _FETCH_CHUNK]
+                for sha, data in db.query(ScanBlob.sha256, ScanBlob.embedding).filter(ScanBlob.sha256.in_(chunk)):
+                    vec = unpack_embedding(data)
+                    if vec is not None:
+                        try:
+                            _index.add(sha, vec)
+                        except ValueError:
+                            pass  # embedding from a different model version
+                    _indexed.add(sha)
+            _db_state = (count, generation)
+        return _index
+
+
+def index_case_embedding(db: Session, blob: ScanBlob | None) -> None:
+    """Add the blob's embedding (if it has one) to the in-memory index."""
+    vec = unpack_embedding(blob.embedding) if blob is not None else None
+    if vec is None:
+        return
+    index = _load_index(db)
+    with _lock:
+        try:
+            index.add(blob.sha256, vec)
+        except ValueError:
+            pass
+        _indexed.add(blob.sha256)
+
+
+def find_similar_cases(db: Session, visit: Visit, k: int = SIMILAR_CASES_K) -> List[Dict]:
+    """Return the k prior visits whose scans are closest to this visit's scan.
+
+    Prior means an earlier timestamp (lower id when either visit has none),
+    so a case is never compared with later outcomes. Identical scans (same
+    blob) are skipped - they are the duplicate check's job, not a different
+    case.
+
+    Returns
+    -------
+    list of dict
+        [{"visit_pk", "visit_code", "patient_code", "patient_name",
+          "similarity": float (cosine), "scan_path", "prediction",
+          "confidence", "status", "tpa_eligible", "treatment"}], most similar first
+    """
+    digest = digest_from_path(getattr(visit, "scan_path", None))
+    if not digest:
+        return []
+    data = db.query(ScanBlob.embedding).filter(ScanBlob.sha256 == digest).scalar()
+    vec = unpack_embedding(data)
+    if vec is None:
+        return []
+
+    # Several visits can share a blob and later visits are dropped; ask for
+    # a few extra neighbours
+    hits = _load_index(db).search(vec, k=k * 4, exclude={digest})
+    if not hits:
+        return []
+    score_by_sha = {sha: score for score, sha in hits}
+    path_to_sha = {
+        normalize_scan_path(p): sha
+        for sha, p in db.query(ScanBlob.sha256, ScanBlob.path).filter(ScanBlob.sha256.in_(list(score_by_sha))).all()
+    }
+    if visit.timestamp is not None:
+        prior = or_(Visit.timestamp < visit.timestamp, and_(Visit.timestamp.is_(None), Visit.id < visit.id))
+    else:
+        prior = Visit.id < visit.id
+    visits = (
+        db.query(Visit)
+        .options(joinedload(Visit.patient))
+        .filter(Visit.scan_path.in_(list(path_to_sha)))
+        .filter(Visit.id != visit.id)
+        .filter(prior)
+        .all()
+    )
+    plans = {
+        t.visit_id: t.plan_text
+        for t in db.query(Treatment).filter(Treatment.visit_id.in_([v.id for v in visits])).all()
+    }
+    out = []
+    for v in visits:
+        patient = v.patient
+        out.append({
+            "visit_pk": v.id,
+            "visit_code": v.visit_id,
+            "patient_code": patient.patient_id if patient else None,
+            "patient_name": patient.name if patient else None,
+            "similarity": score_by_sha.get(path_to_sha.get(normalize_scan_path(v.scan_path)), 0.0),
+            "scan_path": v.scan_path,
+            "prediction": v.prediction_label,
+            "confidence": v.prediction_confidence,
+            "status": v.status,
+            "tpa_eligible": v.tpa_eligible,
+            "treatment": plans.get(v.id),
+        })
+    out.sort(key=lambda c: c["similarity"], reverse=True)
+    return out[:k]
+
+
+def similar_cases_for_visit(visit_id: int, k: int = SIMILAR_CASES_K) -> List[Dict]:
+    """Page helper: opens a session and runs find_similar_cases."""
+    with get_db_context() as db:
+        visit = db.query(Visit).filter(Visit.id == visit_id).first()
+        if not visit:
+            return []
+        return find_similar_cases(db, visit, k)
@@ -0,0 +1,149 @@
+"""Upload garbage collector.
+
+Finds files under data/uploads (scans, previews, annotation files) that
+nothing in the database points at any more. Files younger than the grace
+period are always kept, so an upload whose row is not committed yet is
+never collected.
+"""
+import os
+import time
+from typing import Dict, Iterator, Set
+
+from sqlalchemy.orm import Session
+
+from core.database import BASE_DIR
+from core.annotation_utils import ANNOTATION_DIR, _scan_hash
+from core.scan_store import UPLOAD_DIR, normalize_scan_path
+from core.scan_previews import PREVIEW_WIDTHS, preview_path
+from models.annotation import Annotation
+from models.patient import Patient
+from models.scan_blob import ScanBlob
+from models.visit import Visit
+
+DEFAULT_GRACE_SECONDS = 24 * 3600
+
+
+def _abs(path: str) -> str:
+    path = normalize_scan_path(path)
+    if not os.path.isabs(path):
+        path = os.path.join(BASE_DIR, path)
+    return os.path.normpath(path)
+
+
+def referenced_paths(db: Session) -> Set[str]:
+    """Build the set of absolute file paths the database still references.
+
+    One query over visits (joined to patients for the annotation file names),
+    one over live scan blobs and one over the annotation index.
+    """
+    refs: Set[str] = set()
+    images: Set[str] = set()  # sources that get previews, whatever their extension
+    rows = (
+        db.query(Visit.id, Visit.visit_id, Visit.scan_path, Patient.patient_id)
+        .outerjoin(Patient, Visit.patient_id == Patient.id)
+        .all()
+    )
+    for pk, visit_code, scan_path, patient_code in rows:
+        # Legacy per-visit annotation names
+        refs.add(os.path.normpath(os.path.join(ANNOTATION_DIR, f"visit_{pk}.png")))
+        refs.add(os.path.normpath(os.path.join(ANNOTATION_DIR, f"visit_{pk}.json")))
+        if not scan_path:
+            continue
+        images.add(_abs(scan_path))
+        base = f"ann_{patient_code or 'PUNK'}_{visit_code}_{_scan_hash(scan_path)}"
+        for ext in (".png", ".json"):
+            refs.add(os.path.normpath(os.path.join(ANNOTATION_DIR, base + ext)))
+
+    for (path,) in db.query(ScanBlob.path).filter(ScanBlob.ref_count > 0).all():
+        images.add(_abs(path))
+
+    # Indexed annotation files (covers names that no longer match the pattern above)
+    for image_path, json_path in db.query(Annotation.image_path, Annotation.json_path).all():
+        if image_path:
+            images.add(_abs(image_path))
+        if json_path:
+            refs.add(_abs(json_path))
+    images.update(p for p in refs if p.endswith(".png"))  # composites named by pattern
+    refs |= images
+
+    # Previews are kept for every referenced image (.png/.jpg/.jpeg scans and
+    # composites), including scans that now live in an archive
+    for src in images:
+        for width in PREVIEW_WIDTHS.values():
+            p = preview_path(src, width)
+            if p:
+                refs.add(_abs(p))
+    return refs
+
+
+def _walk_files(root: str) -> Iterator[os.DirEntry]:
+    """Yield every regular file under root using os.scandir (no stat per name)."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def collect_garbage(db: Session, grace_seconds: int = DEFAULT_GRACE_SECONDS, dry_run: bool = True) -> Dict:
+    """Find (and unless dry_run, delete) unreferenced upload files.
+
+    Returns
+    -------
+    dict
+        {
+          "scanned_files": int, "scanned_bytes": int,
+          "orphan_files": int, "orphan_bytes": int,
+          "deleted_files": int, "deleted_bytes": int,
+          "kept_recent": int,           # orphans inside the grace period
+          "orphans": [(path, size)],    # candidates, largest first
+        }
+    """
+    refs = referenced_paths(db)
+    cutoff = time.time() - grace_seconds
+    report = {
+        "scanned_files": 0, "scanned_bytes": 0,
+        "orphan_files": 0, "orphan_bytes": 0,
+        "deleted_files": 0, "deleted_bytes": 0,
+        "kept_recent": 0,
+        "orphans": [],
+    }
+
+    root = _abs(UPLOAD_DIR)
+    for entry in _walk_files(root):
+        st = entry.stat(follow_symlinks=False)
+        report["scanned_files"] += 1
+        report["scanned_bytes"] += st.st_size
+        path = os.path.normpath(entry.path)
+        if path in refs:
+            continue
+        if st.st_mtime > cutoff:
+            report["kept_recent"] += 1
+            continue
+        report["orphan_files"] += 1
+        report["orphan_bytes"] += st.st_size
+        report["orphans"].append((path, st.st_size))
+        if not dry_run:
+            try:
+                os.remove(path)
+                report["deleted_files"] += 1
+                report["deleted_bytes"] += st.st_size
+            except OSError:
+                pass
+
+    if not dry_run:
+        # Blob rows without visits whose file is gone can be dropped too
+        for blob in db.query(ScanBlob).filter(ScanBlob.ref_count <= 0).all():
+            if not os.path.exists(_abs(blob.path)):
+                db.delete(blob)
+        db.commit()
+
+    report["orphans"].sort(key=lambda item: item[1], reverse=True)
+    return report
@@ -1,7 +1,14 @@
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from core.database import get_db
+from core.database import request_db
 from models.visit import Visit
 from models.patient import Patient
+from services.pagination import PAGE_SIZE, keyset_page
+
+# Technician "not reviewed" bucket; visits with no status count as well
+NOT_REVIEWED_STATUSES = ["in_progress", "analysis_completed", "saved"]
 
 
 # -----------------------------
@@ -9,7 +16,7 @@ from models.patient import Patient
 # -----------------------------
 def create_visit(patient_id: int | str | None, db: Session = None):
     if db is None:
-        db = next(get_db())
+        db = request_db()
     # Accept either numeric patient PK, patient code (e.g., P001), or Patient object
     if isinstance(patient_id, str):
         patient = db.query(Patient).filter(Patient.patient_id == patient_id).first()
@@ -21,12 +28,8 @@ def create_visit(patient_id: int | str | None, db: Session = None):
     else:
         patient_pk = patient_id
 
-    # Generate per-patient sequential visit code: <PatientCode>-V### (e.g., P003-V001)
-    # Display will show only the V### portion.
     patient_obj = db.query(Patient).filter(Patient.id == patient_pk).first()
-    existing_count = db.query(Visit).filter(Visit.patient_id == patient_pk).count()
-    seq = existing_count + 1
-    visit_code = f"{patient_obj.patient_id}-V{seq:03d}"
+    visit_code = next_visit_code(db, patient_obj)
 
     visit = Visit(patient_id=patient_pk, visit_id=visit_code, status="in_progress")
     db.add(visit)
@@ -35,12 +38,23 @@ def create_visit(patient_id: int | str | None, db: Session = None):
     return visit
 
 
+# -----------------------------
+# Next per-patient visit code
+# -----------------------------
+def next_visit_code(db: Session, patient: Patient) -> str:
+    # Generate per-patient sequential visit code: <PatientCode>-V### (e.g., P003-V001)
+    # Display will show only the V### portion.
+    existing_count = db.query(Visit).filter(Visit.patient_id == patient.id).count()
+    seq = existing_count + 1
+    return f"{patient.patient_id}-V{seq:03d}"
+
+
 # -----------------------------
 # Get visit by ID
 # -----------------------------
 def get_visit_by_id(visit_id: int, db: Session = None):
     if db is None:
-        db = next(get_db())
+        db = request_db()
 
     return db.query(Visit).filter(Visit.id == visit_id).first()
 
@@ -50,7 +64,7 @@ def get_visit_by_id(visit_id: int, db: Session = None):
 # -----------------------------
 def get_visits_for_patient(patient_id: int, db: Session = None):
     if db is None:
-        db = next(get_db())
+        db = request_db()
 
     return db.query(Visit).filter(Visit.patient_id == patient_id).all()
 
@@ -60,7 +74,7 @@ def get_visits_for_patient(patient_id: int, db: Session = None):
 # -----------------------------
 def update_visit(visit_id: int, db: Session = None, **kwargs):
     if db is None:
-        db = next(get_db())
+        db = request_db()
 
     visit = db.query(Visit).filter(Visit.id == visit_id).first()
 
@@ -81,7 +95,7 @@ def update_visit(visit_id: int, db: Session = None, **kwargs):
 # -----------------------------
 def assign_doctor(visit_id: int, doctor_username: str, db: Session = None):
     if db is None:
-        db = next(get_db())
+        db = request_db()
 
     visit = db.query(Visit).filter(Visit.id == visit_id).first()
 
@@ -94,3 +108,74 @@ def assign_doctor(visit_id: int, doctor_username: str, db: Session = None):
     db.commit()
     db.refresh(visit)
     return visit
+
+
+# -----------------------------
+# Doctor work lists (set-based)
+# -----------------------------
+def latest_visits_by_patient(
+    db: Session, doctor_username: str | None = None, patient_ids: Iterable[int] | None = None
+) -> Dict[int, Visit]:
+    """Most recent visit per patient (optionally only a doctor's visits), keyed by patient PK.
+
+    One query: ROW_NUMBER() over each patient's visits, newest first, keeps rank 1.
+    Pass ``patient_ids`` (e.g. the patients on the current page) to limit the work.
+    """
+    ranked = db.query(
+        Visit.id.label("visit_pk"),
+        func.row_number().over(partition_by=Visit.patient_id, order_by=Visit.id.desc()).label("rn"),
+    )
+    if doctor_username is not None:
+        ranked = ranked.filter(Visit.doctor_username == doctor_username)
+    if patient_ids is not None:
+        ranked = ranked.filter(Visit.patient_id.in_(list(patient_ids)))
+    ranked = ranked.subquery()
+    visits = db.query(Visit).join(ranked, Visit.id == ranked.c.visit_pk).filter(ranked.c.rn == 1).all()
+    return {v.patient_id: v for v in visits}
+
+
+# -----------------------------
+# Paginated work lists (keyset, newest first)
+# -----------------------------
+def _visit_pk(row) -> Tuple[int]:
+    return (row[0].id,)
+
+
+def doctor_visits_page(
+    db: Session,
+    doctor_username: str,
+    statuses: Iterable[str] | None = None,
+    cursor: str | None = None,
+    page_size: int = PAGE_SIZE,
+) -> Dict:
+    """One page of a doctor's (visit, patient) pairs; see services.pagination."""
+    q = (
+        db.query(Visit, Patient)
+        .join(Patient, Visit.patient_id == Patient.id)
+        .filter(Visit.doctor_username == doctor_username)
+    )
+    if statuses:
+        q = q.filter(Visit.status.in_(list(statuses)))
+    return keyset_page(q, [Visit.id], _visit_pk, cursor, page_size)
+
+
+def technician_visits_page(
+    db: Session, status_filter: str = "all", cursor: str | None = None, page_size: int = PAGE_SIZE
+) -> Dict:
+    """One page of (visit, patient) pairs for the technician case list.
+
+    ``status_filter`` is "all", "not_reviewed" (no status or NOT_REVIEWED_STATUSES)
+    or "completed".
+    """
+    q = db.query(Visit, Patient).join(Patient, Visit.patient_id == Patient.id)
+    if status_filter == "not_reviewed":
+        q = q.filter(
+            or_(
+                Visit.status.is_(None),
+                Visit.status == "",
+                Visit.status.in_(NOT_REVIEWED_STATUSES),
+            )
+        )
+    elif status_filter == "completed":
+        q = q.filter(Visit.status == "completed")
+    return keyset_page(q, [Visit.id], _visit_pk, cursor, page_size)